@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import heapq
+import math
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dates import Month, date_parser, shift_month
+from rollups import category_name
+from store import StoreView
+
+
+# EWMA weight once a baseline is warm; earlier points are averaged equally.
+_ALPHA = 0.1
+_WARM = round(1 / _ALPHA)
+# Observations a baseline needs before it scores anything.
+MIN_MERCHANT_OBS = 3
+MIN_CATEGORY_OBS = 5
+# Scores are robust z-scores; 3.5 is the usual modified-z cutoff.
+ANOMALY_SCORE = 3.5
+# Same merchant and amount within this many days looks like a double charge.
+DUPLICATE_DAYS = 3
+DUPLICATE_MIN_AMOUNT = 10.0
+# Mean absolute deviation -> standard deviation for normal data
+_MAD_TO_SD = math.sqrt(math.pi / 2)
+
+
+class Baseline:
+    """Exponentially weighted mean and mean absolute deviation of amounts.
+
+    Updates are clipped to mean +/- 3 deviations once warm, so a single
+    outlier cannot drag the baseline toward itself (it is still scored
+    against the unclipped value). `scale` and `alarm` (the amount that
+    scores ANOMALY_SCORE) are kept current so scoring is a comparison.
+    """
+
+    __slots__ = ('n', 'mean', 'dev', 'scale', 'alarm')
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.dev = 0.0
+        self.scale = 1.0
+        self.alarm = math.inf
+
+    def score(self, x: float, min_obs: int) -> Optional[float]:
+        if self.n < min_obs:
+            return None
+        return (x - self.mean) / self.scale
+
+    def update(self, x: float) -> None:
+        # Hot path (twice per row): plain comparisons instead of min/max/abs calls.
+        n = self.n
+        if n == 0:
+            mean = x
+        else:
+            mean = self.mean
+            if n >= MIN_MERCHANT_OBS:
+                limit = 3 * self.scale
+                if x > mean + limit:
+                    x = mean + limit
+                elif x < mean - limit:
+                    x = mean - limit
+            alpha = _ALPHA if n >= _WARM else 1.0 / (n + 1)
+            d = x - mean
+            mean += alpha * d
+            self.dev += alpha * ((d if d >= 0 else -d) - self.dev)
+        self.n = n + 1
+        self.mean = mean
+        scale = self.dev * _MAD_TO_SD
+        if scale < 0.05 * mean:  # amounts are positive, so mean is too
+            scale = 0.05 * mean
+        if scale < 1.0:
+            scale = 1.0
+        self.scale = scale
+        self.alarm = mean + ANOMALY_SCORE * scale
+
+
+class AnomalyEngine(StoreView):
+    """Robust per-merchant and per-category baselines, and the expenses they flagged.
+
+    Rows are scored in arrival order against the baselines as they stood
+    before the row (O(1) per row), then folded into them. Flagged rows are
+    kept bucketed by month, so a date range is answered from the buckets it
+    covers instead of rescanning history.
+    """
+
+    def reset(self) -> None:
+        self._merchants: Dict[str, Baseline] = {}
+        self._categories: Dict[str, Baseline] = {}
+        self._last_charge: Dict[Tuple[str, int], Tuple[int, Any]] = {}  # (merchant, cents) -> (ordinal, id)
+        self._flagged: Dict[Month, List[Dict[str, Any]]] = {}
+
+    def ingest(self, rows: Iterable[Dict[str, Any]]) -> None:
+        parse = date_parser()
+        merchants, categories, last_charge = self._merchants, self._categories, self._last_charge
+        for t in rows:
+            try:
+                amt = float(t.get('amount') or 0)
+            except (TypeError, ValueError):
+                continue
+            if amt <= 0:
+                continue
+            dt = parse(str(t.get('date', '')))
+            if dt is None:
+                continue
+            ordinal = dt.toordinal()
+            merchant = _merchant_key(t)
+            charge = (merchant, round(amt * 100))
+            mb = merchants.get(merchant)
+            if mb is None:
+                mb = merchants[merchant] = Baseline()
+            cb = categories.get(category_name(t))
+            if cb is None:
+                cb = categories[category_name(t)] = Baseline()
+            last = last_charge.get(charge)
+            # Cheap pre-check; the finding itself is only built for flagged rows.
+            if (
+                (amt >= mb.alarm and mb.n >= MIN_MERCHANT_OBS)
+                or (amt >= cb.alarm and cb.n >= MIN_CATEGORY_OBS)
+                or (last is not None and amt >= DUPLICATE_MIN_AMOUNT and abs(ordinal - last[0]) <= DUPLICATE_DAYS)
+            ):
+                finding = self.score(t, amt, dt)
+                if finding:
+                    self._flagged.setdefault((dt.year, dt.month), []).append(finding)
+            mb.update(amt)
+            cb.update(amt)
+            last_charge[charge] = (ordinal, t.get('id'))
+
+    def score(self, t: Dict[str, Any], amt: float, dt: date) -> Optional[Dict[str, Any]]:
+        """Why `t` looks anomalous against the current baselines, or None. Doesn't update them."""
+        merchant = _merchant_key(t)
+        category = category_name(t)
+        reasons: List[str] = []
+        score = 0.0
+
+        base = self._merchants.get(merchant)
+        s = base.score(amt, MIN_MERCHANT_OBS) if base else None
+        if s is not None and s >= ANOMALY_SCORE:
+            reasons.append(f"{s:.1f}x usual spread above the typical ${base.mean:,.2f} at this merchant")
+        score = max(score, s or 0.0)
+
+        base = self._categories.get(category)
+        s = base.score(amt, MIN_CATEGORY_OBS) if base else None
+        if s is not None and s >= ANOMALY_SCORE:
+            reasons.append(f"{s:.1f}x usual spread above the typical ${base.mean:,.2f} in {category}")
+        score = max(score, s or 0.0)
+
+        duplicate_of = None
+        if amt >= DUPLICATE_MIN_AMOUNT:
+            last = self._last_charge.get((merchant, round(amt * 100)))
+            if last and abs(dt.toordinal() - last[0]) <= DUPLICATE_DAYS:
+                duplicate_of = last[1]
+                reasons.append(f"same amount at the same merchant {abs(dt.toordinal() - last[0])} day(s) apart")
+
+        if not reasons:
+            return None
+        return {
+            'id': t.get('id'),
+            'date': t.get('date'),
+            'merchant': t.get('merchant'),
+            'category': category,
+            'amount': round(amt, 2),
+            'score': round(score, 2),
+            'reasons': reasons,
+            'duplicateOf': duplicate_of,
+            '_ordinal': dt.toordinal(),
+        }
+
+    def flagged(self, start: date, end: date) -> Iterable[Dict[str, Any]]:
+        """Flagged rows dated within [start, end]; the caller holds `lock`."""
+        lo, hi = start.toordinal(), end.toordinal()
+        ym, last = (start.year, start.month), (end.year, end.month)
+        while ym <= last:
+            for f in self._flagged.get(ym, ()):
+                if lo <= f['_ordinal'] <= hi:
+                    yield f
+            ym = shift_month(ym, 1)
+
+    def top(self, start: date, end: date, limit: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """(highest-scoring unusual amounts, suspected duplicates), each at most `limit`, via heaps."""
+        with self.lock:
+            found = list(self.flagged(start, end))
+        unusual = heapq.nlargest(limit, (f for f in found if f['score'] >= ANOMALY_SCORE), key=lambda f: f['score'])
+        duplicates = heapq.nlargest(limit, (f for f in found if f['duplicateOf'] is not None), key=lambda f: f['_ordinal'])
+        return [_public(f) for f in unusual], [_public(f) for f in duplicates]
+
+
+def _merchant_key(t: Dict[str, Any]) -> str:
+    return ((t.get('merchant') or 'Unknown').strip() or 'Unknown').lower()
+
+
+def _public(finding: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in finding.items() if not k.startswith('_')}
@@ -1,14 +1,27 @@
 from __future__ import annotations
 
 import calendar
+import heapq
 import json
+import math
 import os
 import re
-from datetime import date, datetime
-from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 
 import httpx
 
+from anomalies import ANOMALY_SCORE, AnomalyEngine
+from cashflow import BalanceSeries, daily_balances
+from dates import DateIndex, add_months, date_parser, month_window_start, parse_date, shift_month
+from forecasting import forecast_next
+from goals import normalize_goal, plan_goals
+from pacing import pace_month
+from recurring import recurring_patterns
+from resilience import CHAT_BUDGET_S, LatencyBudget, acall_with_resilience
+from rollups import DailyRollup, MonthlyRollup
+from store import VersionedCache
+
 
 # -----------------
 # Period utilities
@@ -27,47 +40,19 @@ def resolve_period_for_transactions(
 
     # Prefer "current" period based on data (latest transaction), so demos
     # can behave like it's mid-month even if the system date differs.
-    latest: Optional[date] = None
-    for t in transactions:
-        try:
-            dt = parse_date(str(t.get("date", "")))
-        except Exception:
-            continue
-        if latest is None or dt > latest:
-            latest = dt
-
-    base = latest or date.today()
+    base = DateIndex.build(transactions).latest or date.today()
     y = year if year is not None else base.year
     m = month if month is not None else base.month
     return y, m
 
 
-def parse_date(value: str) -> date:
-    v = (value or "").strip()
-    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y"):
-        try:
-            return datetime.strptime(v, fmt).date()
-        except ValueError:
-            continue
-    raise ValueError(f"Unrecognized date: {value}")
-
-
 def filter_transactions_period(
     transactions: List[Dict[str, Any]],
     year: Optional[int],
     month: Optional[int],
 ) -> List[Dict[str, Any]]:
     y, m = resolve_period_for_transactions(transactions, year, month)
-    out: List[Dict[str, Any]] = []
-    for t in transactions:
-        try:
-            dt = parse_date(str(t.get("date", "")))
-        except Exception:
-            continue
-        if dt.year != y or dt.month != m:
-            continue
-        out.append(t)
-    return out
+    return DateIndex.build(transactions).month(y, m)
 
 
 def amount(t: Dict[str, Any]) -> float:
@@ -91,67 +76,64 @@ def get_spending_summary(
     year: Optional[int] = None,
     month: Optional[int] = None,
 ) -> Dict[str, Any]:
-    # GLOBAL MODE: If no specific date requested, analyze ALL data
+    # GLOBAL MODE: If no specific date requested, analyze ALL data. The totals
+    # are kept up to date by MonthlyRollup as rows arrive, so this is
+    # O(months + categories) rather than a scan of every expense.
     if year is None and month is None:
-        expenses = [t for t in transactions if is_expense(t)]
-        y, m = 0, 0 # "All Time"
-    else:
-        y, m = resolve_period_for_transactions(transactions, year, month)
-        period_tx = filter_transactions_period(transactions, y, m)
-        expenses = [t for t in period_tx if is_expense(t)]
+        return _all_time_summary(MonthlyRollup.build(transactions))
+
+    y, m = resolve_period_for_transactions(transactions, year, month)
+    period_tx = filter_transactions_period(transactions, y, m)
+    expenses = [t for t in period_tx if is_expense(t)]
 
     total_spent = round(sum(amount(t) for t in expenses), 2)
 
     by_cat: Dict[str, float] = {}
-    monthly_totals: Dict[str, float] = {}
-
     for t in expenses:
         cat = (t.get("category") or "Other").strip() or "Other"
         by_cat[cat] = by_cat.get(cat, 0.0) + amount(t)
-        
-        # Track monthly totals for "highest month" / average calc
-        if year is None and month is None:
-            try:
-                dt = parse_date(str(t.get("date", "")))
-                m_key = dt.strftime("%Y-%m")
-                monthly_totals[m_key] = monthly_totals.get(m_key, 0.0) + amount(t)
-            except:
-                pass
 
     top_categories = [
         {"category": c, "spent": round(v, 2)}
         for c, v in sorted(by_cat.items(), key=lambda kv: kv[1], reverse=True)[:3]
     ]
 
-    outlier = None
-    if expenses:
-        biggest = max(expenses, key=lambda t: amount(t))
-        outlier = {
-            "id": biggest.get("id"),
-            "date": biggest.get("date"),
-            "merchant": biggest.get("merchant") or "",
-            "description": biggest.get("description") or "",
-            "category": biggest.get("category") or "Other",
-            "amount": round(amount(biggest), 2),
-        }
-
-    # Stats for all-time queries
-    highest_month = None
-    average_monthly = None
-    
-    if monthly_totals:
-        max_m = max(monthly_totals, key=monthly_totals.get)
-        highest_month = {"month": max_m, "amount": round(monthly_totals[max_m], 2)}
-        average_monthly = round(total_spent / len(monthly_totals), 2)
-
     return {
-        "period": {"year": y, "month": m} if y != 0 else "All Time",
+        "period": {"year": y, "month": m},
         "currency": "USD",
         "totalSpent": total_spent,
         "topCategories": top_categories,
-        "outlier": outlier,
-        "highestMonth": highest_month,
-        "averageMonthlySpend": average_monthly,
+        "outlier": _outlier(max(expenses, key=amount) if expenses else None),
+        "highestMonth": None,
+        "averageMonthlySpend": None,
+    }
+
+
+def _all_time_summary(rollup: MonthlyRollup) -> Dict[str, Any]:
+    with rollup.lock:
+        total_spent = round(rollup.total, 2)
+        highest = rollup.highest_month()
+        return {
+            "period": "All Time",
+            "currency": "USD",
+            "totalSpent": total_spent,
+            "topCategories": [{"category": c, "spent": round(v, 2)} for c, v in rollup.top_categories(3)],
+            "outlier": _outlier(rollup.largest),
+            "highestMonth": {"month": f"{highest[0][0]:04d}-{highest[0][1]:02d}", "amount": round(highest[1], 2)} if highest else None,
+            "averageMonthlySpend": round(total_spent / len(rollup.month_totals), 2) if highest else None,
+        }
+
+
+def _outlier(biggest: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if biggest is None:
+        return None
+    return {
+        "id": biggest.get("id"),
+        "date": biggest.get("date"),
+        "merchant": biggest.get("merchant") or "",
+        "description": biggest.get("description") or "",
+        "category": biggest.get("category") or "Other",
+        "amount": round(amount(biggest), 2),
     }
 
 
@@ -167,24 +149,8 @@ def get_budget_status(
     spent = float(spending["totalSpent"])
     budget = float(default_budget or 0.0)
 
-    last_day = calendar.monthrange(y, m)[1]
-    days_in_month = last_day
-
-    # If we're not in the system's current month, compute "as-of" as the last
-    # transaction date in that period to preserve mid-month behavior.
-    system_today = date.today()
-    if system_today.year == y and system_today.month == m:
-        as_of = system_today
-    else:
-        period_dates: List[date] = []
-        for t in filter_transactions_period(transactions, y, m):
-            try:
-                period_dates.append(parse_date(str(t.get("date", ""))))
-            except Exception:
-                continue
-        as_of = max(period_dates) if period_dates else date(y, m, 1)
-
-    days_remaining = max(0, (date(y, m, last_day) - as_of).days)
+    days_in_month = calendar.monthrange(y, m)[1]
+    days_remaining = _days_remaining(transactions, y, m)
 
     percent_used = (spent / budget * 100.0) if budget > 0 else None
 
@@ -196,13 +162,121 @@ def get_budget_status(
         "remaining": round(budget - spent, 2),
         "percentUsed": round(percent_used, 2) if percent_used is not None else None,
         "daysRemaining": int(days_remaining),
-        "avgDailySpendThisMonth": round(spent / max(1, days_in_month), 2),
+        "avgDailySpendThisMonth": round(spent / max(1, days_in_month - days_remaining), 2),
         "categoryBudgets": category_budgets,
         "topCategories": spending["topCategories"],
         "outlier": spending["outlier"],
     }
 
 
+def _days_remaining(transactions: List[Dict[str, Any]], y: int, m: int) -> int:
+    last_day = calendar.monthrange(y, m)[1]
+    return max(0, (date(y, m, last_day) - _period_as_of(transactions, y, m)).days)
+
+
+def _period_as_of(transactions: List[Dict[str, Any]], y: int, m: int) -> date:
+    # If we're not in the system's current month, compute "as-of" as the last
+    # transaction date in that period to preserve mid-month behavior.
+    system_today = date.today()
+    if system_today.year == y and system_today.month == m:
+        return system_today
+    period_dates: List[date] = []
+    for t in filter_transactions_period(transactions, y, m):
+        try:
+            period_dates.append(parse_date(str(t.get("date", ""))))
+        except Exception:
+            continue
+    return max(period_dates) if period_dates else date(y, m, 1)
+
+
+def get_budget_pacing(
+    transactions: List[Dict[str, Any]],
+    default_budget: float,
+    category_budgets: Dict[str, float],
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Burn rate, projected month-end spend and overrun date for every category
+    (and the month overall) in one call. Day-level spend comes from DailyRollup;
+    the projection adds the recurring bills still expected this month."""
+    y, m = resolve_period_for_transactions(transactions, year, month)
+    budgets: Dict[str, float] = {}
+    for name, value in (category_budgets or {}).items():
+        try:
+            budgets[str(name).strip()] = float(value)
+        except (TypeError, ValueError):
+            continue
+
+    def compute() -> Dict[str, Any]:
+        as_of = _period_as_of(transactions, y, m)
+        return _budget_pacing(transactions, float(default_budget or 0.0), budgets, y, m, as_of)
+
+    # The as-of day depends only on the data (cache version) and today's date,
+    # so it is worked out inside the cached compute rather than on every call.
+    key = ("budget_pacing", y, m, date.today(), float(default_budget or 0.0), tuple(sorted(budgets.items())))
+    out = _cached(transactions, key, compute)
+    return {**out, "overall": dict(out["overall"]), "categories": [dict(c) for c in out["categories"]]}
+
+
+def _budget_pacing(
+    transactions: List[Dict[str, Any]],
+    default_budget: float,
+    budgets: Dict[str, float],
+    y: int,
+    m: int,
+    as_of: date,
+) -> Dict[str, Any]:
+    days_in_month = calendar.monthrange(y, m)[1]
+    daily = DailyRollup.build(transactions).month(y, m)
+
+    # Recurring bills already paid this month don't count toward the burn rate.
+    recurring = {
+        str(r["merchant"]).strip().lower() for r in get_recurring_transactions(transactions, months_back=6)["recurring"]
+    }
+    committed: Dict[str, float] = {}
+    for t in filter_transactions_period(transactions, y, m):
+        if not is_expense(t) or str(t.get("merchant", "")).strip().lower() not in recurring:
+            continue
+        try:
+            if parse_date(str(t.get("date", ""))) > as_of:
+                continue
+        except ValueError:
+            continue
+        cat = (t.get("category") or "Other").strip() or "Other"
+        committed[cat] = committed.get(cat, 0.0) + amount(t)
+
+    bills: Dict[str, List[Tuple[int, float]]] = {}
+    for b in _get_projected_bills(transactions, y, m):
+        cat = (b.get("category") or "Other").strip() or "Other"
+        bills.setdefault(cat, []).append((int(b["date"][8:10]), amount(b)))
+
+    categories = []
+    for cat in sorted(set(daily) | set(budgets) | set(bills)):
+        pace = pace_month(
+            daily.get(cat) or [0.0] * days_in_month, as_of, budgets.get(cat), committed.get(cat, 0.0), bills.get(cat, ())
+        )
+        categories.append({"category": cat, **pace})
+    categories.sort(key=lambda c: c["projectedSpend"], reverse=True)
+
+    total_days = [sum(col, 0.0) for col in zip(*daily.values())] if daily else [0.0] * days_in_month
+    overall = pace_month(
+        total_days,
+        as_of,
+        default_budget if default_budget > 0 else None,
+        sum(committed.values(), 0.0),
+        [b for cat_bills in bills.values() for b in cat_bills],
+    )
+    return {
+        "period": {"year": y, "month": m},
+        "currency": "USD",
+        "asOf": as_of.isoformat(),
+        "daysElapsed": min(as_of.day, days_in_month),
+        "daysRemaining": max(0, days_in_month - as_of.day),
+        "overall": overall,
+        "categories": categories,
+    }
+
+
 def get_category_spend(
     transactions: List[Dict[str, Any]],
     category: str,
@@ -245,6 +319,10 @@ def get_transaction_detail(transactions: List[Dict[str, Any]], transaction_id: s
     return {"error": "Transaction not found"}
 
 
+# Months of history the forecasting models train on
+FORECAST_HISTORY_MONTHS = 24
+
+
 def forecast_category_spending(
     transactions: List[Dict[str, Any]],
     category: str,
@@ -253,39 +331,33 @@ def forecast_category_spending(
     month: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
-    Forecast spending for a category based on historical average.
+    Forecast next month's spending for a category.
     
     Args:
         transactions: List of all transactions
         category: Category name to forecast for
-        months_back: Number of months to look back (default 3 for quarter)
+        months_back: Number of months of history to report (default 3 for quarter)
         year: Optional year (if not specified, uses latest)
         month: Optional month (if not specified, uses latest)
     
     Returns:
-        Forecast object with historical average and predicted amount
+        Forecast object with the historical average and the forecast of the
+        best-backtesting model (see forecasting.py) with an 80% interval
     """
     y, m = resolve_period_for_transactions(transactions, year, month)
-    
-    # Collect spending for the past N months
+    rollup = MonthlyRollup.build(transactions)
+    cat = (category or "").strip().lower()
+
+    # Spending for the past N months, from the monthly rollup (no rescans)
     monthly_spends = []
     for i in range(months_back):
-        # Go back i months
-        check_month = m - i
-        check_year = y
-        
-        while check_month <= 0:
-            check_month += 12
-            check_year -= 1
-        
-        period_tx = filter_transactions_period(transactions, check_year, check_month)
-        cat = (category or "").strip().lower()
-        matches = [t for t in period_tx if is_expense(t) and str(t.get("category", "")).strip().lower() == cat]
-        spent = round(sum(amount(t) for t in matches), 2)
+        check_year, check_month = shift_month((y, m), -i)
+        with rollup.lock:
+            spent = sum(v for c, v in rollup.months.get((check_year, check_month), {}).items() if c.lower() == cat)
         monthly_spends.append({
             "year": check_year,
             "month": check_month,
-            "spent": spent
+            "spent": round(spent, 2)
         })
     
     # Calculate average
@@ -294,17 +366,69 @@ def forecast_category_spending(
     
     # Reverse to show chronologically
     monthly_spends.reverse()
-    
+
+    fc = _category_forecasts(transactions, y, m).get(cat)
     return {
         "category": category,
         "lookback_months": months_back,
         "historical_data": monthly_spends,
         "average_monthly_spend": average,
-        "forecasted_spend_next_month": average,
-        "confidence": "Medium" if months_back >= 3 else "Low",
+        "forecasted_spend_next_month": fc["forecast"] if fc else average,
+        "prediction_interval": {"lower": fc["lower"], "upper": fc["upper"], "level": 0.8} if fc else None,
+        "model": fc["model"] if fc else "mean",
+        "confidence": fc["confidence"] if fc else ("Medium" if months_back >= 3 else "Low"),
+    }
+
+
+def get_category_forecasts(
+    transactions: List[Dict[str, Any]],
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Next-month forecasts for every category in one call, largest first."""
+    y, m = resolve_period_for_transactions(transactions, year, month)
+    ny, nm = shift_month((y, m), 1)
+    forecasts = sorted(_category_forecasts(transactions, y, m).values(), key=lambda f: f["forecast"], reverse=True)
+    return {
+        "period": {"year": y, "month": m},
+        "forecastFor": {"year": ny, "month": nm},
+        "currency": "USD",
+        "forecasts": [dict(f) for f in forecasts],
+        "note": "Each category uses the model (mean, exponential smoothing, seasonal naive, linear trend) with the lowest backtest error; intervals are 80%.",
     }
 
 
+def _category_forecasts(transactions: List[Dict[str, Any]], y: int, m: int) -> Dict[str, Dict[str, Any]]:
+    """Forecasts for all categories with history through (y, m), keyed by lowercased
+    category; cached per data version."""
+
+    def build() -> Dict[str, Dict[str, Any]]:
+        rollup = MonthlyRollup.build(transactions)
+        with rollup.lock:
+            first = rollup.first_month
+            if first is None or first > (y, m):
+                return {}
+            span = min(FORECAST_HISTORY_MONTHS, (y - first[0]) * 12 + (m - first[1]) + 1)
+            series = rollup.category_series((y, m), span)
+        out: Dict[str, Dict[str, Any]] = {}
+        for cat, history in series.items():
+            fc = forecast_next(history)
+            out[cat.lower()] = {
+                "category": cat,
+                "model": fc.model,
+                "forecast": round(fc.value, 2),
+                "lower": round(fc.lower, 2),
+                "upper": round(fc.upper, 2),
+                "backtestMae": round(fc.backtest_mae, 2) if fc.backtest_mae is not None else None,
+                "confidence": fc.confidence,
+                "lastMonthSpent": round(history[-1], 2),
+                "historyMonths": span,
+            }
+        return out
+
+    return _cached(transactions, ("category_forecasts", y, m), build)
+
+
 def get_cashflow_projection(
     transactions: List[Dict[str, Any]],
     year: Optional[int] = None,
@@ -312,103 +436,361 @@ def get_cashflow_projection(
     starting_balance: float = 0.0,
 ) -> Dict[str, Any]:
     y, m = resolve_period_for_transactions(transactions, year, month)
-    
-    # 1. Get real data
-    period_tx = filter_transactions_period(transactions, y, m)
-    
-    # 2. Get projected data (The "Smart" AI part)
-    projected_tx = _get_projected_bills(transactions, y, m)
-    
-    # Combine for calculation
-    all_tx = period_tx + projected_tx
+    series, projected_expenses_sum = _cashflow_series(transactions, y, m, starting_balance)
+    low_bal, low_ordinal, bal = series.with_expenses(())
+    return _cashflow_result(y, m, starting_balance, low_bal, low_ordinal, bal, projected_expenses_sum)
 
-    rows: List[Tuple[date, float, bool]] = []
-    for t in all_tx:
-        try:
-            dt = parse_date(str(t.get("date", "")))
-        except Exception:
-            continue
-        # Check if projected
-        is_proj = t.get("is_projected", False)
-        rows.append((dt, amount(t), is_proj))
 
-    rows.sort(key=lambda x: x[0])
+def _cashflow_series(
+    transactions: List[Dict[str, Any]], y: int, m: int, starting_balance: float
+) -> Tuple[BalanceSeries, float]:
+    """The month's balance series over real + projected rows, and the projected expense total."""
 
-    bal = float(starting_balance)
-    low_bal = bal
-    low_date: Optional[str] = None
-    
-    projected_expenses_sum = 0.0
-
-    for dt, amt, is_proj in rows:
-        # expenses positive => decrease balance; income negative => increase balance
-        bal += (-amt)
-        if bal < low_bal:
-            low_bal = bal
-            low_date = dt.isoformat()
-        
-        if is_proj and amt > 0:
-            projected_expenses_sum += amt
+    def build() -> Tuple[BalanceSeries, float]:
+        # 1. Get real data
+        period_tx = filter_transactions_period(transactions, y, m)
+        # 2. Get projected data (The "Smart" AI part)
+        projected_tx = _get_projected_bills(transactions, y, m)
+
+        events: List[Tuple[int, float]] = []
+        for t in period_tx + projected_tx:
+            try:
+                events.append((parse_date(str(t.get("date", ""))).toordinal(), amount(t)))
+            except Exception:
+                continue
+        projected_sum = sum((amount(t) for t in projected_tx if amount(t) > 0), 0.0)
+        return BalanceSeries(events, starting_balance), projected_sum
+
+    return _cached(transactions, ("cashflow_series", y, m, float(starting_balance)), build)
 
+
+def _cashflow_result(
+    y: int,
+    m: int,
+    starting_balance: float,
+    low_bal: float,
+    low_ordinal: Optional[int],
+    bal: float,
+    projected_expenses_sum: float,
+) -> Dict[str, Any]:
     return {
         "period": {"year": y, "month": m},
         "currency": "USD",
         "startingBalance": round(float(starting_balance), 2),
         "lowestBalance": round(float(low_bal), 2),
-        "lowestBalanceDate": low_date,
+        "lowestBalanceDate": date.fromordinal(low_ordinal).isoformat() if low_ordinal is not None else None,
         "endingBalance": round(float(bal), 2),
         "projectedMissingBills": round(projected_expenses_sum, 2),
         "note": "Projection is based only on imported transactions; it is not linked to your real bank balance.",
     }
 
 
-def simulate_purchase(
+MAX_FORECAST_MONTHS = 12
+
+
+def get_cashflow_forecast(
+    transactions: List[Dict[str, Any]],
+    months: int = 3,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    starting_balance: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    Daily balance from the first day of (year, month) through `months` calendar
+    months: imported transactions where we have them, then projected recurring
+    bills and income. Cached per (period, months, starting balance, data version).
+    """
+    y, m = resolve_period_for_transactions(transactions, year, month)
+    months = max(1, min(MAX_FORECAST_MONTHS, int(months or 1)))
+    key = ("cashflow_forecast", y, m, months, float(starting_balance))
+    return dict(_cached(transactions, key, lambda: _cashflow_forecast(transactions, y, m, months, starting_balance)))
+
+
+def _cashflow_forecast(
+    transactions: List[Dict[str, Any]], y: int, m: int, months: int, starting_balance: float
+) -> Dict[str, Any]:
+    index = DateIndex.build(transactions)
+    first = date(y, m, 1)
+    month_starts = [add_months(first, i) for i in range(months + 1)]
+    days = (month_starts[-1] - first).days
+
+    events: List[Tuple[int, float]] = []
+    projected: List[Tuple[float, float]] = []
+    for d in month_starts[:-1]:
+        bills = _get_projected_bills(transactions, d.year, d.month)
+        income = _get_projected_income(transactions, d.year, d.month)
+        for t in index.month(d.year, d.month) + bills + income:
+            try:
+                events.append((parse_date(str(t.get("date", ""))).toordinal(), amount(t)))
+            except Exception:
+                continue
+        projected.append((sum((amount(t) for t in bills), 0.0), sum((-amount(t) for t in income), 0.0)))
+    balances = daily_balances(events, first.toordinal(), days, starting_balance)
+
+    def lowest(a: int, b: int, reference: float) -> Tuple[float, Optional[str]]:
+        # Same convention as get_cashflow_projection: no date unless it dips below the reference
+        low = min(balances[a:b])
+        if low >= reference:
+            return reference, None
+        return low, (first + timedelta(days=a + balances[a:b].index(low))).isoformat()
+
+    by_month = []
+    opening = float(starting_balance)
+    for i, d in enumerate(month_starts[:-1]):
+        a, b = (d - first).days, (month_starts[i + 1] - first).days
+        low, low_date = lowest(a, b, opening)
+        by_month.append({
+            "year": d.year,
+            "month": d.month,
+            "startingBalance": round(opening, 2),
+            "endingBalance": round(balances[b - 1], 2),
+            "lowestBalance": round(low, 2),
+            "lowestBalanceDate": low_date,
+            "projectedBills": round(projected[i][0], 2),
+            "projectedIncome": round(projected[i][1], 2),
+        })
+        opening = balances[b - 1]
+
+    low, low_date = lowest(0, days, float(starting_balance))
+    first_negative = next((i for i, bal in enumerate(balances) if bal < 0), None)
+    return {
+        "period": {"year": y, "month": m, "months": months},
+        "currency": "USD",
+        "startingBalance": round(float(starting_balance), 2),
+        "endingBalance": round(balances[-1], 2),
+        "lowestBalance": round(low, 2),
+        "lowestBalanceDate": low_date,
+        "firstNegativeDate": (first + timedelta(days=first_negative)).isoformat() if first_negative is not None else None,
+        "dataThrough": index.latest.isoformat() if index.latest else None,
+        "months": by_month,
+        # End-of-day balances, one per day from `start`
+        "daily": {"start": first.isoformat(), "balances": [round(bal, 2) for bal in balances]},
+        "note": "Projection is based only on imported transactions and detected recurring bills and income; it is not linked to your real bank balance.",
+    }
+
+
+# -----------------
+# What-if simulation
+# -----------------
+
+class _PeriodSpend(NamedTuple):
+    by_category: Dict[str, float]
+    total: float
+    biggest: Optional[Dict[str, Any]]
+    # Spend dated on or before the period's as-of day; excludes projected bills
+    to_date: float = 0.0
+
+
+def _add_spend(spend: _PeriodSpend, rows: List[Dict[str, Any]], as_of: Optional[date] = None) -> _PeriodSpend:
+    """`spend` with the expense rows in `rows` added; O(len(rows) + categories).
+
+    Rows dated on or before `as_of` also count towards `to_date`; with no
+    `as_of` (projected bills) none do.
+    """
+    by_cat = dict(spend.by_category)
+    total = spend.total
+    to_date = spend.to_date
+    biggest = spend.biggest
+    for t in rows:
+        if not is_expense(t):
+            continue
+        cat = (t.get("category") or "Other").strip() or "Other"
+        by_cat[cat] = by_cat.get(cat, 0.0) + amount(t)
+        total += amount(t)
+        if as_of is not None:
+            try:
+                if parse_date(str(t.get("date", ""))) <= as_of:
+                    to_date += amount(t)
+            except ValueError:
+                pass
+        if biggest is None or amount(t) > amount(biggest):
+            biggest = t
+    return _PeriodSpend(by_cat, total, biggest, to_date)
+
+
+def _budget_from_spend(
+    y: int,
+    m: int,
+    default_budget: float,
+    category_budgets: Dict[str, float],
+    spend: _PeriodSpend,
+    days_remaining: int,
+) -> Dict[str, Any]:
+    """Same shape as get_budget_status, from precomputed period totals."""
+    spent = round(spend.total, 2)
+    budget = float(default_budget or 0.0)
+    percent_used = (spent / budget * 100.0) if budget > 0 else None
+    top = sorted(spend.by_category.items(), key=lambda kv: kv[1], reverse=True)[:3]
+    biggest = spend.biggest
+    return {
+        "period": {"year": y, "month": m},
+        "currency": "USD",
+        "budget": round(budget, 2),
+        "spent": spent,
+        "remaining": round(budget - spent, 2),
+        "percentUsed": round(percent_used, 2) if percent_used is not None else None,
+        "daysRemaining": int(days_remaining),
+        # Projected bills are in `spent` but not yet paid, so they stay out of the daily average
+        "avgDailySpendThisMonth": round(spend.to_date / max(1, calendar.monthrange(y, m)[1] - days_remaining), 2),
+        "categoryBudgets": category_budgets,
+        "topCategories": [{"category": c, "spent": round(v, 2)} for c, v in top],
+        "outlier": {
+            "id": biggest.get("id"),
+            "date": biggest.get("date"),
+            "merchant": biggest.get("merchant") or "",
+            "description": biggest.get("description") or "",
+            "category": biggest.get("category") or "Other",
+            "amount": round(amount(biggest), 2),
+        } if biggest is not None else None,
+    }
+
+
+def _simulation_baseline(transactions: List[Dict[str, Any]], y: int, m: int) -> Tuple[_PeriodSpend, int, date]:
+    """Period spend over real + projected bills, days remaining and the as-of day; cached per data version."""
+
+    def build() -> Tuple[_PeriodSpend, int, date]:
+        as_of = _period_as_of(transactions, y, m)
+        spend = _add_spend(_PeriodSpend({}, 0.0, None), filter_transactions_period(transactions, y, m), as_of)
+        spend = _add_spend(spend, _get_projected_bills(transactions, y, m))
+        days_remaining = max(0, (date(y, m, calendar.monthrange(y, m)[1]) - as_of).days)
+        return spend, days_remaining, as_of
+
+    return _cached(transactions, ("simulation_baseline", y, m), build)
+
+
+def _simulation_date(latest: Optional[date], y: int, m: int) -> date:
+    """'Today' for a simulated purchase: the latest data date, kept inside the simulated month."""
+    base = latest or date.today()
+    if (base.year, base.month) == (y, m):
+        return base
+    if (base.year, base.month) < (y, m):
+        return date(y, m, 1)
+    return date(y, m, calendar.monthrange(y, m)[1])
+
+
+def _scenario_purchases(scenario: Dict[str, Any], default_date: date) -> List[Dict[str, Any]]:
+    """A scenario's purchases as transaction rows; accepts {"purchases": [...]} or a single purchase.
+
+    Raises ValueError for a purchase that is not an object or whose amount is
+    not a finite number.
+    """
+    items = scenario.get("purchases")
+    if not isinstance(items, list):
+        items = [scenario]
+    rows = []
+    for n, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"purchase {n} must be an object")
+        try:
+            amt = abs(float(item.get("amount") or 0.0))
+        except (TypeError, ValueError):
+            raise ValueError(f"purchase {n}: amount must be a number") from None
+        if not math.isfinite(amt):
+            raise ValueError(f"purchase {n}: amount must be a number")
+        try:
+            dt = parse_date(str(item["date"])) if item.get("date") else default_date
+        except ValueError:
+            dt = default_date
+        rows.append({
+            "date": dt.isoformat(),
+            "merchant": str(item.get("merchant") or "Simulated Purchase"),
+            "amount": amt,
+            "category": str(item.get("category") or "Other"),
+            "description": "Simulated purchase for affordability check",
+        })
+    return rows
+
+
+def simulate_scenarios(
     transactions: List[Dict[str, Any]],
     default_budget: float,
     category_budgets: Dict[str, float],
-    amount_value: float,
-    category: str,
+    scenarios: List[Dict[str, Any]],
     year: Optional[int] = None,
     month: Optional[int] = None,
     starting_balance: float = 0.0,
 ) -> Dict[str, Any]:
+    """
+    Budget and cashflow for the month with each scenario's hypothetical purchases.
+
+    The baseline (real data + projected bills) is computed once and cached per
+    data version; each scenario is applied to it as an overlay, without copying
+    the transaction history. Purchases dated outside the month are ignored.
+    Raises ValueError, naming the scenario, for an invalid purchase.
+    """
     y, m = resolve_period_for_transactions(transactions, year, month)
-    
-    # We now base the simulation on (Real Data + Projected Bills)
+
+    # We base the simulation on (Real Data + Projected Bills)
     # This prevents the AI from saying "Yes" just because rent hasn't posted yet.
-    projected = _get_projected_bills(transactions, y, m)
-    temp_list = transactions + projected
+    spend, days_remaining, as_of = _simulation_baseline(transactions, y, m)
+    series, projected_sum = _cashflow_series(transactions, y, m, starting_balance)
+    default_date = _simulation_date(DateIndex.build(transactions).latest, y, m)
+
+    def evaluate(purchases: List[Dict[str, Any]]) -> Dict[str, Any]:
+        in_period = [p for p in purchases if p["date"][:7] == f"{y:04d}-{m:02d}"]
+        extra = [(date.fromisoformat(p["date"]).toordinal(), p["amount"]) for p in in_period]
+        low_bal, low_ordinal, bal = series.with_expenses(extra)
+        return {
+            "budget": _budget_from_spend(y, m, default_budget, category_budgets, _add_spend(spend, in_period, as_of), days_remaining),
+            "cashflow": _cashflow_result(y, m, starting_balance, low_bal, low_ordinal, bal, projected_sum),
+        }
 
-    status_before = get_budget_status(temp_list, default_budget, category_budgets, y, m)
-    
-    # Only supply starting_balance to cashflow if user provided it, otherwise it defaults 0
-    cash_before = get_cashflow_projection(temp_list, y, m, starting_balance=starting_balance)
+    results = []
+    for i, scenario in enumerate(scenarios):
+        label = str(scenario.get("label") or f"Scenario {i + 1}")
+        try:
+            purchases = _scenario_purchases(scenario, default_date)
+        except ValueError as exc:
+            raise ValueError(f"{label}: {exc}") from None
+        results.append({
+            "label": label,
+            "purchases": [
+                {"amount": round(p["amount"], 2), "category": p["category"], "date": p["date"]} for p in purchases
+            ],
+            **evaluate(purchases),
+        })
 
-    added = {
-        "date": date.today().isoformat(), # Simulate 'today'
-        "merchant": "Simulated Purchase",
-        "amount": abs(float(amount_value)),
-        "category": category,
-        "description": "Simulated purchase for affordability check",
+    return {
+        "period": {"year": y, "month": m},
+        "currency": "USD",
+        "analysis": "Projection includes estimated future bills based on history.",
+        "baseline": evaluate([]),
+        "scenarios": results,
     }
 
-    temp_list_with_purchase = [added, *temp_list]
-    
-    status_after = get_budget_status(temp_list_with_purchase, default_budget, category_budgets, y, m)
-    cash_after = get_cashflow_projection(temp_list_with_purchase, y, m, starting_balance=starting_balance)
 
+def simulate_purchase(
+    transactions: List[Dict[str, Any]],
+    default_budget: float,
+    category_budgets: Dict[str, float],
+    amount_value: float,
+    category: str,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    starting_balance: float = 0.0,
+) -> Dict[str, Any]:
+    out = simulate_scenarios(
+        transactions,
+        default_budget,
+        category_budgets,
+        [{"amount": amount_value, "category": category}],
+        year=year,
+        month=month,
+        starting_balance=starting_balance,
+    )
+    before, after = out["baseline"], out["scenarios"][0]
     return {
-        "period": {"year": y, "month": m},
+        "period": out["period"],
         "currency": "USD",
-        "purchase": {"amount": round(abs(float(amount_value)), 2), "category": category},
-        "analysis": "Projection includes estimated future bills based on history.",
+        "purchase": after["purchases"][0],
+        "analysis": out["analysis"],
         "budget": {
-            "before": status_before,
-            "after": status_after,
+            "before": before["budget"],
+            "after": after["budget"],
         },
         "cashflow": {
-            "before": cash_before,
-            "after": cash_after,
+            "before": before["cashflow"],
+            "after": after["cashflow"],
         },
     }
 
@@ -475,21 +857,24 @@ def detect_anomalies(
 ) -> Dict[str, Any]:
     y, m = resolve_period_for_transactions(transactions, year, month)
     period_tx = [t for t in filter_transactions_period(transactions, y, m) if is_expense(t)]
+    limit = max(1, int(limit))
 
     # 1. Top-N largest expenses
-    top = sorted(period_tx, key=lambda t: amount(t), reverse=True)[: max(1, int(limit))]
+    top = heapq.nlargest(limit, period_tx, key=amount)
 
     # 2. Frequent merchants (potential anomalies)
     counts = {}
     for t in period_tx:
         merch = (t.get("merchant") or "Unknown")
         counts[merch] = counts.get(merch, 0) + 1
-    
-    frequent = [
-        {"merchant": k, "count": v} 
-        for k, v in counts.items() if v >= 5
-    ]
-    frequent = sorted(frequent, key=lambda x: x["count"], reverse=True)[:3]
+
+    frequent = heapq.nlargest(3, ((k, v) for k, v in counts.items() if v >= 5), key=lambda kv: kv[1])
+
+    # 3. Amounts unusual for their merchant/category, and likely double charges
+    first = date(y, m, 1)
+    unusual, duplicates = AnomalyEngine.build(transactions).top(
+        first, date(y, m, calendar.monthrange(y, m)[1]), limit
+    )
 
     return {
         "period": {"year": y, "month": m},
@@ -505,8 +890,34 @@ def detect_anomalies(
             }
             for t in top
         ],
-        "highFrequency": frequent,
-        "method": "largest_expenses_and_frequency",
+        "highFrequency": [{"merchant": k, "count": v} for k, v in frequent],
+        "anomalies": unusual,
+        "duplicates": duplicates,
+        "method": "largest_expenses_frequency_and_robust_baselines",
+    }
+
+
+def find_anomalies(
+    transactions: List[Dict[str, Any]],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 10,
+) -> Dict[str, Any]:
+    # Scored anomalies for any date range. Scores come from the per-merchant and
+    # per-category baselines maintained as rows arrive (anomalies.py), so this
+    # only visits the flagged rows of the months in range.
+    latest = DateIndex.build(transactions).latest or date.today()
+    end = parse_date(end_date) if end_date else latest
+    start = parse_date(start_date) if start_date else date(end.year, end.month, 1)
+    if start > end:
+        start, end = end, start
+    unusual, duplicates = AnomalyEngine.build(transactions).top(start, end, max(1, int(limit)))
+    return {
+        "range": {"start": start.isoformat(), "end": end.isoformat()},
+        "currency": "USD",
+        "anomalies": unusual,
+        "duplicates": duplicates,
+        "threshold": ANOMALY_SCORE,
     }
 
 
@@ -514,108 +925,195 @@ def get_recurring_transactions(
     transactions: List[Dict[str, Any]],
     months_back: int = 4,
 ) -> Dict[str, Any]:
-    # Identify merchants that appear in >=3 distinct months with similar amounts
-    today = date.today()
-    window_start = date(today.year, max(1, today.month - months_back + 1), 1)
+    # Merchants charging a similar amount on a weekly/biweekly/monthly/annual
+    # cadence; detection is incremental and cached per data version (recurring.py).
+    # The window is the last `months_back` calendar months of the data, not of
+    # the system clock, so a stale import still has recurring bills.
+    anchor = DateIndex.build(transactions).latest or date.today()
+    window_start = month_window_start(anchor, months_back)
+
+    recurring = sorted(
+        recurring_patterns(transactions, window_start), key=lambda r: r["estimatedMonthly"], reverse=True
+    )[:10]
+    return {
+        "currency": "USD",
+        "recurring": recurring,
+        "note": "Recurring detection is heuristic: similar amounts at a regular weekly, biweekly, monthly or annual cadence.",
+    }
 
-    by_merchant: Dict[str, List[Dict[str, Any]]] = {}
-    for t in transactions:
-        try:
-            dt = parse_date(str(t.get("date", "")))
-        except Exception:
-            continue
-        if dt < window_start:
-            continue
-        if not is_expense(t):
-            continue
-        merch = (t.get("merchant") or "Unknown").strip() or "Unknown"
-        by_merchant.setdefault(merch, []).append(t)
 
-    recurring = []
-    for merch, txs in by_merchant.items():
-        months = {(parse_date(str(t.get("date"))).year, parse_date(str(t.get("date"))).month) for t in txs}
-        if len(months) < 3:
-            continue
-        amts = sorted([amount(t) for t in txs])
-        median = amts[len(amts) // 2]
-        # Similar if within 15% of median
-        similar = [t for t in txs if abs(amount(t) - median) <= max(1.0, 0.15 * median)]
-        if len(similar) < 3:
-            continue
-        recurring.append({
-            "merchant": merch,
-            "estimatedMonthly": round(median, 2),
-            "occurrences": len(similar),
-            "category": (similar[0].get("category") if similar else None),
-            # NEW: Capture the typical day of month for projection logic
-            "typicalDay": sorted([parse_date(str(t.get("date"))).day for t in txs])[len(txs)//2] 
+GOAL_SAVINGS_MONTHS = 6
+
+
+def get_goal_progress(
+    transactions: List[Dict[str, Any]],
+    goals: List[Dict[str, Any]],
+    months_back: int = GOAL_SAVINGS_MONTHS,
+) -> Dict[str, Any]:
+    """Savings rate from monthly net cashflow, and each goal's projected completion.
+
+    Monthly income and spend come from MonthlyRollup, so only the months
+    that changed are touched when transactions arrive; the result is cached
+    per data version and goal list.
+    """
+    normalized = [normalize_goal(g) for g in goals]
+    months_back = max(1, int(months_back))
+    key = (
+        "goal_progress",
+        months_back,
+        tuple((g["id"], g["targetAmount"], g["currentAmount"], g["targetDate"]) for g in normalized),
+    )
+    out = _cached(transactions, key, lambda: _goal_progress(transactions, normalized, months_back))
+    return {
+        **out,
+        "savings": {**out["savings"], "months": [dict(r) for r in out["savings"]["months"]]},
+        "goals": [dict(g) for g in out["goals"]],
+    }
+
+
+def _goal_progress(transactions: List[Dict[str, Any]], goals: List[Dict[str, Any]], months_back: int) -> Dict[str, Any]:
+    rollup = MonthlyRollup.build(transactions)
+    with rollup.lock:
+        inflows, month_totals = dict(rollup.inflows), dict(rollup.month_totals)
+    latest = DateIndex.build(transactions).latest
+    as_of = latest or date.today()
+
+    # Complete months only: the latest month counts once the data reaches its
+    # last day, the first once it starts on the 1st.
+    end = (as_of.year, as_of.month)
+    if as_of.day < calendar.monthrange(as_of.year, as_of.month)[1]:
+        end = shift_month(end, -1)
+    active = set(inflows) | set(month_totals)
+    first = min(active) if active else None
+    if first is not None:
+        parse = date_parser()
+        first_days = [d for d in (parse(str(t.get("date", ""))) for t in filter_transactions_period(transactions, *first)) if d]
+        if first_days and min(first_days).day > 1:
+            first = shift_month(first, 1)
+    window = [shift_month(end, i - months_back + 1) for i in range(months_back)]
+    window = [ym for ym in window if ym in active and ym >= first]
+    if not window and latest is not None:
+        window = [(as_of.year, as_of.month)]
+
+    months = []
+    for ym in window:
+        income = inflows.get(ym, 0.0)
+        spent = month_totals.get(ym, 0.0)
+        months.append({
+            "month": f"{ym[0]:04d}-{ym[1]:02d}",
+            "income": round(income, 2),
+            "expenses": round(spent, 2),
+            "net": round(income - spent, 2),
         })
+    avg_income = sum((inflows.get(ym, 0.0) for ym in window), 0.0) / len(window) if window else 0.0
+    avg_net = avg_income - (sum((month_totals.get(ym, 0.0) for ym in window), 0.0) / len(window) if window else 0.0)
 
-    recurring = sorted(recurring, key=lambda r: r["estimatedMonthly"], reverse=True)[:10]
+    planned = plan_goals(goals, avg_net, as_of)
     return {
+        "asOf": as_of.isoformat(),
         "currency": "USD",
-        "recurring": recurring,
-        "note": "Recurring detection is heuristic (hackathon-friendly).",
+        "savings": {
+            "monthlyIncome": round(avg_income, 2),
+            "monthlyNet": round(avg_net, 2),
+            "savingsRate": round(avg_net / avg_income * 100.0, 2) if avg_income > 0 else None,
+            "months": months,
+        },
+        "goals": planned,
+        "atRiskCount": sum(1 for g in planned if g["atRisk"]),
+        "note": "Average net savings of recent complete months are assumed to fill goals one at a time, earliest deadline first.",
     }
 
 
+def _cached(transactions: List[Dict[str, Any]], key: Tuple[Any, ...], compute: Callable[[], Any]) -> Any:
+    """compute(), memoized per data version when `transactions` is the store."""
+    return VersionedCache.build(transactions).get(key, compute)
+
+
 def _get_projected_bills(transactions: List[Dict[str, Any]], target_month_y: int, target_month_m: int) -> List[Dict[str, Any]]:
     """
     Internal helper: Generates 'ghost' transactions for the remainder of the month 
-    based on historical recurring patterns.
+    based on historical recurring patterns. Cached per (year, month, data version),
+    so cashflow and simulate calls on the same data share one projection.
     """
-    # 1. Detect recurring patterns from ALL history
-    recur_data = get_recurring_transactions(transactions, months_back=6)
-    recurring_rules = recur_data.get("recurring", [])
-    
-    # 2. Determine the analysis window (e.g., "Rest of Jan 2026")
-    today = date.today()
-    try:
-        latest_tx_date = parse_date(get_latest_transaction_date())
-        # Use the LATEST DATA DATE as 'today' for projection purposes
-        # This ensures that if data ends Jan 13, we project Jan 14-31
-        today = latest_tx_date
-    except:
-        pass
-    
+    key = ("projected_bills", target_month_y, target_month_m)
+    return list(_cached(transactions, key, lambda: _project_bills(transactions, target_month_y, target_month_m)))
+
+
+def _get_projected_income(transactions: List[Dict[str, Any]], target_month_y: int, target_month_m: int) -> List[Dict[str, Any]]:
+    """Like _get_projected_bills, for recurring deposits such as a salary (negative amounts)."""
+    key = ("projected_income", target_month_y, target_month_m)
+    return list(_cached(transactions, key, lambda: _project_bills(transactions, target_month_y, target_month_m, income=True)))
+
+
+def _project_bills(transactions: List[Dict[str, Any]], y: int, m: int, income: bool = False) -> List[Dict[str, Any]]:
+    # 1. Detect recurring patterns from recent history
+    if income:
+        anchor = DateIndex.build(transactions).latest or date.today()
+        recurring_rules = sorted(
+            recurring_patterns(transactions, month_window_start(anchor, 6), income=True),
+            key=lambda r: r["estimatedMonthly"],
+            reverse=True,
+        )[:10]
+    else:
+        recurring_rules = get_recurring_transactions(transactions, months_back=6).get("recurring", [])
+
+    # 2. Use the LATEST DATA DATE as 'today' for projection purposes.
+    # This ensures that if data ends Jan 13, we project Jan 14-31
+    index = DateIndex.build(transactions)
+    today = index.latest or date.today()
+
     # If target month is in the past relative to our 'today', no projection needed
-    if (target_month_y < today.year) or (target_month_y == today.year and target_month_m < today.month):
+    if (y, m) < (today.year, today.month):
         return []
 
-    # Identify what has ALREADY happened this month to avoid duplicates
-    current_month_txns = filter_transactions_period(transactions, target_month_y, target_month_m)
+    # What has ALREADY happened this month, computed once for all rules:
+    # merchants already paid, and the last day we have data for.
+    current_month_txns = index.month(y, m)
     already_paid_merchants = {str(t.get("merchant", "")).strip().lower() for t in current_month_txns}
-    
+    last_data_day = 0
+    for t in current_month_txns:
+        try:
+            last_data_day = max(last_data_day, parse_date(str(t.get("date", ""))).day)
+        except ValueError:
+            continue
+
+    month_start = date(y, m, 1)
+    month_end = date(y, m, calendar.monthrange(y, m)[1])
+
+    # 3. Generate missing bills on each rule's cadence, after the last data point
     ghost_txns = []
-    
-    # 3. Generate missing bills
     for rule in recurring_rules:
         merch = rule["merchant"]
-        if merch.strip().lower() in already_paid_merchants:
-            continue # Already paid this month
-            
-        typical_day = rule.get("typicalDay", 1)
-        
-        # Only project if the typical day is AFTER the latest data point we have for this month
-        dates_in_month = [parse_date(str(t["date"])) for t in current_month_txns]
-        last_data_in_month = max(dates_in_month) if dates_in_month else date(target_month_y, target_month_m, 1)
-        
-        if typical_day > last_data_in_month.day:
-            try:
-                # Handle simplified month lengths (Feb 30 -> Feb 28)
-                max_days = calendar.monthrange(target_month_y, target_month_m)[1]
-                safe_day = min(typical_day, max_days)
-                
+        cadence = rule.get("cadence", "monthly")
+        if cadence in ("weekly", "biweekly"):
+            step = 7 if cadence == "weekly" else 14
+            due = date.fromisoformat(rule["nextExpected"])
+            if due < month_start:
+                due += timedelta(days=step * -(-(month_start - due).days // step))
+            days = []
+            while due <= month_end:
+                days.append(due.day)
+                due += timedelta(days=step)
+        elif merch.strip().lower() in already_paid_merchants:
+            continue  # Already paid this month
+        elif cadence == "annual":
+            due = date.fromisoformat(rule["nextExpected"])
+            days = [due.day] if (due.year, due.month) == (y, m) else []
+        else:
+            # Handle short months (typical day 31 -> Feb 28)
+            days = [min(rule.get("typicalDay", 1), month_end.day)]
+
+        for day in days:
+            if day > last_data_day:
                 ghost_txns.append({
-                    "date": date(target_month_y, target_month_m, safe_day).isoformat(),
+                    "date": date(y, m, day).isoformat(),
                     "merchant": f"{merch} (Projected)",
-                    "amount": rule["estimatedMonthly"],
+                    "amount": -rule["amount"] if income else rule.get("amount", rule["estimatedMonthly"]),
                     "category": rule["category"],
                     "is_projected": True
                 })
-            except:
-                continue
-            
+
+    ghost_txns.sort(key=lambda t: t["date"])
     return ghost_txns
 
 
@@ -635,7 +1133,12 @@ DEDALUS_REASONER_MODEL = os.getenv(
 )
 
 
-async def dedalus_chat(messages: List[Dict[str, str]], model: str, temperature: float = 0.2) -> str:
+async def dedalus_chat(
+    messages: List[Dict[str, str]],
+    model: str,
+    temperature: float = 0.2,
+    budget: Optional[LatencyBudget] = None,
+) -> str:
     if not DEDALUS_API_KEY:
         raise RuntimeError("Missing DEDALUS_API_KEY")
 
@@ -650,11 +1153,20 @@ async def dedalus_chat(messages: List[Dict[str, str]], model: str, temperature:
         "Content-Type": "application/json",
     }
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        res = await client.post(url, headers=headers, json=payload)
-        res.raise_for_status()
-        data = res.json()
-
+    async def attempt(timeout: float) -> dict:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            res = await client.post(url, headers=headers, json=payload)
+            res.raise_for_status()
+            return res.json()
+
+    # One budget covers every call made for a chat request (planner + answer),
+    # so a slow provider can't stack two full timeouts.
+    data = await acall_with_resilience(
+        "dedalus-chat",
+        attempt,
+        budget or LatencyBudget(CHAT_BUDGET_S),
+        attempts=2,
+    )
     return data["choices"][0]["message"]["content"]
 
 
@@ -697,96 +1209,44 @@ def tier0_response(user_text: str) -> Optional[str]:
     return None
 
 
-def get_latest_transaction_date() -> str:
-    """Read data.json to find the latest transaction date."""
-    try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        data_path = os.path.join(base_dir, "data.json")
-        if not os.path.exists(data_path):
-            return date.today().isoformat()
-        
-        with open(data_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            transactions = data.get("transactions", [])
-            
-        if not transactions:
-            return date.today().isoformat()
-            
-        dates = []
-        for t in transactions:
-            try:
-                dt = parse_date(str(t.get("date", "")))
-                dates.append(dt)
-            except:
-                continue
-                
-        if dates:
-            return max(dates).isoformat()
-            
-    except Exception:
-        pass
-        
-    return date.today().isoformat()
+def get_latest_transaction_date(transactions: List[Dict[str, Any]]) -> str:
+    """The latest transaction date, or today when there is none."""
+    latest = DateIndex.build(transactions).latest
+    return (latest or date.today()).isoformat()
 
 
-def get_data_profile() -> str:
+def get_data_profile(transactions: List[Dict[str, Any]]) -> str:
     """
     Returns a string summarizing available data to guide the LLM.
     e.g. "Data available from 2025-11-01 to 2026-02-15. Active months: Nov 2025, Dec 2025, Jan 2026."
     """
-    try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        data_path = os.path.join(base_dir, "data.json")
-        if not os.path.exists(data_path):
-            return "No data available."
-
-        with open(data_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            transactions = data.get("transactions", [])
-
-        if not transactions:
-            return "No transactions found."
-
-        dates = []
-        
-        for t in transactions:
-            try:
-                dt = parse_date(str(t.get("date", "")))
-                dates.append(dt)
-            except:
-                continue
-
-        if not dates:
-            return "No valid dates found in transactions."
-
-        min_date = min(dates).isoformat()
-        max_date = max(dates).isoformat()
-        
-        # Sort months chronologically for the context
-        sorted_dates = sorted(list(dates))
-        month_list = []
-        seen = set()
-        for d in sorted_dates:
-            m_str = d.strftime("%b %Y")
-            if m_str not in seen:
-                month_list.append(m_str)
-                seen.add(m_str)
-
-        return (
-            f"Valid Data Range: {min_date} to {max_date}.\n"
-            f"Months with data: {', '.join(month_list)}.\n"
-            "IMPORTANT: Only create tool calls for months listed above. Do not hallucinate data for other months."
-        )
-
-    except Exception as e:
-        return "Could not determine data profile."
+    if not transactions:
+        return "No transactions found."
+
+    index = DateIndex.build(transactions)
+    with index.lock:
+        earliest, latest = index.earliest, index.latest
+    if earliest is None or latest is None:
+        return "No valid dates found in transactions."
+
+    # Months in chronological order for the context
+    month_list = [date(y, m, 1).strftime("%b %Y") for y, m in index.months()]
+    return (
+        f"Valid Data Range: {earliest.isoformat()} to {latest.isoformat()}.\n"
+        f"Months with data: {', '.join(month_list)}.\n"
+        "IMPORTANT: Only create tool calls for months listed above. Do not hallucinate data for other months."
+    )
 
 
-async def plan_tool_calls(user_text: str) -> dict:
+async def plan_tool_calls(
+    user_text: str,
+    transactions: List[Dict[str, Any]],
+    budget: Optional[LatencyBudget] = None,
+) -> dict:
     # 1. Get the anchor date (latest transaction)
-    current_reference_date = get_latest_transaction_date()
+    current_reference_date = get_latest_transaction_date(transactions)
     # 2. Get the specific availability profile
-    data_profile = get_data_profile()
+    data_profile = get_data_profile(transactions)
 
     system = (
         f"Current Date: {current_reference_date}\n"
@@ -801,14 +1261,16 @@ async def plan_tool_calls(user_text: str) -> dict:
         "- get_spending_summary(year?, month?) -> If no args, returns All Time stats.\n"
         "- search_transactions(query?, category?, start_date?, end_date?) -> Validates dates YYYY-MM-DD.\n"
         "- get_budget_status(year?, month?)\n"
+        "- get_budget_pacing(year?, month?) -> Per-category burn rate, projected month-end spend (incl. upcoming bills) and the date each budget would run out; use for 'am I on track' questions.\n"
         "- get_cashflow_projection(year?, month?, startingBalance?) -> Ask user for balance if possible.\n"
+        "- get_cashflow_forecast(months?, year?, month?, startingBalance?) -> Daily balance over several months incl. projected bills and salary; use for 'will I be short before payday' or multi-month questions.\n"
         "- get_category_spend(category, year?, month?)\n"
-        "- forecast_category_spending(category, months_back=3, year?, month?) -> Forecasts spending based on historical average.\n"
+        "- forecast_category_spending(category, months_back=3, year?, month?) -> Forecasts next month's spending (best of several models, with an 80% range).\n"
         "- get_transaction_detail(id)\n"
-        "- simulate_purchase(amount, category, year?, month?, startingBalance?)\n"
-        "- detect_anomalies(year?, month?, limit?)\n"
+        "- simulate_purchase(amount, category, year?, month?, startingBalance?) -> Or scenarios=[{label, purchases:[{amount, category, date?}]}] to compare several what-ifs at once.\n"
+        "- detect_anomalies(year?, month?, limit?) -> Largest expenses, amounts unusual for their merchant/category, and likely duplicate charges.\n"
         "- get_recurring_transactions()\n"
-        "- get_user_goals()\n"
+        "- get_user_goals() -> Goals with progress, savings rate from recent months, projected completion dates and at-risk flags.\n"
         "Output schema:\n"
         "{\n"
         "  \"tier\": 1 or 2,\n"
@@ -823,7 +1285,7 @@ async def plan_tool_calls(user_text: str) -> dict:
         {"role": "user", "content": user_text},
     ]
 
-    raw = await dedalus_chat(messages, model=DEDALUS_PLANNER_MODEL, temperature=0.0)
+    raw = await dedalus_chat(messages, model=DEDALUS_PLANNER_MODEL, temperature=0.0, budget=budget)
     obj = _extract_json_object(raw) or {"tier": 1, "calls": [], "answerStyle": "short"}
 
     if not isinstance(obj.get("calls"), list):
@@ -841,7 +1303,12 @@ async def plan_tool_calls(user_text: str) -> dict:
     return obj
 
 
-async def answer_with_facts(user_text: str, facts: Dict[str, Any], style: str = "short") -> str:
+async def answer_with_facts(
+    user_text: str,
+    facts: Dict[str, Any],
+    style: str = "short",
+    budget: Optional[LatencyBudget] = None,
+) -> str:
     system = (
         "You are a personal finance assistant. "
         "Never invent numbers; use FACTS_JSON only. "
@@ -856,4 +1323,190 @@ async def answer_with_facts(user_text: str, facts: Dict[str, Any], style: str =
         {"role": "user", "content": user_text},
     ]
 
-    return await dedalus_chat(messages, model=DEDALUS_REASONER_MODEL, temperature=0.2)
+    return await dedalus_chat(messages, model=DEDALUS_REASONER_MODEL, temperature=0.2, budget=budget)
+
+
+# -----------------
+# Local fallback (provider down, breaker open or budget spent)
+# -----------------
+
+_CATEGORY_ALIASES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("Groceries", ("grocery", "groceries", "supermarket")),
+    ("Dining & Coffee", ("dining", "restaurant", "coffee", "eating out", "food delivery", "takeout")),
+    ("Housing & Rent", ("rent", "housing", "mortgage", "home loan")),
+    ("Debt Payments", ("debt", "loan", "emi")),
+    ("Utilities & Bills", ("utilities", "utility", "bills", "electric", "internet", "phone bill")),
+    ("Transportation", ("transport", "transportation", "gas", "fuel", "uber", "lyft", "parking", "transit")),
+    ("Shopping", ("shopping", "amazon", "retail")),
+    ("Clothing", ("clothing", "clothes", "apparel")),
+    ("Entertainment", ("entertainment", "movies", "concert")),
+    ("Subscriptions", ("subscription", "subscriptions", "streaming")),
+    ("Health & Medical", ("health", "medical", "doctor", "pharmacy")),
+    ("Insurance", ("insurance",)),
+    ("Fitness & Wellness", ("fitness", "gym", "wellness")),
+    ("Education", ("education", "course", "tuition")),
+    ("Travel", ("travel", "hotel", "flight", "airfare")),
+    ("Pets", ("pet", "pets", "vet")),
+    ("Personal Care", ("personal care", "haircut", "salon", "barber")),
+]
+_CATEGORY_ALIAS_RES = [
+    (cat, re.compile(r"\b(?:" + "|".join(re.escape(a) for a in aliases) + r")\b"))
+    for cat, aliases in _CATEGORY_ALIASES
+]
+_AMOUNT_RE = re.compile(r"\$\s*(\d[\d,]*(?:\.\d{1,2})?)|(\d[\d,]*(?:\.\d{1,2})?)\s*(?:dollars|usd)\b")
+
+
+def _guess_category(t: str) -> Optional[str]:
+    for cat, pattern in _CATEGORY_ALIAS_RES:
+        if pattern.search(t):
+            return cat
+    return None
+
+
+def local_tool_plan(user_text: str) -> dict:
+    """Deterministic keyword router used when the LLM planner is unavailable."""
+    t = (user_text or "").strip().lower()
+    category = _guess_category(t)
+    am = _AMOUNT_RE.search(t)
+
+    if am and re.search(r"\b(afford|buy|purchase|spend)\b", t):
+        value = float((am.group(1) or am.group(2)).replace(",", ""))
+        call = {"tool": "simulate_purchase", "args": {"amount": value, "category": category or "Other"}}
+    elif re.search(r"\b(forecast|predict|next month)\b", t) and category:
+        call = {"tool": "forecast_category_spending", "args": {"category": category}}
+    elif re.search(r"\b(recurring|subscriptions?|repeat)\b", t):
+        call = {"tool": "get_recurring_transactions", "args": {}}
+    elif re.search(r"\b(unusual|anomal\w*|suspicious|largest|biggest|duplicate\w*|double[- ]charg\w*)\b", t):
+        call = {"tool": "detect_anomalies", "args": {}}
+    elif re.search(r"\b(cash ?flow|balance|run out|short|payday)\b", t) and re.search(r"\b(months|payday|until|before)\b", t):
+        call = {"tool": "get_cashflow_forecast", "args": {"months": 3}}
+    elif re.search(r"\b(cash ?flow|balance|run out|short)\b", t):
+        call = {"tool": "get_cashflow_projection", "args": {}}
+    elif re.search(r"\bgoals?\b", t):
+        call = {"tool": "get_user_goals", "args": {}}
+    elif re.search(r"\b(pac(e|ing)|burn rate|on track|overrun|over budget|run over)\b", t):
+        call = {"tool": "get_budget_pacing", "args": {}}
+    elif category:
+        call = {"tool": "get_category_spend", "args": {"category": category}}
+    elif re.search(r"\b(budget|on track|remaining|left)\b", t):
+        call = {"tool": "get_budget_status", "args": {}}
+    elif re.search(r"\b(all time|ever|highest|most expensive)\b", t):
+        call = {"tool": "get_spending_summary", "args": {}}
+    else:
+        call = {"tool": "get_budget_status", "args": {}}
+
+    return {"tier": 1, "calls": [call], "answerStyle": "short", "planner": "local"}
+
+
+def _fmt_money(v: Any) -> str:
+    try:
+        return f"${float(v):,.2f}"
+    except (TypeError, ValueError):
+        return "n/a"
+
+
+def _fmt_period(p: Any) -> str:
+    if isinstance(p, dict) and p.get("year") and p.get("month"):
+        return f"{calendar.month_name[int(p['month'])]} {int(p['year'])}"
+    return "all time"
+
+
+def local_answer(facts: Dict[str, Any]) -> str:
+    """Summarize tool results without an LLM (numbers come straight from FACTS)."""
+    lines: List[str] = []
+    for call in facts.get("calls") or []:
+        tool, out = call.get("tool"), call.get("result") or {}
+        if not isinstance(out, dict) or out.get("error"):
+            continue
+        if tool == "get_spending_summary":
+            tops = ", ".join(f"{c['category']} ({_fmt_money(c['spent'])})" for c in out.get("topCategories") or [])
+            lines.append(f"You spent {_fmt_money(out.get('totalSpent'))} ({_fmt_period(out.get('period'))}). Top categories: {tops or 'none'}.")
+            if out.get("highestMonth"):
+                lines.append(f"Highest month: {out['highestMonth']['month']} at {_fmt_money(out['highestMonth']['amount'])}.")
+        elif tool == "get_budget_status":
+            pct = out.get("percentUsed")
+            lines.append(
+                f"{_fmt_period(out.get('period'))}: spent {_fmt_money(out.get('spent'))} of {_fmt_money(out.get('budget'))}"
+                f" ({_fmt_money(out.get('remaining'))} remaining{f', {pct}% used' if pct is not None else ''}),"
+                f" {out.get('daysRemaining')} days left."
+            )
+        elif tool == "get_budget_pacing":
+            overall = out.get("overall") or {}
+            lines.append(
+                f"{_fmt_period(out.get('period'))}: spending {_fmt_money(overall.get('burnRate'))}/day, on pace for"
+                f" {_fmt_money(overall.get('projectedSpend'))} by month end"
+                + (f" (budget {_fmt_money(overall.get('budget'))})." if overall.get("budget") is not None else ".")
+            )
+            over = [c for c in out.get("categories") or [] if c.get("status") in ("over_budget", "projected_over")]
+            if over:
+                lines.append("Over or on pace to exceed budget: " + ", ".join(
+                    f"{c['category']} ({_fmt_money(c['projectedSpend'])} vs {_fmt_money(c['budget'])}"
+                    + (f", from {c['overrunDate']})" if c.get("overrunDate") else ")")
+                    for c in over
+                ) + ".")
+        elif tool == "get_category_spend":
+            lines.append(
+                f"{out.get('category')}: {_fmt_money(out.get('spent'))} across {out.get('transactionCount')} transactions"
+                f" in {_fmt_period(out.get('period'))}."
+            )
+        elif tool == "forecast_category_spending":
+            lines.append(f"Forecast for {out.get('category')} next month: {_fmt_money(out.get('forecasted_spend_next_month'))}.")
+        elif tool == "get_cashflow_projection":
+            lines.append(
+                f"Projected ending balance {_fmt_money(out.get('endingBalance'))}; lowest point {_fmt_money(out.get('lowestBalance'))}"
+                f"{' on ' + out['lowestBalanceDate'] if out.get('lowestBalanceDate') else ''}."
+            )
+        elif tool == "get_cashflow_forecast":
+            negative = out.get("firstNegativeDate")
+            lines.append(
+                f"Over the next {len(out.get('months') or [])} months your balance ends at {_fmt_money(out.get('endingBalance'))};"
+                f" lowest point {_fmt_money(out.get('lowestBalance'))}"
+                f"{' on ' + out['lowestBalanceDate'] if out.get('lowestBalanceDate') else ''}."
+                + (f" It first goes negative on {negative}." if negative else " It never goes negative.")
+            )
+        elif tool == "simulate_purchase" and "scenarios" in out:
+            base = (out.get("baseline") or {}).get("budget") or {}
+            for sc in out.get("scenarios") or []:
+                lines.append(
+                    f"{sc.get('label')}: remaining budget would go from {_fmt_money(base.get('remaining'))}"
+                    f" to {_fmt_money((sc.get('budget') or {}).get('remaining'))}, lowest balance"
+                    f" {_fmt_money((sc.get('cashflow') or {}).get('lowestBalance'))}."
+                )
+        elif tool == "simulate_purchase":
+            before = (out.get("budget") or {}).get("before") or {}
+            after = (out.get("budget") or {}).get("after") or {}
+            purchase = out.get("purchase") or {}
+            lines.append(
+                f"A {_fmt_money(purchase.get('amount'))} {purchase.get('category')} purchase would take your remaining budget"
+                f" from {_fmt_money(before.get('remaining'))} to {_fmt_money(after.get('remaining'))}."
+            )
+        elif tool == "detect_anomalies":
+            tops = ", ".join(f"{t.get('merchant')} ({_fmt_money(t.get('amount'))})" for t in out.get("highValue") or [])
+            lines.append(f"Largest expenses in {_fmt_period(out.get('period'))}: {tops or 'none'}.")
+            odd = ", ".join(f"{a.get('merchant')} ({_fmt_money(a.get('amount'))} on {a.get('date')})" for a in out.get("anomalies") or [])
+            if odd:
+                lines.append(f"Unusual for the merchant or category: {odd}.")
+            dups = ", ".join(f"{d.get('merchant')} ({_fmt_money(d.get('amount'))} on {d.get('date')})" for d in out.get("duplicates") or [])
+            if dups:
+                lines.append(f"Possible duplicate charges: {dups}.")
+        elif tool == "get_recurring_transactions":
+            recs = ", ".join(f"{r['merchant']} (~{_fmt_money(r['estimatedMonthly'])}/mo)" for r in (out.get("recurring") or [])[:5])
+            lines.append(f"Recurring charges: {recs or 'none detected'}.")
+        elif tool == "get_user_goals":
+            goals = out.get("goals") or []
+            names = ", ".join(
+                f"{g.get('name')} ({g.get('progressPercent')}%"
+                + (f", done by {g['projectedCompletion']}" if g.get("projectedCompletion") else "")
+                + (", at risk" if g.get("atRisk") else "")
+                + ")"
+                for g in goals
+            )
+            lines.append(f"You have {len(goals)} goal(s){': ' + names if names else ''}.")
+            rate = (out.get("savings") or {}).get("savingsRate")
+            if rate is not None:
+                lines.append(f"You've been saving {_fmt_money(out['savings'].get('monthlyNet'))}/month ({rate}% of income).")
+
+    if not lines:
+        lines.append("I couldn't compute an answer from your data right now.")
+    lines.append("(Quick answer: the AI assistant is temporarily unavailable.)")
+    return "\n".join(lines)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from operator import itemgetter
+from typing import Iterable, List, Optional, Tuple
+
+
+class BalanceSeries:
+    """Running balance over dated cash events, for lowest/ending balance queries.
+
+    Events are (date ordinal, amount) with the transaction sign convention:
+    expenses positive (balance goes down), income negative. Same-day events
+    keep their input order. A sparse table over the balances answers
+    "lowest point in a range" in O(1), so extra hypothetical expenses can be
+    evaluated against the baseline without rebuilding it (with_expenses).
+    """
+
+    def __init__(self, events: Iterable[Tuple[int, float]], start: float = 0.0):
+        events = sorted(events, key=itemgetter(0))
+        self.start = float(start)
+        self.ordinals: List[int] = [o for o, _ in events]
+        self.balances: List[float] = []
+        bal = self.start
+        for _, amt in events:
+            bal -= amt
+            self.balances.append(bal)
+
+        # _mins[k][i]: index of the lowest balance in [i, i + 2**k), earliest on ties
+        self._mins: List[List[int]] = [list(range(len(self.balances)))]
+        width = 1
+        while width * 2 <= len(self.balances):
+            prev = self._mins[-1]
+            self._mins.append([self._lower(prev[i], prev[i + width]) for i in range(len(prev) - width)])
+            width *= 2
+
+    @property
+    def end(self) -> float:
+        return self.balances[-1] if self.balances else self.start
+
+    def lowest(self) -> Tuple[float, Optional[int]]:
+        """(lowest balance, its date ordinal); the starting balance and None if it never dips below it."""
+        low, low_ordinal, _ = self.with_expenses(())
+        return low, low_ordinal
+
+    def with_expenses(self, extra: Iterable[Tuple[int, float]]) -> Tuple[float, Optional[int], float]:
+        """(lowest, lowest date ordinal, ending balance) with `extra` expenses added.
+
+        An extra expense lands before the baseline events of its day. Costs
+        O(k log n) for k extras; the baseline is not copied.
+        """
+        low, low_ordinal = self.start, None
+        shift = 0.0
+        pos = 0
+        for ordinal, amt in sorted(extra, key=itemgetter(0)):
+            idx = bisect_left(self.ordinals, ordinal)
+            low, low_ordinal = self._scan(pos, idx, shift, low, low_ordinal)
+            shift += amt
+            bal = (self.balances[idx - 1] if idx else self.start) - shift
+            if bal < low:
+                low, low_ordinal = bal, ordinal
+            pos = idx
+        low, low_ordinal = self._scan(pos, len(self.balances), shift, low, low_ordinal)
+        return low, low_ordinal, self.end - shift
+
+    def _lower(self, i: int, j: int) -> int:
+        return j if self.balances[j] < self.balances[i] else i
+
+    def _scan(self, a: int, b: int, shift: float, low: float, low_ordinal: Optional[int]) -> Tuple[float, Optional[int]]:
+        if a >= b:
+            return low, low_ordinal
+        k = (b - a).bit_length() - 1
+        i = self._lower(self._mins[k][a], self._mins[k][b - (1 << k)])
+        if self.balances[i] - shift < low:
+            return self.balances[i] - shift, self.ordinals[i]
+        return low, low_ordinal
+
+
+def daily_balances(events: Iterable[Tuple[int, float]], first: int, days: int, start: float = 0.0) -> array:
+    """End-of-day balances for `days` days from ordinal `first`.
+
+    Events are bucketed into a per-day net flow, and the balance is the
+    running sum of those buckets (itertools.accumulate over an array, so the
+    per-day work runs in C). Events outside the range are ignored.
+    """
+    net = array('d', bytes(8 * days))
+    for ordinal, amt in events:
+        i = ordinal - first
+        if 0 <= i < days:
+            net[i] -= amt
+    return array('d', accumulate(net, initial=float(start)))[1:]
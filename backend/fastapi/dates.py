@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import calendar
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from store import StoreView
+
+
+def parse_date(value: str) -> date:
+    v = (value or "").strip()
+    # Stored transactions are ISO; skip strptime for them.
+    if len(v) == 10 and v[4] == "-" and v[7] == "-":
+        try:
+            return date.fromisoformat(v)
+        except ValueError:
+            pass
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y"):
+        try:
+            return datetime.strptime(v, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {value}")
+
+
+def date_parser() -> Callable[[str], Optional[date]]:
+    """parse_date for one batch of rows: memoized, since a history has few
+    distinct dates, and returning None for unparseable values."""
+    cache: Dict[str, Optional[date]] = {}
+
+    def parse(raw: str) -> Optional[date]:
+        if raw in cache:
+            return cache[raw]
+        try:
+            dt = parse_date(raw)
+        except ValueError:
+            dt = None
+        cache[raw] = dt
+        return dt
+
+    return parse
+
+
+def add_months(d: date, months: int) -> date:
+    """`d` moved by whole calendar months, clamped to the target month's last day."""
+    y, m = divmod(d.year * 12 + (d.month - 1) + months, 12)
+    return date(y, m + 1, min(d.day, calendar.monthrange(y, m + 1)[1]))
+
+
+Month = Tuple[int, int]
+
+
+def shift_month(ym: Month, months: int) -> Month:
+    """(year, month) moved by whole months."""
+    y, m = divmod(ym[0] * 12 + ym[1] - 1 + months, 12)
+    return y, m + 1
+
+
+def month_window_start(anchor: date, months: int) -> date:
+    """First day of the `months`-long window of calendar months ending with `anchor`'s month."""
+    return add_months(anchor.replace(day=1), -(max(1, months) - 1))
+
+
+class DateIndex(StoreView):
+    """Rows bucketed by (year, month), and the earliest and latest transaction dates."""
+
+    def reset(self) -> None:
+        self._months: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+        self.earliest: Optional[date] = None
+        self.latest: Optional[date] = None
+
+    def ingest(self, rows: Iterable[Dict[str, Any]]) -> None:
+        parse = date_parser()
+        earliest, latest = self.earliest, self.latest
+        for t in rows:
+            dt = parse(str(t.get("date", "")))
+            if dt is None:
+                continue
+            self._months.setdefault((dt.year, dt.month), []).append(t)
+            if latest is None or dt > latest:
+                latest = dt
+            if earliest is None or dt < earliest:
+                earliest = dt
+        self.earliest, self.latest = earliest, latest
+
+    def months(self) -> List[Month]:
+        """(year, month) of every month with at least one row, oldest first."""
+        with self.lock:
+            return sorted(self._months)
+
+    def month(self, year: int, month: int) -> List[Dict[str, Any]]:
+        """The month's rows, newest first like the store."""
+        with self.lock:
+            return self._months.get((year, month), [])[::-1]
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Dict, Optional
+
+
+def _norm_text(value: Optional[str]) -> str:
+    if value is None:
+        return ''
+    return ' '.join(str(value).strip().lower().split())
+
+
+def _amount_key(value: Any) -> str:
+    try:
+        d = Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        # Normalize -0.00 -> 0.00
+        if d == Decimal('-0.00'):
+            d = Decimal('0.00')
+        return format(d, 'f')
+    except (InvalidOperation, ValueError, TypeError):
+        return '0.00'
+
+
+def tx_fingerprint_from_parts(date: str, merchant: str, amount: Any, description: Optional[str]) -> str:
+    # Purpose: stable de-dupe key across repeated imports.
+    # Intentionally excludes category so category mapping improvements can upsert.
+    return '|'.join(
+        [
+            str(date or '').strip(),
+            _norm_text(merchant),
+            _amount_key(amount),
+            _norm_text(description),
+        ]
+    )
+
+
+def tx_fingerprint(t: Dict[str, Any]) -> str:
+    return tx_fingerprint_from_parts(
+        t.get('date', ''),
+        t.get('merchant', ''),
+        t.get('amount', 0),
+        t.get('description'),
+    )
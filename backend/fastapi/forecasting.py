@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import math
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+
+# One-step-ahead forecasters over a monthly series (oldest first). Each returns
+# None when the history is too short for it.
+
+SEASON = 12
+_SES_ALPHAS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+_Z80 = 1.2816  # two-sided 80% interval
+BACKTEST_POINTS = 6
+MIN_TRAIN = 3
+
+
+def mean_model(history: Sequence[float]) -> Optional[float]:
+    """Mean of the last three months (the previous forecast_category_spending)."""
+    recent = history[-3:]
+    return sum(recent) / len(recent) if recent else None
+
+
+def _ses_sse(history: Sequence[float], alpha: float) -> float:
+    level = history[0]
+    sse = 0.0
+    for x in history[1:]:
+        sse += (x - level) ** 2
+        level += alpha * (x - level)
+    return sse
+
+
+def ses_model(history: Sequence[float]) -> Optional[float]:
+    """Simple exponential smoothing, alpha picked by in-sample one-step error."""
+    if len(history) < 2:
+        return None
+    alpha = min(_SES_ALPHAS, key=lambda a: _ses_sse(history, a))
+    level = history[0]
+    for x in history[1:]:
+        level += alpha * (x - level)
+    return level
+
+
+def seasonal_naive_model(history: Sequence[float]) -> Optional[float]:
+    """Same month last year."""
+    return history[-SEASON] if len(history) >= SEASON else None
+
+
+def linear_trend_model(history: Sequence[float]) -> Optional[float]:
+    """Least-squares line over the last year, extended one month."""
+    ys = history[-SEASON:]
+    n = len(ys)
+    if n < 3:
+        return None
+    x_mean = (n - 1) / 2
+    y_mean = sum(ys) / n
+    sxx = sum((x - x_mean) ** 2 for x in range(n))
+    slope = sum((x - x_mean) * (y - y_mean) for x, y in enumerate(ys)) / sxx
+    return max(0.0, y_mean + slope * (n - x_mean))
+
+
+# Simplest first: ties go to the earlier model.
+MODELS: Dict[str, Callable[[Sequence[float]], Optional[float]]] = {
+    'mean': mean_model,
+    'exponential_smoothing': ses_model,
+    'seasonal_naive': seasonal_naive_model,
+    'linear_trend': linear_trend_model,
+}
+
+
+class Forecast(NamedTuple):
+    model: str
+    value: float
+    lower: float
+    upper: float
+    backtest_mae: Optional[float]
+    confidence: str
+
+
+def forecast_next(history: Sequence[float]) -> Forecast:
+    """Forecast the month after `history` with the model that did best on a
+    rolling-origin backtest of its last few months.
+
+    The 80% interval is value +/- 1.28 x the backtest RMSE (normal errors),
+    floored at zero since spend can't be negative.
+    """
+    n = len(history)
+    points = min(BACKTEST_POINTS, n - MIN_TRAIN)
+    best_name, best_errors = 'mean', None
+    if points > 0:
+        best_mae = math.inf
+        for name, model in MODELS.items():
+            errors: List[float] = []
+            for t in range(n - points, n):
+                pred = model(history[:t])
+                if pred is None:
+                    break
+                errors.append(history[t] - pred)
+            if len(errors) < points:
+                continue  # not enough history for this model at every origin
+            mae = sum(abs(e) for e in errors) / points
+            if mae < best_mae:
+                best_name, best_errors, best_mae = name, errors, mae
+
+    value = MODELS[best_name](history)
+    if value is None:
+        value = 0.0
+    value = max(0.0, value)
+
+    if best_errors:
+        mae: Optional[float] = sum(abs(e) for e in best_errors) / len(best_errors)
+        spread = math.sqrt(sum(e * e for e in best_errors) / len(best_errors))
+        scale = max(1.0, sum(abs(x) for x in history) / n)
+        rel = mae / scale
+        confidence = 'High' if rel < 0.25 else 'Medium' if rel < 0.5 else 'Low'
+    else:
+        # Too short to backtest: fall back to the spread of what we have.
+        mae = None
+        mean = sum(history) / n if n else 0.0
+        spread = math.sqrt(sum((x - mean) ** 2 for x in history) / n) if n > 1 else value * 0.5
+        confidence = 'Low'
+
+    return Forecast(
+        model=best_name,
+        value=value,
+        lower=max(0.0, value - _Z80 * spread),
+        upper=value + _Z80 * spread,
+        backtest_mae=mae,
+        confidence=confidence,
+    )
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import uuid
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from dates import parse_date
+
+
+_MONTH_DAYS = 30.44
+
+
+def normalize_goal(g: Dict[str, Any]) -> Dict[str, Any]:
+    """A stored goal in the API's camelCase shape.
+
+    Files written by enrich_data.py use target_amount/current_amount/deadline
+    and have no id; those get a stable id derived from the name.
+    """
+    name = str(g.get('name') or 'Goal')
+    return {
+        'id': str(g.get('id') or uuid.uuid5(uuid.NAMESPACE_DNS, f'goal:{name}').hex),
+        'name': name,
+        'targetAmount': _number(g, 'targetAmount', 'target_amount'),
+        'currentAmount': _number(g, 'currentAmount', 'current_amount'),
+        'targetDate': g.get('targetDate') or g.get('target_date') or g.get('deadline'),
+        'note': g.get('note'),
+        'createdAt': g.get('createdAt') or g.get('created_at'),
+    }
+
+
+def plan_goals(goals: Iterable[Dict[str, Any]], monthly_savings: float, as_of: date) -> List[Dict[str, Any]]:
+    """Progress, projected completion and risk for normalized goals, in deadline order.
+
+    Savings are assumed to fill goals one at a time, earliest deadline first
+    (undated goals last): a goal completes once the savings after `as_of`
+    cover its own shortfall and that of every goal due before it.
+    """
+    ordered = sorted(goals, key=lambda g: (_deadline(g) is None, _deadline(g) or date.max))
+    queued = 0.0
+    out: List[Dict[str, Any]] = []
+    for g in ordered:
+        target, current = g['targetAmount'], g['currentAmount']
+        remaining = max(0.0, target - current)
+        deadline = _deadline(g)
+        queued += remaining
+
+        if remaining == 0:
+            projected: Optional[date] = as_of
+        elif monthly_savings > 0:
+            projected = as_of + timedelta(days=round(queued / monthly_savings * _MONTH_DAYS))
+        else:
+            projected = None  # not saving: never, at the current rate
+
+        months_left = (deadline - as_of).days / _MONTH_DAYS if deadline else None
+        if remaining == 0:
+            status = 'complete'
+        elif deadline is None:
+            status = 'no_deadline'
+        elif projected is None or projected > deadline:
+            status = 'at_risk'
+        else:
+            status = 'on_track'
+
+        out.append({
+            **g,
+            'remaining': round(remaining, 2),
+            'progressPercent': round(min(100.0, current / target * 100.0), 2) if target > 0 else None,
+            'requiredMonthly': round(remaining / max(1.0, months_left), 2) if months_left is not None else None,
+            'projectedCompletion': projected.isoformat() if projected else None,
+            'status': status,
+            'atRisk': status == 'at_risk',
+        })
+    return out
+
+
+def _number(g: Dict[str, Any], *keys: str) -> float:
+    for key in keys:
+        try:
+            return float(g[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return 0.0
+
+
+def _deadline(g: Dict[str, Any]) -> Optional[date]:
+    try:
+        return parse_date(str(g.get('targetDate') or ''))
+    except ValueError:
+        return None
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import queue
+import sqlite3
+import threading
+import traceback
+import uuid
+from contextlib import closing, contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Union
+
+
+# A handler receives the raw payload bytes plus the JSON metadata submitted with
+# the job and returns a JSON-serializable result. Async handlers are supported
+# (the receipt extractor is async) and run on a private event loop per worker.
+JobHandler = Callable[[bytes, Dict[str, Any]], Union[Any, Awaitable[Any]]]
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    meta TEXT NOT NULL,
+    payload BLOB,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class JobQueue:
+    """In-process job queue with a worker thread pool and SQLite persistence.
+
+    Jobs are written to SQLite before they are acknowledged, so anything still
+    queued (or interrupted mid-run) when the process stops is picked up again
+    by the next start().
+    """
+
+    def __init__(self, db_path: Path, workers: int = 2):
+        self.db_path = Path(db_path)
+        self.workers = max(1, int(workers))
+        self._handlers: Dict[str, JobHandler] = {}
+        self._pending: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._started = False
+        self._init_db()
+
+    # -------- persistence --------
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits (or rolls back) and is closed on exit.
+
+        sqlite3's own context manager only ends the transaction, which would
+        leave one open connection per call until garbage collection.
+        """
+        with closing(sqlite3.connect(str(self.db_path), timeout=30.0)) as conn:
+            conn.row_factory = sqlite3.Row
+            with conn:
+                yield conn
+
+    def _init_db(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    @staticmethod
+    def _row_to_status(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "createdAt": row["created_at"],
+            "startedAt": row["started_at"],
+            "finishedAt": row["finished_at"],
+            "error": row["error"],
+        }
+
+    # -------- public API --------
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, payload: bytes = b"", meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, meta, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, STATUS_QUEUED, json.dumps(meta or {}), sqlite3.Binary(payload), _now()),
+            )
+        self._pending.put(job_id)
+        return self.get(job_id) or {"id": job_id, "kind": kind, "status": STATUS_QUEUED}
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, created_at, started_at, finished_at, error FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        return self._row_to_status(row) if row else None
+
+    def result(self, job_id: str) -> Any:
+        with self._connect() as conn:
+            row = conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row["result"] is None:
+            return None
+        return json.loads(row["result"])
+
+    def metrics(self) -> Dict[str, Any]:
+        counts = {STATUS_QUEUED: 0, STATUS_RUNNING: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        with self._connect() as conn:
+            for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+                counts[row["status"]] = int(row["n"])
+            oldest = conn.execute(
+                "SELECT MIN(created_at) AS ts FROM jobs WHERE status = ?", (STATUS_QUEUED,)
+            ).fetchone()["ts"]
+        return {
+            "queueDepth": counts[STATUS_QUEUED],
+            "running": counts[STATUS_RUNNING],
+            "done": counts[STATUS_DONE],
+            "failed": counts[STATUS_FAILED],
+            "oldestQueuedAt": oldest,
+            "workers": self.workers,
+        }
+
+    # -------- worker pool --------
+
+    def start(self) -> None:
+        if self._started:
+            return
+        self._started = True
+
+        # Anything left "running" was interrupted by a restart; run it again.
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (STATUS_QUEUED, STATUS_RUNNING))
+            queued = [r["id"] for r in conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (STATUS_QUEUED,)
+            )]
+        for job_id in queued:
+            self._pending.put(job_id)
+        if queued:
+            print(f"📋 Resuming {len(queued)} queued jobs")
+
+        for i in range(self.workers):
+            th = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            th.start()
+            self._threads.append(th)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if not self._started:
+            return
+        for _ in self._threads:
+            self._pending.put(None)
+        for th in self._threads:
+            th.join(timeout=timeout)
+        self._threads = []
+        self._started = False
+
+    def _worker(self) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                job_id = self._pending.get()
+                if job_id is None:
+                    return
+                self._run_one(job_id, loop)
+        finally:
+            loop.close()
+
+    def _run_one(self, job_id: str, loop: asyncio.AbstractEventLoop) -> None:
+        # Claim the job atomically so a duplicate queue entry can't run it twice.
+        with self._lock, self._connect() as conn:
+            claimed = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?",
+                (STATUS_RUNNING, _now(), job_id, STATUS_QUEUED),
+            ).rowcount
+            row = conn.execute("SELECT kind, meta, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not claimed or row is None:
+            return
+
+        handler = self._handlers.get(row["kind"])
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job kind: {row['kind']}")
+            out = handler(bytes(row["payload"] or b""), json.loads(row["meta"] or "{}"))
+            if inspect.isawaitable(out):
+                out = loop.run_until_complete(out)
+            # Payloads (receipt images, PDFs) are only needed until the job finishes.
+            self._update(job_id, status=STATUS_DONE, result=json.dumps(out), payload=None, finished_at=_now())
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status=STATUS_FAILED, error=str(e), payload=None, finished_at=_now())
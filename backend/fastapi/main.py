@@ -1,141 +1,301 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-import uvicorn
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional, Dict, Any, Tuple
 import asyncio
 import traceback
+import tempfile
+import threading
 import sys
+import time
+import pickle
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
+import os
 import uuid
-from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from dotenv import load_dotenv
 
-# Ensure current directory is in path for imports
+# Ensure current directory (and the shared import scripts) are in path for imports
 sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parents[1] / 'scripts'))
 
 # Load .env file
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
-from receipt_extractor import ReceiptExtractor
+from receipt_parser import suggest_category
+from job_queue import JobQueue
+from statement_ingest import ingest_pages, read_pages
+from bank_categories import MerchantCategoryMemo
+from fingerprint import tx_fingerprint as _tx_fingerprint, tx_fingerprint_from_parts as _tx_fingerprint_from_parts
+from store import TransactionStore
+from goals import normalize_goal
+import snapshot
 from assistant_runtime import (
     get_spending_summary,
+    GOAL_SAVINGS_MONTHS,
+    get_budget_pacing,
+    get_goal_progress,
     get_budget_status,
     get_cashflow_projection,
+    get_cashflow_forecast,
     get_category_spend,
     forecast_category_spending,
+    get_category_forecasts,
     get_transaction_detail,
     simulate_purchase,
+    simulate_scenarios,
     detect_anomalies,
+    find_anomalies,
     get_recurring_transactions,
     tier0_response,
     plan_tool_calls,
     answer_with_facts,
+    local_tool_plan,
+    local_answer,
+)
+from resilience import (
+    CHAT_BUDGET_S,
+    STATE_CLOSED,
+    BudgetExceededError,
+    CircuitOpenError,
+    LatencyBudget,
+    breaker_states,
 )
 import json
 
-# JSON-based persistence
-data_file = Path(__file__).parent / 'data.json'
-
-
-def _norm_text(value: Optional[str]) -> str:
-    if value is None:
-        return ''
-    return ' '.join(str(value).strip().lower().split())
-
+# Persistence: 'json' (data.json, human-readable) or 'binary' (data.snapshot,
+# a columnar file; see snapshot.py). Either can be read regardless of the
+# setting, and binary mode imports an existing data.json on first start.
+DATA_FORMAT = (os.environ.get('DATA_FORMAT') or 'json').strip().lower()
+if DATA_FORMAT not in ('json', 'binary'):
+    raise RuntimeError(f"DATA_FORMAT must be 'json' or 'binary', got {DATA_FORMAT!r}")
+_json_data_file = Path(__file__).parent / 'data.json'
+data_file = Path(
+    os.environ.get('DATA_FILE')
+    or (Path(__file__).parent / 'data.snapshot' if DATA_FORMAT == 'binary' else _json_data_file)
+)
 
-def _amount_key(value: Any) -> str:
-    try:
-        d = Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        # Normalize -0.00 -> 0.00
-        if d == Decimal('-0.00'):
-            d = Decimal('0.00')
-        return format(d, 'f')
-    except (InvalidOperation, ValueError, TypeError):
-        return '0.00'
-
-
-def _tx_fingerprint_from_parts(date: str, merchant: str, amount: Any, description: Optional[str]) -> str:
-    # Purpose: stable de-dupe key across repeated imports.
-    # Intentionally excludes category so category mapping improvements can upsert.
-    return '|'.join(
-        [
-            str(date or '').strip(),
-            _norm_text(merchant),
-            _amount_key(amount),
-            _norm_text(description),
-        ]
+# Optional pickle of the parsed store, reused while data.json is unchanged so
+# restarts (uvicorn --reload, tests) skip JSON parsing. Unset = disabled.
+warm_snapshot_file = Path(os.environ['WARM_SNAPSHOT']) if os.environ.get('WARM_SNAPSHOT') else None
+_WARM_SNAPSHOT_FORMAT = 1
+
+
+def _load_json(path: Path) -> tuple:
+    with open(path, 'r') as f:
+        data = json.load(f)
+    # Backwards compatible: allow older files without goals
+    return (
+        data.get('transactions', []),
+        data.get('category_budgets', {}),
+        data.get('default_budget', 3000.0),
+        data.get('goals', []),
+        data.get('merchant_categories'),
+        data.get('dedupe_index'),
     )
 
 
-def _tx_fingerprint(t: Dict[str, Any]) -> str:
-    return _tx_fingerprint_from_parts(
-        t.get('date', ''),
-        t.get('merchant', ''),
-        t.get('amount', 0),
-        t.get('description'),
+def _load_binary(path: Path) -> tuple:
+    snap = snapshot.load(path)
+    meta = snap.meta
+    watermark = int(meta.get('dedupe_watermark') or 0)
+    return (
+        snap.rows,
+        meta.get('category_budgets', {}),
+        meta.get('default_budget', 3000.0),
+        meta.get('goals', []),
+        meta.get('merchant_categories'),
+        # Fingerprints are stored per row (newest first); the index wants the oldest ones.
+        {'watermark': watermark, 'fingerprints': snap.fingerprints[::-1][:watermark]},
     )
 
 
-def _dedupe_transactions_in_place(items: List[Dict[str, Any]]) -> int:
-    seen: set[str] = set()
-    deduped: List[Dict[str, Any]] = []
-    removed = 0
-    for t in items:
-        fp = _tx_fingerprint(t)
-        if fp in seen:
-            removed += 1
-            continue
-        seen.add(fp)
-        deduped.append(t)
-    if removed:
-        items[:] = deduped
-    return removed
-
 def load_data():
-    """Load transactions and settings from JSON file."""
-    if data_file.exists():
+    """Load transactions and settings from the datastore file (JSON or binary snapshot)."""
+    path = data_file
+    if DATA_FORMAT == 'binary' and _json_data_file.exists():
+        if not path.exists():
+            path = _json_data_file
+            print(f"📦 Importing {path.name} into the binary datastore {data_file.name}")
+        elif _json_data_file.stat().st_mtime > path.stat().st_mtime:
+            # Binary mode never writes data.json, so something else did (and it may
+            # lack rows added here since). Don't merge it silently; say so.
+            print(
+                f"⚠️  {_json_data_file.name} is newer than {data_file.name} and is ignored in binary mode; "
+                f"run convert_datastore.py --to binary to use it"
+            )
+    if path.exists():
         try:
-            with open(data_file, 'r') as f:
-                data = json.load(f)
-                # Backwards compatible: allow older files without goals
-                return (
-                    data.get('transactions', []),
-                    data.get('category_budgets', {}),
-                    data.get('default_budget', 3000.0),
-                    data.get('goals', []),
-                )
+            return _load_binary(path) if snapshot.is_snapshot(path) else _load_json(path)
         except Exception as e:
             print(f"⚠️  Failed to load data: {e}")
-    return [], {}, 3000.0, []
+    return [], {}, 3000.0, [], None, None
 
 def save_data():
-    """Save transactions and settings to JSON file."""
+    """Save transactions and settings in the configured DATA_FORMAT."""
+    if not _store_loaded:
+        # Never overwrite the file with the empty pre-startup store.
+        return
     try:
-        data = {
-            'transactions': transactions,
+        settings = {
             'category_budgets': category_budgets,
             'default_budget': default_budget,
             'goals': goals,
+            'merchant_categories': merchant_memo.to_dict(),
+        }
+        if DATA_FORMAT == 'binary':
+            snapshot.save(
+                data_file,
+                transactions.to_list(),
+                transactions.fingerprints(),
+                {**settings, 'dedupe_watermark': transactions.watermark},
+            )
+            return
+        data = {
+            'transactions': transactions.to_list(),
+            **settings,
+            # Lets the next start skip fingerprinting rows that are already clean.
+            'dedupe_index': transactions.dedupe_index(),
         }
         with open(data_file, 'w') as f:
             json.dump(data, f, indent=2)
     except Exception as e:
         print(f"❌ Failed to save data: {e}")
 
-# Load data on startup
-transactions, category_budgets, default_budget, goals = load_data()
 
-# One-time cleanup: if prior imports duplicated rows, collapse them now.
-removed_dupes = _dedupe_transactions_in_place(transactions)
-if removed_dupes:
-    save_data()
-    print(f"🧹 Removed {removed_dupes} duplicate transactions")
-print(f"✅ Loaded {len(transactions)} transactions, default budget: {default_budget}")
+def _data_file_stamp() -> Optional[Tuple[int, int]]:
+    try:
+        st = data_file.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
 
-app = FastAPI(title="Personal Finance Mock API")
+
+def _read_warm_snapshot() -> Optional[tuple]:
+    """load_data()'s tuple from the warm snapshot, if it matches data.json as it is now."""
+    global _warm_snapshot_stamp
+    if warm_snapshot_file is None or not warm_snapshot_file.exists():
+        return None
+    try:
+        with open(warm_snapshot_file, 'rb') as f:
+            fmt, stamp, payload = pickle.load(f)
+    except Exception as e:
+        print(f"⚠️  Ignoring unreadable warm snapshot: {e}")
+        return None
+    if fmt != _WARM_SNAPSHOT_FORMAT or stamp != _data_file_stamp():
+        return None
+    _warm_snapshot_stamp = stamp
+    return payload
+
+
+def _write_warm_snapshot() -> None:
+    """Snapshot the store unless the snapshot already matches data.json."""
+    global _warm_snapshot_stamp
+    stamp = _data_file_stamp()
+    if warm_snapshot_file is None or not _store_loaded or stamp is None or stamp == _warm_snapshot_stamp:
+        return
+    payload = (
+        transactions.to_list(),
+        category_budgets,
+        default_budget,
+        goals,
+        merchant_memo.to_dict(),
+        transactions.dedupe_index(),
+    )
+    tmp = warm_snapshot_file.with_name(warm_snapshot_file.name + '.tmp')
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump((_WARM_SNAPSHOT_FORMAT, stamp, payload), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, warm_snapshot_file)
+        _warm_snapshot_stamp = stamp
+    except Exception as e:
+        print(f"⚠️  Failed to write warm snapshot: {e}")
+
+
+# The store is loaded by the app lifespan (or the first request, whichever
+# comes first), not at import time.
+transactions = TransactionStore()
+category_budgets: Dict[str, Any] = {}
+default_budget = 3000.0
+goals: List[Dict[str, Any]] = []
+merchant_memo = MerchantCategoryMemo()
+_store_loaded = False
+_warm_snapshot_used = False
+_warm_snapshot_stamp: Optional[Tuple[int, int]] = None
+
+# Request handlers and background jobs both mutate the store.
+_store_lock = threading.RLock()
+
+
+def _load_store() -> None:
+    global transactions, category_budgets, default_budget, goals, merchant_memo, _store_loaded, _warm_snapshot_used
+    with _store_lock:
+        if _store_loaded:
+            return
+        started = time.perf_counter()
+        warm = _read_warm_snapshot()
+        _warm_snapshot_used = warm is not None
+        rows, category_budgets, default_budget, goals, memo_entries, dedupe_index = warm or load_data()
+        # Older files (enrich_data.py) store goals in snake_case without ids.
+        goals = [normalize_goal(g) for g in goals]
+        transactions = TransactionStore(rows, dedupe_index=dedupe_index)
+        del rows
+
+        # Learned merchant -> category table; older files without one are seeded from
+        # the categories already on their transactions.
+        merchant_memo = (
+            MerchantCategoryMemo(memo_entries) if memo_entries else MerchantCategoryMemo.from_transactions(transactions)
+        )
+        _store_loaded = True
+
+        # Only rows added since the persisted dedupe watermark (e.g. by an external
+        # import) were fingerprinted above; collapse any duplicates among them and
+        # persist the index so the next start skips them too.
+        removed_dupes = transactions.dedupe()
+        migrating = DATA_FORMAT == 'binary' and not data_file.exists() and len(transactions) > 0
+        if removed_dupes or transactions.fingerprinted_on_load or migrating:
+            save_data()
+        if removed_dupes:
+            print(f"🧹 Removed {removed_dupes} duplicate transactions")
+        source = 'warm snapshot' if _warm_snapshot_used else data_file.name
+        print(
+            f"✅ Loaded {len(transactions)} transactions from {source} in {(time.perf_counter() - started) * 1000:.0f} ms "
+            f"({transactions.fingerprinted_on_load} newly fingerprinted), default budget: {default_budget}"
+        )
+
+
+# Background jobs (receipt OCR can take tens of seconds); persisted so queued
+# work survives a restart.
+job_queue = JobQueue(
+    Path(os.environ.get('JOB_DB_PATH') or Path(__file__).parent / 'jobs.sqlite3'),
+    workers=int(os.environ.get('JOB_WORKERS') or 2),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(_load_store)
+    job_queue.start()
+    try:
+        yield
+    finally:
+        job_queue.stop()
+        with _store_lock:
+            _write_warm_snapshot()
+
+
+app = FastAPI(title="Personal Finance Mock API", lifespan=lifespan)
+
+
+@app.middleware('http')
+async def _ensure_store_loaded(request: Request, call_next):
+    # Normally a no-op: the lifespan already loaded the store. Covers servers
+    # and test clients that skip lifespan events.
+    if not _store_loaded:
+        await run_in_threadpool(_load_store)
+    return await call_next(request)
 
 app.add_middleware(
     CORSMiddleware,
@@ -192,13 +352,14 @@ def get_category_color(category_name: str) -> str:
 class GoalIn(BaseModel):
     name: str
     targetAmount: float
+    currentAmount: float = 0.0
     targetDate: Optional[str] = None
     note: Optional[str] = None
 
 
 class Goal(GoalIn):
     id: str
-    createdAt: str
+    createdAt: Optional[str] = None  # unknown for goals imported by enrich_data.py
 
 
 class AssistantChatRequest(BaseModel):
@@ -222,7 +383,7 @@ def _is_expense(t: dict) -> bool:
 @app.get('/transactions', response_model=List[Transaction])
 def list_transactions(year: Optional[int] = None, month: Optional[int] = None):
     if year is None and month is None:
-        return transactions
+        return transactions.to_list()
     
     filtered = []
     for t in transactions:
@@ -246,69 +407,206 @@ def list_transactions(year: Optional[int] = None, month: Optional[int] = None):
 
 @app.get('/transactions/{transaction_id}', response_model=Transaction)
 def get_transaction(transaction_id: str):
-    for t in transactions:
-        if t['id'] == transaction_id:
-            return t
+    t = transactions.get(transaction_id)
+    if t is not None:
+        return t
     raise HTTPException(status_code=404, detail='Transaction not found')
 
 @app.post('/transactions', response_model=Transaction)
 def create_transaction(tx: TransactionIn):
     fp = _tx_fingerprint_from_parts(tx.date, tx.merchant, tx.amount, tx.description)
-    for existing in transactions:
-        if _tx_fingerprint(existing) == fp:
+    with _store_lock:
+        existing = transactions.find(fp)
+        if existing is not None:
             updated = False
             # Upsert mutable fields (category mapping can improve over time)
             incoming = tx.dict()
+            previous_category = existing.get('category')
             for key, value in incoming.items():
                 if existing.get(key) != value:
                     existing[key] = value
                     updated = True
+            if existing.get('category') != previous_category:
+                # A user recategorization: remember it for this merchant.
+                merchant_memo.observe(existing['merchant'], existing['category'], previous=previous_category)
+                merchant_memo.pin(existing['merchant'], existing['category'])
             if updated:
+                transactions.touch()
                 save_data()
             return existing
 
-    # Use UUIDs for transaction IDs to avoid collisions
-    new_id = uuid.uuid4().hex
-    new = {"id": new_id, **tx.dict()}
-    transactions.insert(0, new)
-    save_data()
-    return new
+        # Use UUIDs for transaction IDs to avoid collisions
+        new_id = uuid.uuid4().hex
+        new = {"id": new_id, **tx.dict()}
+        transactions.add(new, fp)
+        merchant_memo.observe(new['merchant'], new['category'])
+        save_data()
+        return new
+
+
+def _upsert_transactions(items: List[Dict[str, Any]], save: bool = True) -> Tuple[List[dict], Dict[str, int]]:
+    """Insert or update transactions by fingerprint, saving once at the end.
+
+    Returns the stored rows (one per input, existing or newly created) and
+    created/updated/unchanged counts. Streamed imports pass save=False and
+    leave the write to a _BatchWriter.
+    """
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+    results: List[dict] = []
+
+    with _store_lock:
+        for incoming in items:
+            fp = _tx_fingerprint(incoming)
+            existing = transactions.find(fp)
+
+            if existing is not None:
+                updated = False
+                previous_category = existing.get('category')
+                for key, value in incoming.items():
+                    if existing.get(key) != value:
+                        existing[key] = value
+                        updated = True
+                merchant_memo.observe(existing.get('merchant') or '', existing.get('category'), previous=previous_category)
+                counts['updated' if updated else 'unchanged'] += 1
+                results.append(existing)
+                continue
+
+            new_id = uuid.uuid4().hex
+            new = {"id": new_id, **incoming}
+            transactions.add(new, fp)
+            merchant_memo.observe(new.get('merchant') or '', new.get('category') or '')
+            results.append(new)
+            counts['created'] += 1
+
+        if counts['updated']:
+            transactions.touch()
+        if save and (counts['created'] or counts['updated']):
+            save_data()
+    return results, counts
+
+
+class _BatchWriter:
+    """Applies import batches in memory and saves the datastore rarely.
+
+    save_data() rewrites the whole file, so saving per batch makes a large
+    import quadratic. Batches are saved at most every INGEST_SAVE_INTERVAL_S
+    and once more when the import ends (flush).
+    """
+
+    def __init__(self) -> None:
+        self.dirty = False
+        self.saved_at = time.monotonic()
+
+    def upsert(self, items: List[Dict[str, Any]]) -> Dict[str, int]:
+        _, counts = _upsert_transactions(items, save=False)
+        if counts['created'] or counts['updated']:
+            self.dirty = True
+        if self.dirty and time.monotonic() - self.saved_at >= INGEST_SAVE_INTERVAL_S:
+            self.flush()
+        return counts
+
+    def flush(self) -> None:
+        if self.dirty:
+            with _store_lock:
+                save_data()
+            self.dirty = False
+        self.saved_at = time.monotonic()
 
 
 @app.post('/transactions/bulk', response_model=List[Transaction])
 def create_transactions_bulk(payload: List[TransactionIn]):
     # Make bulk import idempotent: repeated imports won't create duplicates.
     # Return a list matching the input length (existing or newly created).
-    existing_by_fp: Dict[str, Dict[str, Any]] = {}
-    for t in transactions:
-        existing_by_fp[_tx_fingerprint(t)] = t
-
-    results: List[dict] = []
-    changed = False
+    results, _ = _upsert_transactions([tx.dict() for tx in payload])
+    return results
 
-    for tx in payload:
-        fp = _tx_fingerprint_from_parts(tx.date, tx.merchant, tx.amount, tx.description)
-        existing = existing_by_fp.get(fp)
 
-        if existing is not None:
-            incoming = tx.dict()
-            for key, value in incoming.items():
-                if existing.get(key) != value:
-                    existing[key] = value
-                    changed = True
-            results.append(existing)
-            continue
+# Streaming ingest commits every this many valid rows and reports at most
+# this many rejected rows individually.
+INGEST_BATCH_SIZE = 1000
+# Streamed imports write the datastore at most this often, and once at the end.
+INGEST_SAVE_INTERVAL_S = 30.0
+_MAX_REPORTED_REJECTS = 100
+_MAX_INGEST_LINE_BYTES = 1 << 20
 
-        new_id = uuid.uuid4().hex
-        new = {"id": new_id, **tx.dict()}
-        transactions.insert(0, new)
-        existing_by_fp[fp] = new
-        results.append(new)
-        changed = True
 
-    if changed:
-        save_data()
-    return results
+def _validate_ingest_row(line: bytes) -> Dict[str, Any]:
+    """Parse and validate one NDJSON line; raises ValueError with a short reason."""
+    try:
+        obj = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f'invalid JSON: {e}') from None
+    if not isinstance(obj, dict):
+        raise ValueError('expected a JSON object')
+    try:
+        tx = TransactionIn(**obj)
+    except ValidationError as e:
+        raise ValueError('; '.join(
+            f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+        )) from None
+    try:
+        datetime.strptime(tx.date, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError('date: expected YYYY-MM-DD') from None
+    return tx.dict()
+
+
+@app.post('/transactions/ingest')
+async def ingest_transactions(request: Request, batchSize: int = INGEST_BATCH_SIZE):
+    """Upsert an NDJSON stream of transactions (one JSON object per line).
+
+    Rows are validated and committed in batches while the body is still
+    arriving, so memory stays bounded by the batch size. Invalid rows are
+    skipped and reported by 1-based line number. The datastore is saved
+    when the stream ends, not per batch.
+    """
+    batch_size = max(1, min(batchSize, 10000))
+    summary: Dict[str, Any] = {
+        'rows': 0, 'batches': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'rejected': 0, 'rejectedRows': [],
+    }
+    batch: List[Dict[str, Any]] = []
+    writer = _BatchWriter()
+
+    async def commit() -> None:
+        counts = await run_in_threadpool(writer.upsert, batch[:])
+        batch.clear()
+        summary['batches'] += 1
+        for key, value in counts.items():
+            summary[key] += value
+
+    def take(line: bytes, row: int) -> None:
+        if not line.strip():
+            return
+        summary['rows'] += 1
+        try:
+            batch.append(_validate_ingest_row(line))
+        except ValueError as e:
+            summary['rejected'] += 1
+            if len(summary['rejectedRows']) < _MAX_REPORTED_REJECTS:
+                summary['rejectedRows'].append({'row': row, 'error': str(e)[:300]})
+
+    row = 0
+    buffer = b''
+    try:
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            if len(buffer) > _MAX_INGEST_LINE_BYTES:
+                raise HTTPException(status_code=413, detail=f'NDJSON line {row + len(lines) + 1} is too long')
+            for line in lines:
+                row += 1
+                take(line, row)
+                if len(batch) >= batch_size:
+                    await commit()
+        if buffer:
+            take(buffer, row + 1)
+        if batch:
+            await commit()
+    finally:
+        # Batches already applied stay applied, so persist them even if the
+        # stream was cut off or rejected part-way.
+        await run_in_threadpool(writer.flush)
+    return summary
 
 
 @app.get('/goals', response_model=List[Goal])
@@ -316,12 +614,18 @@ def list_goals():
     return goals
 
 
+@app.get('/goals/progress')
+def goals_progress(monthsBack: int = GOAL_SAVINGS_MONTHS):
+    return get_goal_progress(transactions, goals, monthsBack)
+
+
 @app.post('/goals', response_model=Goal)
 def create_goal(payload: GoalIn):
     g = {
         'id': uuid.uuid4().hex,
         'name': payload.name,
         'targetAmount': float(payload.targetAmount),
+        'currentAmount': float(payload.currentAmount),
         'targetDate': payload.targetDate,
         'note': payload.note,
         'createdAt': datetime.utcnow().isoformat(),
@@ -352,23 +656,54 @@ def assistant_budget_status(year: Optional[int] = None, month: Optional[int] = N
     return get_budget_status(transactions, float(default_budget), category_budgets, year, month)
 
 
+@app.get('/assistant/budget-pacing')
+def assistant_budget_pacing(year: Optional[int] = None, month: Optional[int] = None):
+    return get_budget_pacing(transactions, float(default_budget), category_budgets, year, month)
+
+
 @app.get('/assistant/cashflow-projection')
 def assistant_cashflow_projection(year: Optional[int] = None, month: Optional[int] = None, startingBalance: float = 0.0):
     return get_cashflow_projection(transactions, year, month, starting_balance=float(startingBalance))
 
 
+@app.get('/assistant/cashflow-forecast')
+def assistant_cashflow_forecast(
+    months: int = 3,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    startingBalance: float = 0.0,
+):
+    return get_cashflow_forecast(transactions, months, year, month, starting_balance=float(startingBalance))
+
+
 @app.get('/assistant/category-spend')
 def assistant_category_spend(category: str, year: Optional[int] = None, month: Optional[int] = None):
     return get_category_spend(transactions, category, year, month)
 
 
+@app.get('/assistant/forecasts')
+def assistant_forecasts(year: Optional[int] = None, month: Optional[int] = None):
+    return get_category_forecasts(transactions, year, month)
+
+
 @app.get('/assistant/transaction/{transaction_id}')
 def assistant_transaction_detail(transaction_id: str):
     return get_transaction_detail(transactions, transaction_id)
 
 
 @app.get('/assistant/anomalies')
-def assistant_anomalies(year: Optional[int] = None, month: Optional[int] = None, limit: int = 3):
+def assistant_anomalies(
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    limit: int = 3,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+):
+    if start or end:
+        try:
+            return find_anomalies(transactions, start, end, limit=limit)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
     return detect_anomalies(transactions, year, month, limit=limit)
 
 
@@ -379,21 +714,42 @@ def assistant_recurring():
 
 @app.post('/assistant/simulate-purchase')
 def assistant_simulate_purchase(payload: Dict[str, Any]):
-    amt = float(payload.get('amount') or 0)
-    cat = str(payload.get('category') or 'Other')
     year = payload.get('year')
     month = payload.get('month')
-    starting_balance = float(payload.get('startingBalance') or 0.0)
-    return simulate_purchase(
-        transactions,
-        float(default_budget),
-        category_budgets,
-        amt,
-        cat,
-        year=year,
-        month=month,
-        starting_balance=starting_balance,
-    )
+    try:
+        starting_balance = float(payload.get('startingBalance') or 0.0)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail='startingBalance must be a number')
+    try:
+        amt = float(payload.get('amount') or 0)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail='amount must be a number')
+    scenarios = payload.get('scenarios')
+    try:
+        if scenarios is not None:
+            if not isinstance(scenarios, list) or not all(isinstance(sc, dict) for sc in scenarios):
+                raise HTTPException(status_code=400, detail='scenarios must be a list of objects')
+            return simulate_scenarios(
+                transactions,
+                float(default_budget),
+                category_budgets,
+                scenarios,
+                year=year,
+                month=month,
+                starting_balance=starting_balance,
+            )
+        return simulate_purchase(
+            transactions,
+            float(default_budget),
+            category_budgets,
+            amt,
+            str(payload.get('category') or 'Other'),
+            year=year,
+            month=month,
+            starting_balance=starting_balance,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @app.post('/assistant/chat')
@@ -407,10 +763,16 @@ async def assistant_chat(req: AssistantChatRequest):
             'answer': quick,
         }
 
+    # Planner + answer share one latency budget; if the provider is down or
+    # slow, answer deterministically from local routing instead of failing.
+    budget = LatencyBudget(CHAT_BUDGET_S)
+    fallback = False
     try:
-        tool_plan = await plan_tool_calls(req.message)
+        tool_plan = await plan_tool_calls(req.message, transactions, budget=budget)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Assistant planner failed: {str(e)}")
+        print(f"⚠️  Assistant planner unavailable ({e}); using local routing")
+        tool_plan = local_tool_plan(req.message)
+        fallback = True
     calls = tool_plan.get('calls') or []
     facts: Dict[str, Any] = {
         'periodDefault': 'current_month',
@@ -425,6 +787,8 @@ async def assistant_chat(req: AssistantChatRequest):
             out = get_spending_summary(transactions, args.get('year', req.year), args.get('month', req.month))
         elif tool == 'get_budget_status':
             out = get_budget_status(transactions, float(default_budget), category_budgets, args.get('year', req.year), args.get('month', req.month))
+        elif tool == 'get_budget_pacing':
+            out = get_budget_pacing(transactions, float(default_budget), category_budgets, args.get('year', req.year), args.get('month', req.month))
         elif tool == 'get_cashflow_projection':
             out = get_cashflow_projection(
                 transactions,
@@ -432,6 +796,14 @@ async def assistant_chat(req: AssistantChatRequest):
                 args.get('month', req.month),
                 starting_balance=float(args.get('startingBalance', req.startingBalance or 0.0)),
             )
+        elif tool == 'get_cashflow_forecast':
+            out = get_cashflow_forecast(
+                transactions,
+                int(args.get('months') or 3),
+                args.get('year', req.year),
+                args.get('month', req.month),
+                starting_balance=float(args.get('startingBalance', req.startingBalance or 0.0)),
+            )
         elif tool == 'get_category_spend':
             out = get_category_spend(
                 transactions,
@@ -449,6 +821,19 @@ async def assistant_chat(req: AssistantChatRequest):
             )
         elif tool == 'get_transaction_detail':
             out = get_transaction_detail(transactions, str(args.get('id') or ''))
+        elif tool == 'simulate_purchase' and isinstance(args.get('scenarios'), list):
+            try:
+                out = simulate_scenarios(
+                    transactions,
+                    float(default_budget),
+                    category_budgets,
+                    [sc for sc in args['scenarios'] if isinstance(sc, dict)],
+                    year=args.get('year', req.year),
+                    month=args.get('month', req.month),
+                    starting_balance=float(args.get('startingBalance', req.startingBalance or 0.0)),
+                )
+            except ValueError as exc:
+                out = {'error': str(exc)}
         elif tool == 'simulate_purchase':
             out = simulate_purchase(
                 transactions,
@@ -470,21 +855,38 @@ async def assistant_chat(req: AssistantChatRequest):
         elif tool == 'get_recurring_transactions':
             out = get_recurring_transactions(transactions)
         elif tool == 'get_user_goals':
-            out = {'goals': goals}
+            out = get_goal_progress(transactions, goals)
         else:
             out = {'error': f'Unknown tool: {tool}'}
 
         facts['calls'].append({'tool': tool, 'args': args, 'result': out})
 
-    try:
-        answer = await answer_with_facts(req.message, facts, style=tool_plan.get('answerStyle', 'short'))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Assistant reasoning failed: {str(e)}")
+    answer = None
+    if not fallback:
+        try:
+            answer = await answer_with_facts(req.message, facts, style=tool_plan.get('answerStyle', 'short'), budget=budget)
+        except Exception as e:
+            print(f"⚠️  Assistant reasoning unavailable ({e}); answering locally")
+            fallback = True
+    if answer is None:
+        answer = local_answer(facts)
     return {
         'tier': tool_plan.get('tier', 1),
         'toolPlan': tool_plan,
         'facts': facts,
         'answer': answer,
+        'fallback': fallback,
+    }
+
+
+@app.get('/health')
+def health():
+    breakers = breaker_states()
+    degraded = any(b['state'] != STATE_CLOSED for b in breakers.values())
+    return {
+        'status': 'degraded' if degraded else 'ok',
+        'breakers': breakers,
+        'jobs': job_queue.metrics(),
     }
 
 @app.get('/categories', response_model=List[Category])
@@ -649,6 +1051,88 @@ def set_category_budget(category_key: str, payload: dict):
     except Exception:
         raise HTTPException(status_code=400, detail='Invalid category budget')
 
+async def _process_receipt(file_bytes: bytes, filename: str) -> dict:
+    """Run OCR + parsing on a receipt and build the upload response."""
+    # Extract using ReceiptExtractor (imported on first use: it pulls in the
+    # OCR client and the optional Dedalus SDK)
+    from receipt_extractor import ReceiptExtractor
+
+    extractor = ReceiptExtractor()
+    print(f"🔄 Starting OCR extraction...")
+    result = await extractor.extract_from_bytes(file_bytes, filename or 'receipt')
+    print(f"✅ OCR result: {result}")
+
+    # Ensure numeric values
+    amount = 0.0
+    try:
+        amount = float(result.get('total')) if result.get('total') else 0.0
+    except (TypeError, ValueError):
+        amount = 0.0
+
+    date_str = result.get('date')
+    if not date_str:
+        date_str = datetime.utcnow().date().isoformat()
+
+    merchant = result.get('merchant') or 'Unknown Store'
+
+    # A category learned for this merchant wins; otherwise line items and
+    # category come from the local parser. An LLM extraction only has
+    # merchant/total/date, so fall back to the store name.
+    items = result.get('items') or []
+    suggested = (
+        merchant_memo.lookup(merchant, prefix=True)
+        or result.get('suggestedCategory')
+        or suggest_category(result.get('merchant'), items)
+    )
+
+    # Return extracted data
+    return {
+        'id': str(hash(file_bytes))[:8],
+        'fileName': filename,
+        'uploadDate': datetime.utcnow().isoformat(),
+        'ocrData': {
+            'merchant': merchant,
+            'amount': amount,
+            'date': date_str,
+            'items': items,
+            'suggestedCategory': suggested
+        }
+    }
+
+
+async def _receipt_job(payload: bytes, meta: Dict[str, Any]) -> dict:
+    return await _process_receipt(payload, meta.get('fileName') or 'receipt')
+
+
+job_queue.register('receipt', _receipt_job)
+
+
+def _statement_job(payload: bytes, meta: Dict[str, Any]) -> dict:
+    """OCR a statement PDF and upsert its rows batch by batch, saving at the end."""
+    suffix = Path(meta.get('fileName') or 'statement.pdf').suffix or '.pdf'
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        tmp.write(payload)
+        tmp_path = tmp.name
+    writer = _BatchWriter()
+    try:
+        ocr_key = os.environ.get('DEDALUS_OCR_API_KEY') or os.environ.get('DEDALUS_API_KEY')
+        return ingest_pages(
+            read_pages(Path(tmp_path), ocr_key),
+            writer.upsert,
+            batch_size=int(meta.get('batchSize') or 200),
+            memo=merchant_memo,
+        )
+    finally:
+        writer.flush()
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+job_queue.register('statement', _statement_job)
+
+
 @app.post('/upload-receipt')
 async def upload_receipt(file: UploadFile = File(...)):
     """Upload a receipt and extract merchant/total via OCR"""
@@ -656,46 +1140,61 @@ async def upload_receipt(file: UploadFile = File(...)):
         # Read file bytes
         file_bytes = await file.read()
         print(f"📥 Received file: {file.filename}, size: {len(file_bytes)} bytes")
-        
-        # Extract using ReceiptExtractor
-        extractor = ReceiptExtractor()
-        print(f"🔄 Starting OCR extraction...")
-        result = await extractor.extract_from_bytes(file_bytes, file.filename or 'receipt')
-        print(f"✅ OCR result: {result}")
-        
-        # Ensure numeric values
-        amount = 0.0
-        try:
-            amount = float(result.get('total')) if result.get('total') else 0.0
-        except (TypeError, ValueError):
-            amount = 0.0
-        
-        date_str = result.get('date')
-        if not date_str:
-            date_str = datetime.utcnow().date().isoformat()
-        
-        merchant = result.get('merchant') or 'Unknown Store'
-        
-        # Return extracted data
-        response = {
-            'id': str(hash(file_bytes))[:8],
-            'fileName': file.filename,
-            'uploadDate': datetime.utcnow().isoformat(),
-            'ocrData': {
-                'merchant': merchant,
-                'amount': amount,
-                'date': date_str,
-                'items': [],
-                'suggestedCategory': 'Shopping'
-            }
-        }
+
+        response = await _process_receipt(file_bytes, file.filename or 'receipt')
         print(f"📤 Returning: {response}")
         return response
+    except (CircuitOpenError, BudgetExceededError) as e:
+        print(f"❌ OCR provider unavailable: {e}")
+        raise HTTPException(status_code=503, detail=f"OCR provider unavailable: {str(e)}")
     except Exception as e:
         print(f"❌ Upload error: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to process receipt: {str(e)}")
 
 
+@app.post('/jobs/receipt', status_code=202)
+async def submit_receipt_job(file: UploadFile = File(...)):
+    """Queue a receipt for background OCR; poll /jobs/{id} for the result."""
+    file_bytes = await file.read()
+    job = job_queue.submit('receipt', file_bytes, {'fileName': file.filename or 'receipt'})
+    return {'jobId': job['id'], 'status': job['status']}
+
+
+@app.post('/statements/ingest', status_code=202)
+async def submit_statement_job(file: UploadFile = File(...), batchSize: int = 200):
+    """Queue a (multi-page) PDF statement for OCR and bulk import."""
+    file_bytes = await file.read()
+    job = job_queue.submit('statement', file_bytes, {'fileName': file.filename or 'statement.pdf', 'batchSize': batchSize})
+    return {'jobId': job['id'], 'status': job['status']}
+
+
+@app.get('/jobs/metrics')
+def job_metrics():
+    return job_queue.metrics()
+
+
+@app.get('/jobs/{job_id}')
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='Job not found')
+    return job
+
+
+@app.get('/jobs/{job_id}/result')
+def get_job_result(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='Job not found')
+    if job['status'] == 'failed':
+        raise HTTPException(status_code=500, detail=f"Job failed: {job.get('error')}")
+    if job['status'] != 'done':
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job_queue.result(job_id)
+
+
 if __name__ == '__main__':
+    import uvicorn
+
     uvicorn.run('backend.fastapi.main:app', host='0.0.0.0', port=8000, reload=True)
@@ -1,16 +1,21 @@
 import httpx
 import base64
+import os
 from pathlib import Path
-import time
+from typing import Optional
+
+from resilience import OCR_BUDGET_S, LatencyBudget, call_with_resilience
 
 
 class OCRModel:
     """OCR Model for extracting text from images or PDFs via Dedalus"""
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, api_url: Optional[str] = None, budget_seconds: Optional[float] = None):
         self.api_key = api_key
-        self.api_url = "https://api.dedaluslabs.ai/v1/ocr"
+        self.api_url = api_url or os.getenv("DEDALUS_OCR_URL", "https://api.dedaluslabs.ai/v1/ocr")
         self.model = "mistral-ocr-latest"
+        # Total time one extraction may spend on the provider, retries included
+        self.budget_seconds = budget_seconds if budget_seconds is not None else OCR_BUDGET_S
 
     # -------- MIME TYPE --------
     # Dedalus expects application/* even for images
@@ -20,7 +25,26 @@ class OCRModel:
     # -------- OCR FUNCTION --------
     def extract_text(self, path_or_url: str) -> str:
         """Extract text from local file OR HTTPS URL"""
+        return "".join(self.iter_pages(path_or_url)).strip()
+
+    def iter_pages(self, path_or_url: str):
+        """Yield the text of each page (PDFs) or the whole document (images)
+
+        Pages are released as they are consumed, so callers that parse page by
+        page only ever hold one page of parsed text at a time.
+        """
+        result = self._ocr_request(path_or_url)
+
+        if "pages" in result:
+            pages = result.pop("pages") or []
+            pages.reverse()
+            while pages:
+                page = pages.pop()
+                yield page.get("markdown") or page.get("text", "")
+        else:
+            yield result.get("text", "")
 
+    def _ocr_request(self, path_or_url: str) -> dict:
         # -------- CASE 1: URL --------
         if path_or_url.lower().startswith("http"):
             document_payload = {
@@ -43,9 +67,8 @@ class OCRModel:
                 "document_url": f"data:{media_type};base64,{base64_data}"
             }
 
-        # -------- OCR CALL WITH RETRIES --------
-        response = None
-        for attempt in range(3):
+        # -------- OCR CALL (breaker + retries within the latency budget) --------
+        def attempt(timeout: float) -> httpx.Response:
             response = httpx.post(
                 self.api_url,
                 headers={
@@ -56,29 +79,14 @@ class OCRModel:
                     "model": self.model,
                     "document": document_payload
                 },
-                timeout=120.0,
+                timeout=timeout,
             )
+            if response.status_code != 200:
+                print(f"OCR API Error {response.status_code}: {response.text[:200]}")
+            response.raise_for_status()
+            return response
 
-            if response.status_code == 200:
-                break
-
-            print(f"Retry {attempt+1} - API Error {response.status_code}")
-            time.sleep(2)
-
-        # -------- FINAL STATUS CHECK --------
-        if response is None or response.status_code != 200:
-            print(response.text if response else "No response")
-            raise Exception("OCR API failed after retries")
+        response = call_with_resilience("ocr", attempt, LatencyBudget(self.budget_seconds), attempts=3)
 
         # -------- PARSE RESPONSE --------
-        result = response.json()
-
-        # -------- EXTRACT TEXT --------
-        text = ""
-        if "pages" in result:
-            for page in result["pages"]:
-                text += page.get("markdown") or page.get("text", "")
-        else:
-            text = result.get("text", "")
-
-        return text.strip()
+        return response.json()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def pace_month(
+    days: List[float],
+    as_of: date,
+    budget: Optional[float],
+    committed: float = 0.0,
+    bills: Iterable[Tuple[int, float]] = (),
+) -> Dict[str, Any]:
+    """Burn rate, month-end projection and overrun date for one month of spend.
+
+    `days` is spend per day of the month (index 0 is the 1st) and `as_of` the
+    last elapsed day. `committed` is the recurring-bill part of the spend to
+    date; it is left out of the burn rate so a rent payment on the 1st doesn't
+    read as daily spending. `bills` are recurring charges still expected this
+    month, as (day of month, amount); ones already overdue land on the next day.
+    """
+    n = len(days)
+    elapsed = max(1, min(as_of.day, n))
+    spent_to_date = sum(days[:elapsed], 0.0)
+    burn = max(0.0, spent_to_date - committed) / elapsed
+
+    # Walk the month: actual spend up to as_of, then actual (future-dated)
+    # rows + burn + expected bills for each remaining day.
+    upcoming = [0.0] * n
+    for day, amt in bills:
+        upcoming[min(max(day, elapsed + 1), n) - 1] += amt
+    cum = 0.0
+    overrun: Optional[date] = None
+    for i in range(n):
+        cum += days[i] + upcoming[i]
+        if i >= elapsed:
+            cum += burn
+        if overrun is None and budget is not None and cum > budget:
+            overrun = as_of.replace(day=i + 1)
+
+    spent = sum(days, 0.0)
+    projected_bills = sum(upcoming, 0.0)
+    if budget is None:
+        status = "no_budget"
+    elif spent > budget:
+        status = "over_budget"
+    elif cum > budget:
+        status = "projected_over"
+    else:
+        status = "on_track"
+    return {
+        "budget": round(budget, 2) if budget is not None else None,
+        "spent": round(spent, 2),
+        "spentToDate": round(spent_to_date, 2),
+        "committed": round(committed, 2),
+        "burnRate": round(burn, 2),
+        "projectedBills": round(projected_bills, 2),
+        "projectedSpend": round(cum, 2),
+        "remaining": round(budget - spent, 2) if budget is not None else None,
+        "projectedRemaining": round(budget - cum, 2) if budget is not None else None,
+        "percentUsed": round(spent / budget * 100.0, 2) if budget else None,
+        "overrunDate": overrun.isoformat() if overrun else None,
+        "status": status,
+    }
@@ -13,6 +13,9 @@ sys.path.insert(0, str(Path(__file__).parent))
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path, override=True)
 
+from receipt_parser import parse_receipt_text
+from resilience import CHAT_BUDGET_S, LatencyBudget, acall_with_resilience
+
 try:
     from ocr_model import OCRModel
     HAS_OCR_MODEL = True
@@ -83,101 +86,9 @@ class ReceiptExtractor:
     
     async def _parse_total_and_merchant(self, receipt_text: str) -> dict:
         """Use LLM to extract merchant name and total amount"""
-        # If Dedalus LLM isn't available, attempt a local regex-based parse
-        def _parse_local(text: str) -> dict:
-            lines = [l.strip() for l in text.splitlines() if l.strip()]
-
-            # Merchant heuristics: first few lines that look like a store name
-            merchant = None
-            for line in lines[:6]:
-                if len(line) < 3:
-                    continue
-                if re.search(r'\b(total|subtotal|tax|change|amount|visa|mastercard)\b', line, re.I):
-                    continue
-                if re.search(r'\d', line):
-                    # skip lines that contain digits (likely address/phone)
-                    continue
-                merchant = line
-                break
-            if not merchant and lines:
-                merchant = lines[0]
-
-            # Amount heuristics
-            total = None
-            # 1) look for explicit 'total' label
-            m = re.search(r'total[^0-9A-Za-z\$\,\.]*(?:\$)?\s*([0-9\.,]+)', text, re.I)
-            if m:
-                num = m.group(1)
-                try:
-                    total = float(num.replace(',', ''))
-                except Exception:
-                    total = None
-
-            # 2) look for dollar amounts, pick the largest (often total)
-            if total is None:
-                dollars = re.findall(r'\$\s*([0-9]+(?:\.[0-9]{2})?)', text)
-                nums = []
-                for d in dollars:
-                    try:
-                        nums.append(float(d))
-                    except:
-                        pass
-                if nums:
-                    total = max(nums)
-
-            # 3) fallback: any numeric-looking values
-            if total is None:
-                all_nums = re.findall(r'([0-9]+(?:\.[0-9]{2}))', text)
-                nums = []
-                for n in all_nums:
-                    try:
-                        nums.append(float(n))
-                    except:
-                        pass
-                if nums:
-                    total = max(nums)
-
-            # Date heuristics
-            date_str = None
-            # ISO
-            m = re.search(r'(\d{4}-\d{2}-\d{2})', text)
-            if m:
-                date_str = m.group(1)
-            else:
-                # mm/dd/yyyy or dd/mm/yyyy
-                m = re.search(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', text)
-                if m:
-                    raw = m.group(1)
-                    for fmt in ['%m/%d/%Y', '%m-%d-%Y', '%d/%m/%Y', '%d-%m-%Y', '%m/%d/%y', '%d/%m/%y']:
-                        try:
-                            from datetime import datetime as _dt
-                            dt = _dt.strptime(raw, fmt)
-                            date_str = dt.date().isoformat()
-                            break
-                        except Exception:
-                            continue
-                else:
-                    # month name
-                    m = re.search(r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*[\s\.,-]*\d{1,2}[,\s]*\d{4}', text, re.I)
-                    if m:
-                        raw = m.group(0)
-                        try:
-                            from dateutil import parser as _p
-                            dt = _p.parse(raw)
-                            date_str = dt.date().isoformat()
-                        except Exception:
-                            date_str = None
-
-            parsed = {
-                'merchant': merchant or None,
-                'total': float(total) if total is not None else None,
-                'date': date_str or None
-            }
-            print(f"🔎 Local parse result: {parsed}")
-            return parsed
-
         # Prefer local parse first (works without LLM); then try LLM if available
-        local = _parse_local(receipt_text)
+        local = parse_receipt_text(receipt_text)
+        print(f"🔎 Local parse result: {local}")
         if (local.get('total') is not None) or (local.get('merchant') is not None):
             return local
 
@@ -216,9 +127,14 @@ Rules:
 - Return ONLY JSON, no other text
             """
 
-            response = await runner.run(
-                input=prompt,
-                model="anthropic/claude-opus-4-6",
+            async def attempt(timeout: float):
+                return await runner.run(
+                    input=prompt,
+                    model="anthropic/claude-opus-4-6",
+                )
+
+            response = await acall_with_resilience(
+                "receipt-llm", attempt, LatencyBudget(CHAT_BUDGET_S), attempts=1
             )
 
             # Parse JSON
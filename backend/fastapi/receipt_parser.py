@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+from pathlib import Path
+import re
+import sys
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "scripts"))
+
+from bank_categories import map_to_fixed_category
+
+
+# -----------------
+# Precompiled patterns (built once at import time)
+# -----------------
+
+# Money values always carry cents on receipts; requiring them keeps phone
+# numbers, store ids and quantities out of the amount candidates.
+_MONEY = r"\d{1,3}(?:,\d{3})+\.\d{2}|\d+\.\d{2}"
+_MONEY_RE = re.compile(rf"(\$\s*)?(-?)({_MONEY})\b")
+
+# Summary lines: label directly followed by the amount ("TOTAL: $45.99").
+_SUBTOTAL_RE = re.compile(rf"\bsub[\s-]*total\b[^0-9A-Za-z$]*\$?\s*({_MONEY})", re.I)
+_TOTAL_RE = re.compile(
+    rf"\b(grand\s+total|total\s+due|amount\s+due|balance\s+due|total)\b[^0-9A-Za-z$]*\$?\s*({_MONEY})",
+    re.I,
+)
+_TAX_RE = re.compile(rf"\b(?:sales\s+)?tax\b[^0-9$]*?\$?\s*({_MONEY})\s*$", re.I)
+
+# Lines that are never merchant names or line items.
+_MERCHANT_SKIP_RE = re.compile(r"\b(total|subtotal|tax|change|amount|visa|mastercard)\b", re.I)
+_NON_ITEM_RE = re.compile(
+    r"\b(sub[\s-]*total|total|tax|change|cash|visa|mastercard|amex|discover|debit|credit|card|tender(?:ed)?"
+    r"|balance|payment|due|amount|tip|gratuity|savings|you saved|discount|coupon|auth|approval|ref)\b",
+    re.I,
+)
+_HAS_DIGIT_RE = re.compile(r"\d")
+_HAS_ALPHA_RE = re.compile(r"[A-Za-z]")
+
+# Line items: "2 x Milk 3.98", "2 @ 1.99 Milk 3.98", "Milk 2 @ 1.99 3.98",
+# "Milk x 1.99 3.98", "Milk 3.98".
+_ITEM_QTY_PREFIX_RE = re.compile(
+    rf"^(\d{{1,3}})\s*(?:[xX@*]\s*(?:\$?(?:{_MONEY})\s+)?|\s+)(?=[A-Za-z])"
+)
+_ITEM_UNIT_SUFFIX_RE = re.compile(rf"\s(?:(\d{{1,3}})\s*)?[xX@]\s*\$?(?:{_MONEY})$")
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_DATE_RE = re.compile(
+    r"(?P<iso>(?P<iy>\d{4})-(?P<im>\d{2})-(?P<id>\d{2}))"
+    r"|(?P<num>\b(?P<n1>\d{1,2})(?P<sep>[/-])(?P<n2>\d{1,2})(?P=sep)(?P<n3>\d{4}|\d{2})\b)"
+    r"|(?P<named>\b(?P<mon>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*[\s.,-]*(?P<md>\d{1,2})[,\s]*(?P<my>\d{4}))",
+    re.I,
+)
+
+_MARKDOWN_STRIP = "#*_>`~ "
+
+# Receipt-specific keywords, checked in order. Store names complement the
+# bank-statement keyword lists in bank_categories (which have no grocers,
+# because the bank CSV labels those rows directly); item words let a line on a
+# mixed receipt (e.g. ibuprofen at Target) get its own category.
+_RECEIPT_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ("Groceries", [
+        "kroger", "whole foods", "trader joe", "aldi", "safeway", "publix", "wegmans",
+        "giant eagle", "sprouts", "instacart", "grocery", "market",
+        "milk", "bread", "eggs", "banana", "apple", "produce", "cheese", "butter",
+        "yogurt", "chicken", "beef", "cereal", "rice", "pasta", "vegetable", "fruit", "honey",
+    ]),
+    ("Dining & Coffee", [
+        "cafe", "coffee", "restaurant", "grill", "diner", "pizza", "bakery",
+        "latte", "espresso", "cappuccino", "mocha", "muffin", "croissant", "sandwich",
+        "burger", "fries", "entree", "appetizer", "sirloin", "ribeye", "sweet tea", "melange", "strudel",
+    ]),
+    ("Health & Medical", [
+        "pharmacy", "rx", "advil", "tylenol", "ibuprofen", "vitamin", "bandage", "allergy", "cough",
+    ]),
+    ("Transportation", ["fuel", "gallons", "unleaded", "diesel", "regular", "premium unl"]),
+    ("Home Maintenance", [
+        "hardware", "screw", "nail", "paint", "roller", "drop cloth", "lumber", "drill", "bulb",
+    ]),
+    ("Personal Care", ["shampoo", "conditioner", "toothpaste", "deodorant", "razor", "lotion"]),
+    ("Shopping", ["paper towel", "dish soap", "detergent", "tide", "household"]),
+]
+_RECEIPT_KEYWORD_RES: List[Tuple[str, "re.Pattern[str]"]] = [
+    (cat, re.compile(r"\b(?:" + "|".join(re.escape(k) for k in kws) + r")", re.I))
+    for cat, kws in _RECEIPT_KEYWORDS
+]
+
+
+def _money(value: str) -> Optional[float]:
+    try:
+        return float(value.replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def _safe_date(y: int, m: int, d: int) -> Optional[str]:
+    try:
+        return date(y, m, d).isoformat()
+    except ValueError:
+        return None
+
+
+def _parse_date_match(m: "re.Match[str]") -> Optional[str]:
+    if m.group("iso"):
+        return _safe_date(int(m.group("iy")), int(m.group("im")), int(m.group("id")))
+
+    if m.group("num"):
+        a, b, c = int(m.group("n1")), int(m.group("n2")), m.group("n3")
+        y = int(c)
+        if len(c) == 2:
+            # Same pivot as strptime's %y
+            y += 1900 if y >= 69 else 2000
+        # US month/day first, then day/month for European receipts
+        return _safe_date(y, a, b) or _safe_date(y, b, a)
+
+    if m.group("named"):
+        mon = _MONTHS[m.group("mon")[:3].lower()]
+        return _safe_date(int(m.group("my")), mon, int(m.group("md")))
+
+    return None
+
+
+def _clean_line(raw: str) -> str:
+    line = raw.strip()
+    if line.startswith("|"):
+        # Markdown table row from the OCR output: "| Milk | 2 | 3.98 |"
+        cells = [c.strip() for c in line.strip("|").split("|")]
+        if all(set(c) <= set("-: ") for c in cells):
+            return ""  # header separator row
+        line = " ".join(c for c in cells if c)
+    return line.strip(_MARKDOWN_STRIP)
+
+
+def _parse_item(line: str, amounts: List[Tuple[bool, float, int, int]]) -> Optional[Dict[str, Any]]:
+    """Parse a line item from a line whose last money value is the price."""
+    _, price, start, _ = amounts[-1]
+    head = line[:start].rstrip(" $\t.:")
+    qty: Optional[int] = None
+
+    if len(amounts) > 1:
+        # "Milk 2 @ 1.99 3.98": drop the unit-price clause from the description
+        m = _ITEM_UNIT_SUFFIX_RE.search(head)
+        if m:
+            if m.group(1):
+                qty = int(m.group(1))
+            head = head[: m.start()]
+
+    m = _ITEM_QTY_PREFIX_RE.match(head)
+    if m:
+        if qty is None:
+            qty = int(m.group(1))
+        head = head[m.end():]
+    elif qty is None:
+        # Table layout "Milk 2 3.98": trailing integer column is quantity
+        parts = head.rsplit(" ", 1)
+        if len(parts) == 2 and parts[1].isdigit() and len(parts[1]) <= 3:
+            qty = int(parts[1])
+            head = parts[0]
+
+    name = head.strip(" -:$\t")
+    if not name or not _HAS_ALPHA_RE.search(name):
+        return None
+    return {"name": name, "qty": max(1, qty or 1), "price": round(price, 2)}
+
+
+def _keyword_category(text: str) -> Optional[str]:
+    for cat, pattern in _RECEIPT_KEYWORD_RES:
+        if pattern.search(text):
+            return cat
+    return None
+
+
+def merchant_category(merchant: Optional[str]) -> Optional[str]:
+    """Category implied by the store name alone, or None if it is unknown."""
+    if not merchant:
+        return None
+    # Receipts carry no bank category, so let the keyword heuristics decide.
+    mapped = map_to_fixed_category(csv_type="Withdrawal", csv_category="Other", description=merchant)
+    if mapped != "Other":
+        return mapped
+    return _keyword_category(merchant)
+
+
+def categorize_items(items: List[Dict[str, Any]], store_category: Optional[str]) -> None:
+    """Set a suggested "category" on each item (in place).
+
+    Item keywords win; otherwise the item inherits the store's category.
+    """
+    for item in items:
+        item["category"] = _keyword_category(item.get("name") or "") or store_category or "Other"
+
+
+def suggest_category(merchant: Optional[str], items: List[Dict[str, Any]]) -> str:
+    """Suggest one category for the whole receipt without an LLM call.
+
+    A recognised store decides; otherwise the category holding the largest
+    share of the item prices does.
+    """
+    return merchant_category(merchant) or _category_from_items(items)
+
+
+def _category_from_items(items: List[Dict[str, Any]]) -> str:
+    spend: Dict[str, float] = {}
+    for item in items:
+        cat = item.get("category") or _keyword_category(item.get("name") or "")
+        if cat and cat != "Other":
+            spend[cat] = spend.get(cat, 0.0) + abs(float(item.get("price") or 0.0))
+    if spend:
+        return max(spend, key=spend.get)
+    return "Other"
+
+
+def parse_receipt_text(text: str) -> Dict[str, Any]:
+    """Extract merchant, totals, date, line items and a category from OCR text.
+
+    Makes a single pass over the lines with the module-level patterns above,
+    so it is cheap enough to run on every upload before (or instead of) an
+    LLM call. Fields that cannot be found are returned as None.
+    """
+    merchant: Optional[str] = None
+    first_line: Optional[str] = None
+    total: Optional[float] = None
+    total_is_grand = False
+    subtotal: Optional[float] = None
+    tax: Optional[float] = None
+    date_str: Optional[str] = None
+    items: List[Dict[str, Any]] = []
+    max_dollar: Optional[float] = None
+    max_any: Optional[float] = None
+
+    seen = 0
+    for raw in (text or "").splitlines():
+        line = _clean_line(raw)
+        if not line:
+            continue
+        seen += 1
+        if first_line is None:
+            first_line = line
+
+        # Merchant: first of the top lines that looks like a store name
+        if merchant is None and seen <= 6 and len(line) >= 3:
+            if not _MERCHANT_SKIP_RE.search(line) and not _HAS_DIGIT_RE.search(line):
+                merchant = line
+
+        if date_str is None:
+            dm = _DATE_RE.search(line)
+            if dm:
+                date_str = _parse_date_match(dm)
+
+        amounts: List[Tuple[bool, float, int, int]] = []
+        for mm in _MONEY_RE.finditer(line):
+            v = _money(mm.group(3))
+            if v is None:
+                continue
+            if mm.group(2):
+                v = -v
+            amounts.append((bool(mm.group(1)), v, mm.start(), mm.end()))
+            if max_any is None or v > max_any:
+                max_any = v
+            if mm.group(1) and (max_dollar is None or v > max_dollar):
+                max_dollar = v
+        if not amounts:
+            continue
+
+        sm = _SUBTOTAL_RE.search(line)
+        if sm:
+            if subtotal is None:
+                subtotal = _money(sm.group(1))
+            continue
+
+        tm = _TOTAL_RE.search(line)
+        if tm:
+            # The last total line wins (a post-tip "Total" is what gets
+            # charged), except that an explicit "grand total" is final.
+            if not total_is_grand:
+                total = _money(tm.group(2))
+                total_is_grand = tm.group(1).lower().startswith("grand")
+            continue
+
+        xm = _TAX_RE.search(line)
+        if xm:
+            if tax is None:
+                tax = _money(xm.group(1))
+            continue
+
+        if _NON_ITEM_RE.search(line):
+            continue
+        item = _parse_item(line, amounts)
+        if item is not None:
+            items.append(item)
+
+    # Fallbacks when no explicit total label exists: largest "$" amount, then
+    # the largest money-looking value anywhere.
+    if total is None:
+        total = max_dollar if max_dollar is not None else max_any
+
+    merchant = merchant or first_line
+    store_category = merchant_category(merchant)
+    categorize_items(items, store_category)
+
+    return {
+        "merchant": merchant,
+        "total": float(total) if total is not None else None,
+        "subtotal": subtotal,
+        "tax": tax,
+        "date": date_str,
+        "items": items,
+        "suggestedCategory": store_category or _category_from_items(items),
+    }
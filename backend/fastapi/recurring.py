@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import calendar
+from bisect import bisect_left
+from datetime import date, timedelta
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from dates import date_parser
+from store import StoreView
+
+
+class Cadence(NamedTuple):
+    name: str
+    days: float         # nominal gap between charges
+    tolerance: float    # how far a single gap may drift, in days
+    per_month: float    # charges per month, for estimatedMonthly
+    min_charges: int
+
+
+CADENCES = (
+    Cadence('weekly', 7, 1.5, 52 / 12, 4),
+    Cadence('biweekly', 14, 2.5, 26 / 12, 3),
+    Cadence('monthly', 30.44, 4, 1.0, 3),
+)
+# Needs more history than the detection window; checked over all of it.
+ANNUAL = Cadence('annual', 365.25, 20, 1 / 12, 2)
+
+# Charges count as "the same bill" within 15% (or $1) of the merchant's median.
+_AMOUNT_TOLERANCE = 0.15
+
+_Event = Tuple[int, float, Optional[str]]  # (date ordinal, amount, category)
+_Key = Tuple[bool, str]  # (income?, merchant)
+# Detection windows kept at once (callers look back 4 or 6 months from the latest date).
+_MAX_WINDOWS = 8
+_ordinal = itemgetter(0)
+
+
+class RecurringDetector(StoreView):
+    """Transaction history grouped by merchant, with detected recurring charges.
+
+    Expenses and income (negative amounts, e.g. a salary) are kept apart and
+    matched by magnitude. Each row's date is parsed once, when it is ingested.
+    Patterns are cached per detection window and merchant, and recomputed
+    only for merchants that received new rows since that window was last
+    asked for, so callers using different windows don't evict each other.
+    """
+
+    def reset(self) -> None:
+        self._events: Dict[_Key, List[_Event]] = {}
+        self._unsorted: Set[_Key] = set()
+        # window start ordinal -> merchant patterns, and merchants changed since
+        self._patterns: Dict[int, Dict[_Key, Dict[str, Any]]] = {}
+        self._dirty: Dict[int, Set[_Key]] = {}
+
+    def ingest(self, rows: Iterable[Dict[str, Any]]) -> None:
+        parse = date_parser()
+        changed: Set[_Key] = set()
+        for t in rows:
+            dt = parse(str(t.get('date', '')))
+            if dt is None:
+                continue
+            ordinal = dt.toordinal()
+            try:
+                amt = float(t.get('amount') or 0)
+            except (TypeError, ValueError):
+                continue
+            if amt == 0:
+                continue
+            key = (amt < 0, (t.get('merchant') or 'Unknown').strip() or 'Unknown')
+            history = self._events.get(key)
+            if history is None:
+                history = self._events[key] = []
+            elif ordinal < history[-1][0]:
+                self._unsorted.add(key)
+            history.append((ordinal, abs(amt), t.get('category')))
+            changed.add(key)
+        for dirty in self._dirty.values():
+            dirty |= changed
+
+    def patterns(self, window_start: date, income: bool = False) -> List[Dict[str, Any]]:
+        """Recurring charges (or, with `income`, recurring deposits) seen since
+        `window_start`, one per merchant, unordered. Amounts are positive."""
+        start = window_start.toordinal()
+        with self.lock:
+            for key in self._unsorted:
+                self._events[key].sort(key=_ordinal)
+            self._unsorted.clear()
+
+            cached = self._patterns.get(start)
+            if cached is None:
+                if len(self._patterns) >= _MAX_WINDOWS:
+                    oldest = next(iter(self._patterns))
+                    del self._patterns[oldest], self._dirty[oldest]
+                cached = self._patterns[start] = {}
+                dirty: Iterable[_Key] = self._events.keys()
+            else:
+                dirty = self._dirty[start]
+            for key in dirty:
+                pattern = _detect(key[1], self._events[key], start)
+                if pattern:
+                    cached[key] = pattern
+                else:
+                    cached.pop(key, None)
+            self._dirty[start] = set()
+            return [dict(p) for key, p in cached.items() if key[0] == income]
+
+
+def recurring_patterns(
+    transactions: Iterable[Dict[str, Any]], window_start: date, income: bool = False
+) -> List[Dict[str, Any]]:
+    return RecurringDetector.build(transactions).patterns(window_start, income)
+
+
+def _detect(merchant: str, history: List[_Event], start: int) -> Optional[Dict[str, Any]]:
+    recent = history[bisect_left(history, start, key=_ordinal):]
+    pattern = _match(merchant, recent, CADENCES)
+    if pattern is None and history and history[-1][0] >= start - 366:
+        pattern = _match(merchant, history, (ANNUAL,))
+        # Only while the next yearly charge is due on or after the window start
+        if pattern and date.fromisoformat(pattern['nextExpected']).toordinal() < start:
+            pattern = None
+    return pattern
+
+
+def _match(merchant: str, events: List[_Event], cadences: Tuple[Cadence, ...]) -> Optional[Dict[str, Any]]:
+    if len(events) < min(c.min_charges for c in cadences):
+        return None
+    amounts = sorted(e[1] for e in events)
+    median = amounts[len(amounts) // 2]
+    tolerance = max(1.0, _AMOUNT_TOLERANCE * median)
+    similar = [e for e in events if abs(e[1] - median) <= tolerance]
+    days = sorted({e[0] for e in similar})
+    if len(days) < 2:
+        return None
+    gaps = [b - a for a, b in zip(days, days[1:])]
+    gap = sorted(gaps)[len(gaps) // 2]
+
+    for cadence in cadences:
+        if len(days) < cadence.min_charges or abs(gap - cadence.days) > cadence.tolerance:
+            continue
+        # Most gaps must fit; one skipped or doubled charge is fine.
+        regular = sum(1 for g in gaps if abs(g - cadence.days) <= cadence.tolerance)
+        if regular * 2 < len(gaps):
+            continue
+        month_days = sorted(date.fromordinal(e[0]).day for e in similar)
+        typical_day = month_days[len(month_days) // 2]
+        return {
+            'merchant': merchant,
+            'cadence': cadence.name,
+            'amount': round(median, 2),
+            'estimatedMonthly': round(median * cadence.per_month, 2),
+            'occurrences': len(similar),
+            'category': similar[-1][2],
+            'typicalDay': typical_day,
+            'lastDate': date.fromordinal(days[-1]).isoformat(),
+            'nextExpected': _next_expected(date.fromordinal(days[-1]), cadence, typical_day).isoformat(),
+        }
+    return None
+
+
+def _next_expected(last: date, cadence: Cadence, typical_day: int) -> date:
+    if cadence.name == 'monthly':
+        y, m = (last.year + 1, 1) if last.month == 12 else (last.year, last.month + 1)
+        return date(y, m, min(typical_day, calendar.monthrange(y, m)[1]))
+    return last + timedelta(days=round(cadence.days))
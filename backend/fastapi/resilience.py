@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+
+T = TypeVar("T")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling out when an endpoint's breaker is open."""
+
+
+class BudgetExceededError(TimeoutError):
+    """Raised when the request's latency budget is spent before a call succeeds."""
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+# Defaults; each can be overridden per deployment.
+FAILURE_THRESHOLD = int(_env_float("AI_BREAKER_FAILURES", 3))
+RESET_TIMEOUT_S = _env_float("AI_BREAKER_RESET_SECONDS", 30.0)
+OCR_BUDGET_S = _env_float("OCR_BUDGET_SECONDS", 45.0)
+CHAT_BUDGET_S = _env_float("CHAT_BUDGET_SECONDS", 30.0)
+# Don't start an attempt that can't realistically finish.
+MIN_ATTEMPT_S = 0.5
+
+
+class LatencyBudget:
+    """Wall-clock budget shared by every outbound call made for one request."""
+
+    def __init__(self, seconds: float):
+        self.seconds = float(seconds)
+        self.deadline = time.monotonic() + self.seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+class CircuitBreaker:
+    """Classic closed → open → half-open breaker for one outbound endpoint.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls
+    fail fast for `reset_timeout` seconds; then a single probe is let through
+    and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT_S):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._calls = 0
+        self._rejected = 0
+        self._last_error: Optional[str] = None
+        self._last_latency_ms: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == STATE_OPEN and self._opened_at is not None:
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = STATE_HALF_OPEN
+                self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == STATE_CLOSED:
+                self._calls += 1
+                return True
+            if state == STATE_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._calls += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self, latency_s: float) -> None:
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+            self._last_latency_ms = round(latency_s * 1000.0, 1)
+
+    def record_failure(self, error: BaseException, latency_s: float) -> None:
+        with self._lock:
+            self._failures += 1
+            self._last_error = f"{type(error).__name__}: {error}"[:300]
+            self._last_latency_ms = round(latency_s * 1000.0, 1)
+            if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Free the half-open probe slot after an attempt that ended without an
+        outcome (cancelled or interrupted), so the next call can probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == STATE_OPEN and self._opened_at is not None:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+            return {
+                "state": state,
+                "consecutiveFailures": self._failures,
+                "calls": self._calls,
+                "rejected": self._rejected,
+                "retryInSeconds": retry_in,
+                "lastError": self._last_error,
+                "lastLatencyMs": self._last_latency_ms,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Provider-side failures are retried (and count against the breaker); 4xx are not."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        return code == 429 or code >= 500
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, TimeoutError))
+
+
+def _provider_answered(exc: BaseException) -> bool:
+    """A 4xx means the provider is up and rejected the request; anything else
+    (including SDK-specific errors) counts against the breaker."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        return 400 <= code < 500 and code != 429
+    return False
+
+
+def _attempt_timeout(budget: LatencyBudget, per_attempt: Optional[float]) -> float:
+    remaining = budget.remaining()
+    if remaining < MIN_ATTEMPT_S:
+        raise BudgetExceededError(f"latency budget of {budget.seconds:.0f}s exhausted")
+    return min(remaining, per_attempt) if per_attempt else remaining
+
+
+def call_with_resilience(
+    name: str,
+    fn: Callable[[float], T],
+    budget: LatencyBudget,
+    attempts: int = 3,
+    per_attempt_timeout: Optional[float] = None,
+    backoff: float = 0.5,
+) -> T:
+    """Call `fn(timeout)` through the `name` breaker, retrying within `budget`."""
+    breaker = get_breaker(name)
+    last_exc: Optional[BaseException] = None
+    attempts = max(1, attempts)
+    for attempt in range(attempts):
+        # Check the budget before allow(): a claimed half-open probe must be settled.
+        timeout = _attempt_timeout(budget, per_attempt_timeout)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{name} circuit is open") from last_exc
+        started = time.monotonic()
+        settled = False
+        try:
+            out = fn(timeout)
+        except Exception as e:
+            settled = True
+            if _provider_answered(e):
+                breaker.record_success(time.monotonic() - started)
+                raise
+            breaker.record_failure(e, time.monotonic() - started)
+            if not is_retryable(e):
+                raise
+            last_exc = e
+        else:
+            settled = True
+            breaker.record_success(time.monotonic() - started)
+            return out
+        finally:
+            if not settled:
+                breaker.release()
+        print(f"⚠️  {name} attempt {attempt + 1} failed: {last_exc}")
+        if attempt == attempts - 1:
+            break
+        pause = min(backoff * (2 ** attempt), budget.remaining() - MIN_ATTEMPT_S)
+        if pause > 0:
+            time.sleep(pause)
+    assert last_exc is not None
+    raise last_exc
+
+
+async def acall_with_resilience(
+    name: str,
+    fn: Callable[[float], Awaitable[T]],
+    budget: LatencyBudget,
+    attempts: int = 2,
+    per_attempt_timeout: Optional[float] = None,
+    backoff: float = 0.5,
+) -> T:
+    """Async twin of call_with_resilience; the attempt is also cancelled at its timeout."""
+    breaker = get_breaker(name)
+    last_exc: Optional[BaseException] = None
+    attempts = max(1, attempts)
+    for attempt in range(attempts):
+        # Check the budget before allow(): a claimed half-open probe must be settled.
+        timeout = _attempt_timeout(budget, per_attempt_timeout)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{name} circuit is open") from last_exc
+        started = time.monotonic()
+        settled = False
+        try:
+            out = await asyncio.wait_for(fn(timeout), timeout=timeout)
+        except Exception as e:
+            settled = True
+            if _provider_answered(e):
+                breaker.record_success(time.monotonic() - started)
+                raise
+            breaker.record_failure(e, time.monotonic() - started)
+            if not is_retryable(e):
+                raise
+            last_exc = e
+        else:
+            settled = True
+            breaker.record_success(time.monotonic() - started)
+            return out
+        finally:
+            if not settled:
+                breaker.release()
+        print(f"⚠️  {name} attempt {attempt + 1} failed: {last_exc!r}")
+        if attempt == attempts - 1:
+            break
+        pause = min(backoff * (2 ** attempt), budget.remaining() - MIN_ATTEMPT_S)
+        if pause > 0:
+            await asyncio.sleep(pause)
+    assert last_exc is not None
+    raise last_exc
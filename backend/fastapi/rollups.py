@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import calendar
+import heapq
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dates import Month, date_parser, shift_month
+from store import StoreView
+
+
+def category_name(t: Dict[str, Any]) -> str:
+    return (t.get('category') or 'Other').strip() or 'Other'
+
+
+class MonthlyRollup(StoreView):
+    """Expense totals per (year, month) and category, maintained as rows arrive.
+
+    Also keeps the all-time figures get_spending_summary reports: total and
+    per-category spend (including rows whose date doesn't parse, which have
+    no month), and the largest expense; and money in per month (income and
+    refunds, i.e. negative amounts) for net cashflow.
+    """
+
+    def reset(self) -> None:
+        self.months: Dict[Month, Dict[str, float]] = {}
+        self.month_totals: Dict[Month, float] = {}
+        self.inflows: Dict[Month, float] = {}
+        self.categories: Dict[str, float] = {}
+        self.total = 0.0
+        self.largest: Optional[Dict[str, Any]] = None
+        self._largest_amount = 0.0
+        # Arrival position of each category's (and month's) latest row, to
+        # order ties the way a newest-first scan would have met them
+        self._last_seen: Dict[str, int] = {}
+        self._month_seen: Dict[Month, int] = {}
+        self._arrivals = 0
+
+    def ingest(self, rows: Iterable[Dict[str, Any]]) -> None:
+        parse = date_parser()
+        for t in rows:
+            try:
+                amt = float(t.get('amount') or 0)
+            except (TypeError, ValueError):
+                continue
+            if amt < 0:
+                dt = parse(str(t.get('date', '')))
+                if dt is not None:
+                    key = (dt.year, dt.month)
+                    self.inflows[key] = self.inflows.get(key, 0.0) - amt
+                continue
+            if amt == 0:
+                continue
+            cat = category_name(t)
+            self._arrivals += 1
+            self._last_seen[cat] = self._arrivals
+            self.categories[cat] = self.categories.get(cat, 0.0) + amt
+            self.total += amt
+            if amt >= self._largest_amount:  # ties go to the newer row
+                self.largest, self._largest_amount = t, amt
+            dt = parse(str(t.get('date', '')))
+            if dt is None:
+                continue
+            key = (dt.year, dt.month)
+            bucket = self.months.setdefault(key, {})
+            bucket[cat] = bucket.get(cat, 0.0) + amt
+            self.month_totals[key] = self.month_totals.get(key, 0.0) + amt
+            self._month_seen[key] = self._arrivals
+
+    def top_categories(self, n: int) -> List[Tuple[str, float]]:
+        """The `n` categories with the most all-time spend; ties go to the most recently used."""
+        with self.lock:
+            return heapq.nsmallest(n, self.categories.items(), key=lambda kv: (-kv[1], -self._last_seen[kv[0]]))
+
+    def highest_month(self) -> Optional[Tuple[Month, float]]:
+        """The month with the most spend; ties go to the most recently used."""
+        with self.lock:
+            if not self.month_totals:
+                return None
+            return max(self.month_totals.items(), key=lambda kv: (kv[1], self._month_seen[kv[0]]))
+
+    @property
+    def first_month(self) -> Optional[Month]:
+        with self.lock:
+            return min(self.months) if self.months else None
+
+    def category_series(self, end: Month, months: int) -> Dict[str, List[float]]:
+        """Monthly spend per category for the `months` months ending with `end`,
+        oldest first, with zeros for months without spend."""
+        keys = [shift_month(end, i - months + 1) for i in range(months)]
+        series: Dict[str, List[float]] = {}
+        with self.lock:
+            for i, key in enumerate(keys):
+                for cat, spent in self.months.get(key, {}).items():
+                    series.setdefault(cat, [0.0] * months)[i] = spent
+        return series
+
+
+class DailyRollup(StoreView):
+    """Expense per day of month, per (year, month) and category, maintained as rows arrive."""
+
+    def reset(self) -> None:
+        self.months: Dict[Month, Dict[str, List[float]]] = {}
+
+    def ingest(self, rows: Iterable[Dict[str, Any]]) -> None:
+        parse = date_parser()
+        for t in rows:
+            try:
+                amt = float(t.get('amount') or 0)
+            except (TypeError, ValueError):
+                continue
+            if amt <= 0:
+                continue
+            dt = parse(str(t.get('date', '')))
+            if dt is None:
+                continue
+            bucket = self.months.setdefault((dt.year, dt.month), {})
+            cat = category_name(t)
+            days = bucket.get(cat)
+            if days is None:
+                days = bucket[cat] = [0.0] * calendar.monthrange(dt.year, dt.month)[1]
+            days[dt.day - 1] += amt
+
+    def month(self, y: int, m: int) -> Dict[str, List[float]]:
+        """Category -> spend per day (index 0 is the 1st) for one month, copied."""
+        with self.lock:
+            return {cat: list(days) for cat, days in self.months.get((y, m), {}).items()}
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from array import array
+import json
+import os
+from pathlib import Path
+import struct
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from fingerprint import tx_fingerprint
+
+
+# Binary datastore: a small JSON header followed by one block per column.
+#
+#   MAGIC | u32 header length | header JSON | column blocks...
+#
+# Numeric columns are raw `array` bytes; string columns are UTF-8 joined by
+# NUL, with None stored as "\x01". Besides the transaction fields, each row
+# carries its de-dupe fingerprint so loads don't recompute it.
+MAGIC = b'PFSNAP\x00\x01'
+
+_BASE_FIELDS = ('id', 'date', 'merchant', 'amount', 'category', 'description')
+_SEP = '\x00'
+_NONE = '\x01'
+# Written by earlier versions and never read; skipped on load.
+_UNUSED_COLUMNS = frozenset(('date_ordinal', 'amount_cents'))
+
+
+class Snapshot(NamedTuple):
+    rows: List[Dict[str, Any]]          # newest first, like data.json
+    fingerprints: List[str]             # aligned with rows
+    meta: Dict[str, Any]                # settings stored alongside (budgets, goals, ...)
+
+
+def _encode_strings(values: List[Optional[str]]) -> tuple[str, bytes]:
+    has_none = False
+    out: List[str] = []
+    for v in values:
+        if v is None:
+            has_none = True
+            out.append(_NONE)
+            continue
+        s = str(v)
+        if _SEP in s or s == _NONE:
+            return 'json', json.dumps(values).encode('utf-8')
+        out.append(s)
+    return ('str?' if has_none else 'str'), _SEP.join(out).encode('utf-8')
+
+
+def _decode(enc: str, blob: bytes, n: int, swap: bool) -> Any:
+    if enc in ('str', 'str?'):
+        values: List[Any] = blob.decode('utf-8').split(_SEP) if n else []
+        if enc == 'str?':
+            values = [None if v == _NONE else v for v in values]
+        return values
+    if enc == 'json':
+        return json.loads(blob)
+    arr = array(enc)
+    arr.frombytes(blob)
+    if swap:
+        arr.byteswap()
+    return arr
+
+
+def save(path: Path, rows: List[Dict[str, Any]], fingerprints: Optional[List[str]], meta: Dict[str, Any]) -> None:
+    """Write `rows` (newest first) and `meta` to `path` atomically."""
+    if fingerprints is None or len(fingerprints) != len(rows):
+        fingerprints = [tx_fingerprint(t) for t in rows]
+
+    blocks: List[tuple[str, str, bytes]] = []
+    for field in ('id', 'date', 'merchant', 'category', 'description'):
+        enc, blob = _encode_strings([t.get(field) for t in rows])
+        blocks.append((field, enc, blob))
+    blocks.append(('amount', 'd', array('d', [float(t.get('amount') or 0) for t in rows]).tobytes()))
+    enc, blob = _encode_strings(fingerprints)
+    blocks.append(('fingerprint', enc, blob))
+
+    # Anything beyond the standard fields (rare) rides along as JSON.
+    extras = [{k: v for k, v in t.items() if k not in _BASE_FIELDS} or None for t in rows]
+    if any(extras):
+        blocks.append(('extra', 'json', json.dumps(extras).encode('utf-8')))
+
+    header = json.dumps({
+        'rows': len(rows),
+        'byteorder': sys.byteorder,
+        'columns': [{'name': name, 'enc': enc, 'bytes': len(blob)} for name, enc, blob in blocks],
+        'meta': meta,
+    }).encode('utf-8')
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for _, _, blob in blocks:
+            f.write(blob)
+    os.replace(tmp, path)
+
+
+def load(path: Path) -> Snapshot:
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f'{path} is not a datastore snapshot')
+    pos = len(MAGIC)
+    (header_len,) = struct.unpack_from('<I', data, pos)
+    pos += 4
+    header = json.loads(data[pos:pos + header_len])
+    pos += header_len
+
+    n = int(header['rows'])
+    swap = header.get('byteorder', sys.byteorder) != sys.byteorder
+    cols: Dict[str, Any] = {}
+    for col in header['columns']:
+        if col['name'] not in _UNUSED_COLUMNS:
+            cols[col['name']] = _decode(col['enc'], data[pos:pos + col['bytes']], n, swap)
+        pos += col['bytes']
+    del data
+
+    rows = [
+        {'id': i, 'date': d, 'merchant': m, 'amount': a, 'category': c, 'description': s}
+        for i, d, m, a, c, s in zip(
+            cols['id'], cols['date'], cols['merchant'], cols['amount'].tolist(), cols['category'], cols['description']
+        )
+    ]
+    for t, extra in zip(rows, cols.get('extra') or ()):
+        if extra:
+            t.update(extra)
+
+    return Snapshot(
+        rows=rows,
+        fingerprints=cols['fingerprint'],
+        meta=header.get('meta') or {},
+    )
+
+
+def is_snapshot(path: Path) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def import_json(json_path: Path, path: Path) -> int:
+    """Convert a data.json datastore into a binary snapshot; returns the row count."""
+    data = json.loads(Path(json_path).read_text(encoding='utf-8'))
+    rows = data.get('transactions') or []
+    fps = [tx_fingerprint(t) for t in rows]
+    meta = {k: v for k, v in data.items() if k not in ('transactions', 'dedupe_index')}
+    # Clean only if there are no duplicates; otherwise the app dedupes on its next start.
+    meta['dedupe_watermark'] = len(rows) if len(set(fps)) == len(fps) else 0
+    save(Path(path), rows, fps, meta)
+    return len(rows)
+
+
+def export_json(path: Path, json_path: Path) -> int:
+    """Convert a binary snapshot back into the portable data.json layout; returns the row count."""
+    snap = load(Path(path))
+    meta = dict(snap.meta)
+    watermark = int(meta.pop('dedupe_watermark', 0) or 0)
+    data = {
+        'transactions': snap.rows,
+        **meta,
+        'dedupe_index': {'watermark': watermark, 'fingerprints': snap.fingerprints[::-1][:watermark]},
+    }
+    tmp = Path(json_path).with_name(Path(json_path).name + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, json_path)
+    return len(snap.rows)
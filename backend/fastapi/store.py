@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import random
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Type, TypeVar
+
+from fingerprint import tx_fingerprint
+
+
+# Persisted fingerprints are spot-checked against this many rows on load.
+_FP_SPOT_CHECKS = 8
+
+
+class TransactionStore:
+    """The in-memory transaction table.
+
+    Rows are kept in an append-only list (oldest first) and iterated in
+    reverse, so callers still see the newest-first order of the old
+    `transactions.insert(0, ...)` list while inserts stay O(1). A reversed
+    iterator also stays valid when another thread appends mid-iteration
+    (rows added after it started are simply not seen), which a deque does not.
+
+    Rows are indexed by id and by de-dupe fingerprint. `version` increases on
+    every change so derived data can be cached per version; callers that edit
+    a row in place must call touch(). `epoch` increases only when existing
+    rows may have changed (touch, dedupe): while it is unchanged the table has
+    only grown, so derived data (see StoreView) can catch up from rows_since().
+
+    Fingerprints are kept in a list parallel to the rows and persisted with
+    them (see dedupe_index()). Rows below the "clean" watermark are known to
+    be fingerprinted and duplicate-free, so a restart only fingerprints rows
+    added since, e.g. by an external import.
+    """
+
+    def __init__(
+        self,
+        rows: Iterable[Dict[str, Any]] = (),
+        fingerprint: Callable[[Dict[str, Any]], str] = tx_fingerprint,
+        dedupe_index: Optional[Dict[str, Any]] = None,
+    ):
+        self._fingerprint = fingerprint
+        self.version = 0
+        self.epoch = 0
+        self._views: Dict[type, StoreView] = {}
+        self._views_lock = threading.Lock()
+        oldest_first = list(rows)[::-1]
+        trusted = self._trusted_fingerprints(oldest_first, dedupe_index)
+        # Rows past the persisted watermark (or all of them, if there was none)
+        self.fingerprinted_on_load = len(oldest_first) - len(trusted)
+        self._load(oldest_first, trusted)
+
+    def _trusted_fingerprints(self, oldest_first: List[Dict[str, Any]], index: Optional[Dict[str, Any]]) -> List[str]:
+        """Persisted fingerprints for the oldest rows, or [] if they don't match the rows."""
+        if not isinstance(index, dict):
+            return []
+        fps = index.get('fingerprints')
+        watermark = index.get('watermark')
+        if not isinstance(fps, list) or watermark != len(fps) or watermark > len(oldest_first):
+            return []
+        if watermark:
+            rng = random.Random(watermark)
+            sample = {0, watermark - 1, *(rng.randrange(watermark) for _ in range(_FP_SPOT_CHECKS))}
+            if any(self._fingerprint(oldest_first[i]) != fps[i] for i in sample):
+                return []
+        return fps
+
+    def _load(self, oldest_first: List[Dict[str, Any]], known_fps: Sequence[str] = ()) -> None:
+        self._rows = oldest_first
+        fps = list(known_fps)
+        fps.extend(self._fingerprint(t) for t in oldest_first[len(fps):])
+        self._fps = fps
+
+        # Built oldest first, so the newest copy of a duplicated row wins.
+        self._by_fp: Dict[str, Dict[str, Any]] = dict(zip(fps, oldest_first))
+        self._by_id: Dict[str, Dict[str, Any]] = {t['id']: t for t in oldest_first if 'id' in t}
+        # Everything is fingerprinted now; it is clean once duplicates are gone.
+        self._watermark = len(oldest_first) if len(self._by_fp) == len(oldest_first) else len(known_fps)
+        self.version += 1
+        self.epoch += 1
+
+    # -------- reads --------
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return reversed(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Newest-first copy, e.g. for JSON responses and persistence."""
+        return self._rows[::-1]
+
+    def rows_since(self, count: int) -> List[Dict[str, Any]]:
+        """Rows added after the first `count`, oldest first."""
+        return self._rows[count:]
+
+    def get(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(transaction_id)
+
+    def find(self, fp: str) -> Optional[Dict[str, Any]]:
+        """The stored row with this fingerprint, if any."""
+        return self._by_fp.get(fp)
+
+    @property
+    def duplicate_count(self) -> int:
+        return len(self._rows) - len(self._by_fp)
+
+    @property
+    def watermark(self) -> int:
+        return self._watermark
+
+    def fingerprints(self) -> List[str]:
+        """Fingerprints aligned with to_list() (newest first)."""
+        return self._fps[::-1]
+
+    def dedupe_index(self) -> Dict[str, Any]:
+        """Persistable form: fingerprints of the oldest `watermark` rows, oldest first
+        (so fingerprints[k] belongs to the k-th row from the end of to_list())."""
+        return {'watermark': self._watermark, 'fingerprints': self._fps[:self._watermark]}
+
+    # -------- writes --------
+
+    def add(self, row: Dict[str, Any], fp: Optional[str] = None) -> Dict[str, Any]:
+        """Insert `row` as the newest transaction."""
+        fp = fp if fp is not None else self._fingerprint(row)
+        clean = self._watermark == len(self._rows) and fp not in self._by_fp
+        self._rows.append(row)
+        self._fps.append(fp)
+        self._by_id[row['id']] = row
+        self._by_fp[fp] = row
+        if clean:
+            self._watermark += 1
+        self.version += 1
+        return row
+
+    def touch(self) -> None:
+        """Record that a stored row was edited in place."""
+        self.version += 1
+        self.epoch += 1
+
+    def dedupe(self) -> int:
+        """Drop older copies of rows that share a fingerprint; returns how many were removed."""
+        removed = self.duplicate_count
+        if removed:
+            kept = [i for i, t in enumerate(self._rows) if self._by_fp.get(self._fps[i]) is t]
+            self._load([self._rows[i] for i in kept], [self._fps[i] for i in kept])
+        return removed
+
+    # -------- derived data --------
+
+    def view(self, cls: Type[V]) -> V:
+        """This store's instance of `cls`, brought up to date with the current rows."""
+        with self._views_lock:
+            view = self._views.get(cls)
+            if view is None:
+                view = self._views[cls] = cls()
+        # Synced under the view's own lock, so one slow view doesn't block the others.
+        view.sync(self)
+        return view  # type: ignore[return-value]
+
+
+V = TypeVar('V', bound='StoreView')
+
+
+class StoreView(ABC):
+    """Data derived from a TransactionStore and maintained incrementally.
+
+    Subclasses implement reset() and ingest(rows). sync() replays only the
+    rows appended since the last call, and rebuilds from scratch when the
+    store's epoch says existing rows changed. `version` is the store version
+    the view reflects, for caching results computed from it.
+
+    A store's views are shared by request threads: sync() holds `lock`, and
+    so must anything that reads the view's state (query methods take it
+    themselves; code reading attributes directly wraps them in `with view.lock`).
+    """
+
+    def __init__(self) -> None:
+        self.version = -1
+        self._epoch = -1
+        self._seen = 0
+        self.lock = threading.RLock()
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Drop everything derived so far."""
+
+    @abstractmethod
+    def ingest(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Add rows, oldest first."""
+
+    def sync(self, store: TransactionStore) -> None:
+        with self.lock:
+            version = store.version
+            if version == self.version:
+                return
+            if store.epoch != self._epoch:
+                self.reset()
+                self._epoch, self._seen = store.epoch, 0
+            rows = store.rows_since(self._seen)
+            self.ingest(rows)
+            self._seen += len(rows)
+            self.version = version
+
+    @classmethod
+    def build(cls: Type[V], transactions: Iterable[Dict[str, Any]]) -> V:
+        """The view for `transactions`: cached on a store, one-off for a plain list (newest first)."""
+        if isinstance(transactions, TransactionStore):
+            return transactions.view(cls)
+        view = cls()
+        view.reset()
+        view.ingest(list(transactions)[::-1])
+        return view
+
+
+class VersionedCache(StoreView):
+    """Results computed from a store, dropped whenever the store changes.
+
+    `data` is shared by every caller on the same store, so keys should be
+    namespaced by what they cache, e.g. ('projected_bills', year, month).
+    """
+
+    def reset(self) -> None:
+        self.data: Dict[Any, Any] = {}
+
+    def ingest(self, rows: Iterable[Dict[str, Any]]) -> None:
+        self.data = {}
+
+    def get(self, key: Any, compute: Callable[[], Any]) -> Any:
+        """data[key], computing it on a miss. compute() runs without the lock
+        (it may build other views); its result is only kept if the store
+        wasn't synced to a newer version meanwhile."""
+        with self.lock:
+            if key in self.data:
+                return self.data[key]
+            version = self.version
+        value = compute()
+        with self.lock:
+            if self.version == version:
+                return self.data.setdefault(key, value)
+        return value
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+from bisect import bisect_left
 from dataclasses import dataclass
+from functools import lru_cache
 import re
-from typing import Optional
+from typing import Any, Iterable, Optional
 
 
 FIXED_CATEGORIES: list[str] = [
@@ -161,9 +163,128 @@ _TRAVEL_KEYWORDS = [
 ]
 
 
-def _contains_any(text: str, keywords: list[str]) -> bool:
-    t = text.lower()
-    return any(k in t for k in keywords)
+_PERSONAL_CARE_KEYWORDS = [
+    "barber",
+    "nail",
+    "spa",
+    "hair",
+]
+
+
+class _KeywordAutomaton:
+    """Aho-Corasick automaton over all keyword lists, compiled to a DFA.
+
+    groups_in(text) returns the names of every list with at least one keyword
+    occurring in text (the same answer as `k in text` per keyword), in one
+    pass over the characters instead of one substring scan per keyword.
+    """
+
+    def __init__(self, groups: dict[str, list[str]]):
+        goto: list[dict[str, int]] = [{}]
+        out: list[set[str]] = [set()]
+        for name, keywords in groups.items():
+            for kw in keywords:
+                state = 0
+                for ch in kw:
+                    nxt = goto[state].get(ch)
+                    if nxt is None:
+                        goto.append({})
+                        out.append(set())
+                        nxt = len(goto) - 1
+                        goto[state][ch] = nxt
+                    state = nxt
+                out[state].add(name)
+
+        # Breadth-first failure links; each state's transition table is its
+        # failure state's table overlaid with its own edges (a full DFA, so
+        # matching never follows failure links at runtime).
+        fail = [0] * len(goto)
+        delta: list[dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = list(goto[0].values())
+        while queue:
+            next_queue: list[int] = []
+            for state in queue:
+                for ch, child in goto[state].items():
+                    fail[child] = delta[fail[state]].get(ch, 0)
+                    out[child] |= out[fail[child]]
+                    next_queue.append(child)
+                table = dict(delta[fail[state]])
+                table.update(goto[state])
+                delta[state] = table
+            queue = next_queue
+
+        self._delta = delta
+        self._out: list[frozenset[str]] = [frozenset(o) for o in out]
+
+    def groups_in(self, text: str) -> set[str]:
+        delta, out = self._delta, self._out
+        state = 0
+        hits: set[str] = set()
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                hits |= out[state]
+        return hits
+
+
+_KEYWORDS = _KeywordAutomaton(
+    {
+        "dining": _DINING_KEYWORDS,
+        "subscription": _SUBSCRIPTION_KEYWORDS,
+        "fitness": _FITNESS_KEYWORDS,
+        "health": _HEALTH_KEYWORDS,
+        "insurance": _INSURANCE_KEYWORDS,
+        "travel": _TRAVEL_KEYWORDS,
+        "home_maintenance": _HOME_MAINT_KEYWORDS,
+        "shopping": _SHOPPING_KEYWORDS,
+        "transport": _TRANSPORT_KEYWORDS,
+        "personal_care": _PERSONAL_CARE_KEYWORDS,
+    }
+)
+
+# Priority order for rows whose CSV category is missing or too generic.
+_HEURISTIC_ORDER: list[tuple[str, str]] = [
+    ("dining", "Dining & Coffee"),
+    ("subscription", "Subscriptions"),
+    ("fitness", "Fitness & Wellness"),
+    ("health", "Health & Medical"),
+    ("insurance", "Insurance"),
+    ("travel", "Travel"),
+    ("home_maintenance", "Home Maintenance"),
+    ("shopping", "Shopping"),
+    ("transport", "Transportation"),
+]
+
+# Direct category mappings from the CSV
+_DIRECT_CATEGORIES: dict[str, str] = {
+    "Groceries": "Groceries",
+    "Coffee Shops": "Dining & Coffee",
+    "Dining Out": "Dining & Coffee",
+    "Food Delivery": "Dining & Coffee",
+    "Gas/Fuel": "Transportation",
+    "Rideshare": "Transportation",
+    "Public Transit": "Transportation",
+    "Parking": "Transportation",
+    "Utilities": "Utilities & Bills",
+    "Internet/Phone": "Utilities & Bills",
+    "Streaming/Subscriptions": "Subscriptions",
+    "Online/Retail Shopping": "Shopping",
+    "Clothing": "Clothing",
+    "Personal Care": "Personal Care",
+    "Pharmacy": "Health & Medical",
+    "Healthcare": "Health & Medical",
+    "Pet Care": "Pets",
+    "Movies/Entertainment": "Entertainment",
+    "Education": "Education",
+    "Insurance": "Insurance",
+    "Travel/Hotel": "Travel",
+    "Airfare": "Travel",
+    "ATM Withdrawal": "Cash & ATM",
+    "Home EMI": "Housing & Rent",
+    "Car EMI": "Debt Payments",
+    "Personal Loan EMI": "Debt Payments",
+    "Home Improvement": "Home Maintenance",
+}
 
 
 def map_to_fixed_category(
@@ -192,74 +313,213 @@ def map_to_fixed_category(
             return "Income"
         return "Transfers"
 
-    # Direct category mappings from the CSV
-    direct = {
-        "Groceries": "Groceries",
-        "Coffee Shops": "Dining & Coffee",
-        "Dining Out": "Dining & Coffee",
-        "Food Delivery": "Dining & Coffee",
-        "Gas/Fuel": "Transportation",
-        "Rideshare": "Transportation",
-        "Public Transit": "Transportation",
-        "Parking": "Transportation",
-        "Utilities": "Utilities & Bills",
-        "Internet/Phone": "Utilities & Bills",
-        "Streaming/Subscriptions": "Subscriptions",
-        "Online/Retail Shopping": "Shopping",
-        "Clothing": "Clothing",
-        "Personal Care": "Personal Care",
-        "Pharmacy": "Health & Medical",
-        "Healthcare": "Health & Medical",
-        "Pet Care": "Pets",
-        "Movies/Entertainment": "Entertainment",
-        "Education": "Education",
-        "Insurance": "Insurance",
-        "Travel/Hotel": "Travel",
-        "Airfare": "Travel",
-        "ATM Withdrawal": "Cash & ATM",
-        "Home EMI": "Housing & Rent",
-        "Car EMI": "Debt Payments",
-        "Personal Loan EMI": "Debt Payments",
-        "Home Improvement": "Home Maintenance",
-    }
-
     # Special cases where the CSV category is too broad
     if c in ("EMI/Loans",):
         # EMI/Loans includes both insurance premiums and subscriptions in your file
-        if _contains_any(d, _INSURANCE_KEYWORDS):
+        hits = _KEYWORDS.groups_in(dl)
+        if "insurance" in hits:
             return "Insurance"
-        if _contains_any(d, _SUBSCRIPTION_KEYWORDS):
+        if "subscription" in hits:
             return "Subscriptions"
         return "Debt Payments"
 
-    mapped = direct.get(c)
+    mapped = _DIRECT_CATEGORIES.get(c)
 
-    # Heuristic refinement (works well for CSV rows labeled "Other")
+    # Heuristic refinement (works well for CSV rows labeled "Other"); every
+    # keyword list is matched in a single pass over the description.
     if mapped is None or mapped == "Other":
-        if _contains_any(d, _DINING_KEYWORDS):
-            return "Dining & Coffee"
-        if _contains_any(d, _SUBSCRIPTION_KEYWORDS):
-            return "Subscriptions"
-        if _contains_any(d, _FITNESS_KEYWORDS):
-            return "Fitness & Wellness"
-        if _contains_any(d, _HEALTH_KEYWORDS):
-            return "Health & Medical"
-        if _contains_any(d, _INSURANCE_KEYWORDS):
-            return "Insurance"
-        if _contains_any(d, _TRAVEL_KEYWORDS):
-            return "Travel"
-        if _contains_any(d, _HOME_MAINT_KEYWORDS):
-            return "Home Maintenance"
-        if _contains_any(d, _SHOPPING_KEYWORDS):
-            return "Shopping"
-        if _contains_any(d, _TRANSPORT_KEYWORDS):
-            return "Transportation"
+        hits = _KEYWORDS.groups_in(dl)
+        for group, category in _HEURISTIC_ORDER:
+            if group in hits:
+                return category
+        personal_care = "personal_care" in hits
+    else:
+        personal_care = any(k in dl for k in _PERSONAL_CARE_KEYWORDS)
 
     # Personal care bucket (kept separate because it appears a lot)
-    if c == "Personal Care" or "barber" in dl or "nail" in dl or "spa" in dl or "hair" in dl:
+    if c == "Personal Care" or personal_care:
         return "Personal Care"
 
     if mapped:
         return mapped
 
     return "Other"
+
+
+# -----------------
+# Learned merchant -> category memo
+# -----------------
+
+_MERCHANT_PREFIXES = ("debit card purchase ", "pos purchase ", "pos ", "payroll direct deposit - ")
+_MERCHANT_NOISE_RE = re.compile(r"[^a-z& ]+")
+
+# A learned (not user-pinned) entry is trusted once this many rows agree and
+# the top category holds at least this share of them.
+_MEMO_MIN_COUNT = 2
+_MEMO_MIN_SHARE = 0.9
+# Fallback buckets mean "no rule matched", not a categorization; the memo
+# never learns or answers them so later rules can still reach the merchant.
+_MEMO_UNLEARNED = frozenset(("Other",))
+
+
+@lru_cache(maxsize=65536)
+def normalize_merchant(name: str) -> str:
+    """Case-, digit- and punctuation-insensitive merchant key ("KROGER #417" -> "kroger")."""
+    t = (name or "").strip().lower()
+    for prefix in _MERCHANT_PREFIXES:
+        if t.startswith(prefix):
+            t = t[len(prefix):]
+            break
+    return " ".join(_MERCHANT_NOISE_RE.sub(" ", t).split())
+
+
+class MerchantCategoryMemo:
+    """Normalized merchant -> category table consulted before the rule cascade
+    for withdrawals.
+
+    Each entry counts how often a merchant landed in each category, so the
+    memo only answers for merchants that are categorized consistently
+    (rows for the same store can legitimately differ, e.g. Target groceries vs
+    Target shopping). A user recategorization pins the entry outright. The
+    "Other" fallback is never learned, so rules still decide those merchants.
+
+    Serialized form (stored in data.json under "merchant_categories"):
+        {"kroger": {"counts": {"Groceries": 41}, "pinned": null}, ...}
+    """
+
+    def __init__(self, entries: Optional[dict[str, Any]] = None):
+        self._entries: dict[str, dict[str, Any]] = {}
+        for key, entry in (entries or {}).items():
+            if isinstance(entry, dict):
+                pinned = entry.get("pinned")
+                self._entries[key] = {
+                    "counts": {
+                        str(c): int(n) for c, n in (entry.get("counts") or {}).items() if c not in _MEMO_UNLEARNED
+                    },
+                    "pinned": pinned if pinned not in _MEMO_UNLEARNED else None,
+                }
+        self._answers: dict[str, Optional[str]] = {}
+        self._sorted_keys: Optional[list[str]] = None
+
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[dict]) -> "MerchantCategoryMemo":
+        memo = cls()
+        for t in transactions:
+            memo.observe(t.get("merchant") or "", t.get("category") or "")
+        return memo
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def snapshot(self) -> "MerchantCategoryMemo":
+        """Independent copy; imports look up against one so results don't depend on row order."""
+        return MerchantCategoryMemo(self._entries)
+
+    def to_dict(self) -> dict[str, Any]:
+        return self._entries
+
+    def _touch(self, key: str) -> dict[str, Any]:
+        self._answers.pop(key, None)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {"counts": {}, "pinned": None}
+            self._sorted_keys = None
+        return entry
+
+    def observe(self, merchant: str, category: str, previous: Optional[str] = None) -> None:
+        """Record that a row for `merchant` is in `category` (moving it from `previous`).
+
+        Fallback categories ("Other") are not recorded; moving a row into one
+        only drops its previous count.
+        """
+        key = normalize_merchant(merchant)
+        if not key or not category or category == previous:
+            return
+        learned = category not in _MEMO_UNLEARNED
+        if not learned and not (previous and previous in self._entries.get(key, {}).get("counts", {})):
+            return
+        counts = self._touch(key)["counts"]
+        if previous and counts.get(previous):
+            counts[previous] -= 1
+            if not counts[previous]:
+                del counts[previous]
+        if learned:
+            counts[category] = counts.get(category, 0) + 1
+
+    def pin(self, merchant: str, category: str) -> None:
+        """User recategorization: this merchant is `category` from now on."""
+        key = normalize_merchant(merchant)
+        if not key or not category:
+            return
+        if category in _MEMO_UNLEARNED:
+            # Back to "uncategorized": unpin and let the rules decide again.
+            if self._entries.get(key, {}).get("pinned") is not None:
+                self._touch(key)["pinned"] = None
+            return
+        self._touch(key)["pinned"] = category
+
+    @staticmethod
+    def _answer(counts: dict[str, int]) -> Optional[str]:
+        total = sum(counts.values())
+        if total < _MEMO_MIN_COUNT:
+            return None
+        top = max(counts, key=counts.get)
+        return top if counts[top] >= _MEMO_MIN_SHARE * total else None
+
+    def lookup(self, merchant: str, prefix: bool = False) -> Optional[str]:
+        """Category for `merchant`, or None if unknown or ambiguous.
+
+        With prefix=True a short name (a receipt's "KROGER") also matches
+        longer statement merchants ("Kroger Cranberry Township PA") when they
+        all agree.
+        """
+        key = normalize_merchant(merchant)
+        if not key:
+            return None
+        if key in self._answers:
+            answer = self._answers[key]
+        else:
+            entry = self._entries.get(key)
+            answer = None
+            if entry is not None:
+                answer = entry["pinned"] or self._answer(entry["counts"])
+            self._answers[key] = answer
+        if answer is not None or not prefix:
+            return answer
+
+        keys = self._sorted_keys
+        if keys is None:
+            keys = self._sorted_keys = sorted(self._entries)
+        start = key + " "
+        answers: set[Optional[str]] = set()
+        i = bisect_left(keys, start)
+        while i < len(keys) and keys[i].startswith(start):
+            entry = self._entries[keys[i]]
+            answers.add(entry["pinned"] or self._answer(entry["counts"]))
+            i += 1
+        return answers.pop() if len(answers) == 1 else None
+
+
+def categorize(
+    *,
+    csv_type: str,
+    csv_category: str,
+    description: str,
+    merchant: str,
+    memo: Optional[MerchantCategoryMemo] = None,
+) -> str:
+    """map_to_fixed_category, short-circuited by the learned merchant memo.
+
+    The memo answers for withdrawals only: it learns what a merchant is
+    bought as, so a refund from that merchant still goes through the
+    deposit rules instead of landing in e.g. Groceries.
+
+    Read-only: callers record the stored category with memo.observe() (the
+    server does so when rows are upserted).
+    """
+    if memo is not None and (csv_type or "").strip().lower() != "deposit":
+        hit = memo.lookup(merchant)
+        if hit is not None and hit in FIXED_CATEGORIES:
+            return hit
+    category = map_to_fixed_category(csv_type=csv_type, csv_category=csv_category, description=description)
+    return category if category in FIXED_CATEGORIES else "Other"
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+from assistant_runtime import filter_transactions_period, find_anomalies
+from store import TransactionStore
+
+from bench_store import synthetic_transactions
+
+
+def legacy_top(transactions, y: int, m: int, limit: int = 10) -> list:
+    """The previous detect_anomalies: filter the month, then sort all of it for the top N."""
+    rows = [t for t in filter_transactions_period(list(transactions), y, m) if float(t["amount"]) > 0]
+    return sorted(rows, key=lambda t: float(t["amount"]), reverse=True)[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Anomaly scoring: cold engine build, range queries and per-insert cost")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--inserts", type=int, default=1_000)
+    args = parser.parse_args()
+
+    print(f"  {'rows':>10}  {'legacy month':>13}  {'build (cold)':>13}  {'1y range':>10}  {'per insert':>11}")
+    for size in args.sizes:
+        rows = synthetic_transactions(size + args.inserts, seed=size)
+        store = TransactionStore(rows[: size])
+
+        start = time.perf_counter()
+        legacy_top(store, 2025, 6)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        find_anomalies(store, "2025-01-01", "2025-12-31")
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        find_anomalies(store, "2024-06-01", "2025-05-31")
+        ranged = time.perf_counter() - start
+
+        # Each insert is folded into the baselines on the next query, one row at a time.
+        start = time.perf_counter()
+        for t in rows[size:]:
+            store.add(t)
+            find_anomalies(store, t["date"], t["date"], limit=1)
+        per_insert = (time.perf_counter() - start) / args.inserts
+
+        print(
+            f"  {size:>10,}  {legacy * 1000:>10.0f} ms  {cold * 1000:>10.0f} ms"
+            f"  {ranged * 1000:>7.1f} ms  {per_insert * 1e6:>8.0f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import argparse
+import csv
+from pathlib import Path
+import random
+import time
+
+import bank_categories as bc
+from bank_categories import map_to_fixed_category
+
+
+def _reference_map(*, csv_type: str, csv_category: str, description: str) -> str:
+    """The original per-list substring cascade, kept to prove identical output."""
+
+    def contains_any(text: str, keywords: list[str]) -> bool:
+        t = text.lower()
+        return any(k in t for k in keywords)
+
+    c = (csv_category or "").strip()
+    t = (csv_type or "").strip().lower()
+    d = (description or "").strip()
+    dl = d.lower()
+    if t == "deposit":
+        if "payroll" in dl or "salary" in dl:
+            return "Income"
+        return "Transfers"
+    if c in ("EMI/Loans",):
+        if contains_any(d, bc._INSURANCE_KEYWORDS):
+            return "Insurance"
+        if contains_any(d, bc._SUBSCRIPTION_KEYWORDS):
+            return "Subscriptions"
+        return "Debt Payments"
+    mapped = bc._DIRECT_CATEGORIES.get(c)
+    if mapped is None or mapped == "Other":
+        for keywords, category in (
+            (bc._DINING_KEYWORDS, "Dining & Coffee"),
+            (bc._SUBSCRIPTION_KEYWORDS, "Subscriptions"),
+            (bc._FITNESS_KEYWORDS, "Fitness & Wellness"),
+            (bc._HEALTH_KEYWORDS, "Health & Medical"),
+            (bc._INSURANCE_KEYWORDS, "Insurance"),
+            (bc._TRAVEL_KEYWORDS, "Travel"),
+            (bc._HOME_MAINT_KEYWORDS, "Home Maintenance"),
+            (bc._SHOPPING_KEYWORDS, "Shopping"),
+            (bc._TRANSPORT_KEYWORDS, "Transportation"),
+        ):
+            if contains_any(d, keywords):
+                return category
+    if c == "Personal Care" or "barber" in dl or "nail" in dl or "spa" in dl or "hair" in dl:
+        return "Personal Care"
+    if mapped:
+        return mapped
+    return "Other"
+
+
+def synthetic_rows(seed_csv: Path, n: int, seed: int = 7) -> list[tuple[str, str, str]]:
+    """Build n statement rows by remixing the sample statement and every keyword."""
+    with seed_csv.open("r", newline="", encoding="utf-8-sig") as f:
+        base = [(r["Type"], r["Category"], r["Description"]) for r in csv.DictReader(f)]
+    keywords = [k for name in dir(bc) if name.endswith("_KEYWORDS") and isinstance(getattr(bc, name), list) for k in getattr(bc, name)]
+    cities = ["Cranberry Township PA", "Shadyside PA", "Oakland PA", "Mt Lebanon PA", "#1042", ""]
+    rng = random.Random(seed)
+    rows: list[tuple[str, str, str]] = []
+    for i in range(n):
+        if i % 3:
+            rows.append(base[rng.randrange(len(base))])
+        else:
+            kw = rng.choice(keywords).title()
+            rows.append(("Withdrawal", rng.choice(["Other", "EMI/Loans", "Groceries"]), f"Debit Card Purchase {kw} {rng.choice(cities)}"))
+    return rows
+
+
+def _time(fn, rows: list[tuple[str, str, str]]) -> tuple[float, list[str]]:
+    start = time.perf_counter()
+    out = [fn(csv_type=t, csv_category=c, description=d) for t, c, d in rows]
+    return time.perf_counter() - start, out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark map_to_fixed_category on a synthetic statement")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--csv", type=str, default=str(Path(__file__).parents[2] / "comprehensive_bank_statement.csv"))
+    args = parser.parse_args()
+
+    rows = synthetic_rows(Path(args.csv), args.rows)
+    ref_s, ref_out = _time(_reference_map, rows)
+    new_s, new_out = _time(map_to_fixed_category, rows)
+
+    mismatches = sum(1 for a, b in zip(ref_out, new_out) if a != b)
+    print(f"Rows: {len(rows):,}  mismatches vs reference: {mismatches}")
+    print(f"  reference cascade: {len(rows) / ref_s:,.0f} rows/sec ({ref_s:.2f}s)")
+    print(f"  keyword automaton: {len(rows) / new_s:,.0f} rows/sec ({new_s:.2f}s)  x{ref_s / new_s:.2f}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
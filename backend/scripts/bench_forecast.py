@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+from assistant_runtime import filter_transactions_period, get_category_forecasts
+from store import TransactionStore
+
+from bench_store import synthetic_transactions
+
+
+CATEGORIES = [f"Category {i}" for i in range(30)]
+
+
+def legacy_forecast(transactions, category: str, y: int, m: int, months_back: int = 3) -> float:
+    """The previous forecast_category_spending: one period scan per lookback month, then the mean."""
+    spends = []
+    for i in range(months_back):
+        cm, cy = m - i, y
+        while cm <= 0:
+            cm, cy = cm + 12, cy - 1
+        rows = filter_transactions_period(list(transactions), cy, cm)
+        spends.append(sum(float(t["amount"]) for t in rows if float(t["amount"]) > 0 and t["category"] == category))
+    return sum(spends) / months_back
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Forecast every category: per-category rescans vs. the rollup-backed batch")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"  {'rows':>10}  {f'legacy x{len(CATEGORIES)}':>12}  {'batch (cold)':>13}  {'batch (cached)':>15}")
+    for size in args.sizes:
+        rng = random.Random(size)
+        rows = synthetic_transactions(size, seed=size)
+        for t in rows:
+            t["category"] = rng.choice(CATEGORIES)
+        store = TransactionStore(rows)
+
+        start = time.perf_counter()
+        for cat in CATEGORIES:
+            legacy_forecast(store, cat, 2025, 6)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        out = get_category_forecasts(store, 2025, 6)
+        cold = time.perf_counter() - start
+        assert len(out["forecasts"]) == len(CATEGORIES)
+        start = time.perf_counter()
+        get_category_forecasts(store, 2025, 6)
+        cached = time.perf_counter() - start
+        print(f"  {size:>10,}  {legacy * 1000:>9.0f} ms  {cold * 1000:>10.0f} ms  {cached * 1000:>12.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
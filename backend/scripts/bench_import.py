@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import argparse
+from datetime import date, timedelta
+from hashlib import blake2b
+import json
+import os
+from pathlib import Path
+import random
+import tempfile
+import time
+from typing import Iterator
+
+from bench_categorize import synthetic_rows
+from import_bank_statement import iter_transactions_from_csv, iter_transactions_parallel, iter_unique, with_keys
+
+
+def write_statement(path: Path, seed_csv: Path, n: int, seed: int = 11) -> None:
+    """Write an n-row statement in the sample CSV's format, one year of dates per ~60k rows."""
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        f.write("Date,Type,Category,Description,Amount\n")
+        for i, (tx_type, category, description) in enumerate(synthetic_rows(seed_csv, n)):
+            d = start + timedelta(days=i // 160)
+            amount = f"${rng.randint(1, 2500)}.{rng.randint(0, 99):02d}"
+            f.write(f"{d:%m/%d/%Y},{tx_type},{category},{description.replace(',', ' ')},{amount}\n")
+
+
+def _run(rows: Iterator[dict]) -> tuple[float, int, str]:
+    """Drain the pipeline; returns (seconds, rows, digest of the output in order)."""
+    h = blake2b(digest_size=16)
+    n = 0
+    start = time.perf_counter()
+    for t in rows:
+        h.update(json.dumps(t, sort_keys=True).encode("utf-8"))
+        n += 1
+    return time.perf_counter() - start, n, h.hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the serial vs --workers CSV import pipeline")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, os.cpu_count() or 1])
+    parser.add_argument("--csv", type=str, default=str(Path(__file__).parents[2] / "comprehensive_bank_statement.csv"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "statement.csv"
+        write_statement(path, Path(args.csv), args.rows)
+        print(f"Statement: {args.rows:,} rows, {path.stat().st_size / 1e6:.0f} MB, {os.cpu_count()} CPUs")
+
+        serial_s, n, serial_digest = _run(iter_unique(with_keys(iter_transactions_from_csv(path))))
+        print(f"  serial:     {n / serial_s:,.0f} rows/sec ({serial_s:.2f}s)")
+
+        mismatched = False
+        for workers in sorted(set(w for w in args.workers if w > 1)):
+            s, n_par, digest = _run(iter_unique(iter_transactions_parallel(path, workers)))
+            same = digest == serial_digest and n_par == n
+            mismatched |= not same
+            print(
+                f"  workers={workers}: {n_par / s:,.0f} rows/sec ({s:.2f}s)  x{serial_s / s:.2f}"
+                f"  {'identical' if same else 'OUTPUT DIFFERS'}"
+            )
+    if mismatched:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
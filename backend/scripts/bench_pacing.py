@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+from assistant_runtime import get_budget_pacing, get_category_spend
+from store import TransactionStore
+
+from bench_store import synthetic_transactions
+
+
+CATEGORIES = [f"Category {i}" for i in range(30)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Category pacing: one get_category_spend per category vs. the batched pacing call")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    budgets = {cat: 500.0 for cat in CATEGORIES}
+    print(f"  {'rows':>10}  {f'per-category x{len(CATEGORIES)}':>18}  {'pacing (cold)':>14}  {'pacing (cached)':>16}")
+    for size in args.sizes:
+        rng = random.Random(size)
+        rows = synthetic_transactions(size, seed=size)
+        for t in rows:
+            t["category"] = rng.choice(CATEGORIES)
+        store = TransactionStore(rows)
+
+        start = time.perf_counter()
+        for cat in CATEGORIES:
+            get_category_spend(store, cat, 2025, 6)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        out = get_budget_pacing(store, 10_000.0, budgets, 2025, 6)
+        cold = time.perf_counter() - start
+        assert len(out["categories"]) == len(CATEGORIES)
+        start = time.perf_counter()
+        get_budget_pacing(store, 10_000.0, budgets, 2025, 6)
+        cached = time.perf_counter() - start
+        print(f"  {size:>10,}  {legacy * 1000:>15.0f} ms  {cold * 1000:>11.0f} ms  {cached * 1000:>13.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+from receipt_parser import parse_receipt_text
+
+
+FIXTURES = Path(__file__).parent / "fixtures" / "receipts"
+
+
+def load_corpus(path: Path) -> list[tuple[str, str, dict]]:
+    """Load (name, text, expected) triples; expected comes from the sibling .json."""
+    corpus: list[tuple[str, str, dict]] = []
+    for txt in sorted(path.glob("*.txt")):
+        expected_path = txt.with_suffix(".json")
+        expected = json.loads(expected_path.read_text(encoding="utf-8")) if expected_path.exists() else {}
+        corpus.append((txt.stem, txt.read_text(encoding="utf-8"), expected))
+    return corpus
+
+
+def check_corpus(corpus: list[tuple[str, str, dict]]) -> int:
+    failures = 0
+    for name, text, expected in corpus:
+        got = parse_receipt_text(text)
+        for key, want in expected.items():
+            have = len(got.get("items") or []) if key == "items" else got.get(key)
+            if isinstance(want, float) and isinstance(have, float):
+                ok = abs(want - have) < 0.005
+            else:
+                ok = want == have
+            if not ok:
+                failures += 1
+                print(f"  MISMATCH {name}.{key}: expected {want!r}, got {have!r}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the receipt parser against the fixture corpus and measure receipts/sec")
+    parser.add_argument("--fixtures", type=str, default=str(FIXTURES))
+    parser.add_argument("--seconds", type=float, default=2.0, help="How long to run the throughput loop")
+    args = parser.parse_args()
+
+    corpus = load_corpus(Path(args.fixtures))
+    if not corpus:
+        raise SystemExit(f"No fixtures found in {args.fixtures}")
+
+    failures = check_corpus(corpus)
+    print(f"Corpus: {len(corpus)} receipts, {failures} mismatches")
+
+    texts = [text for _, text, _ in corpus]
+    parsed = 0
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    while time.perf_counter() < deadline:
+        for text in texts:
+            parse_receipt_text(text)
+        parsed += len(texts)
+    elapsed = time.perf_counter() - start
+    print(f"Throughput: {parsed / elapsed:,.0f} receipts/sec ({parsed} parses in {elapsed:.2f}s)")
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
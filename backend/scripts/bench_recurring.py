@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import argparse
+from datetime import date
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+from dates import parse_date
+from recurring import recurring_patterns
+from store import TransactionStore
+
+from bench_store import synthetic_transactions
+
+
+def legacy_recurring(transactions, window_start: date) -> list[dict]:
+    """The previous get_recurring_transactions body: full scan, dates re-parsed per use."""
+    by_merchant: dict[str, list[dict]] = {}
+    for t in transactions:
+        try:
+            dt = parse_date(str(t.get("date", "")))
+        except Exception:
+            continue
+        if dt < window_start or float(t.get("amount") or 0) <= 0:
+            continue
+        by_merchant.setdefault((t.get("merchant") or "Unknown").strip() or "Unknown", []).append(t)
+    out = []
+    for merch, txs in by_merchant.items():
+        months = {(parse_date(str(t["date"])).year, parse_date(str(t["date"])).month) for t in txs}
+        if len(months) < 3:
+            continue
+        amts = sorted(float(t["amount"]) for t in txs)
+        median = amts[len(amts) // 2]
+        similar = [t for t in txs if abs(float(t["amount"]) - median) <= max(1.0, 0.15 * median)]
+        if len(similar) >= 3:
+            days = sorted(parse_date(str(t["date"])).day for t in txs)
+            out.append({"merchant": merch, "estimatedMonthly": median, "typicalDay": days[len(days) // 2]})
+    return out
+
+
+def _ms(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recurring detection: full rescan vs. the cached, incremental detector")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--new-rows", type=int, default=100)
+    args = parser.parse_args()
+
+    window = date(2015, 1, 1)  # synthetic dates span 2015-2025; keep every row in the window
+    print(f"  {'rows':>10}  {'legacy scan':>12}  {'first build':>12}  {'cached':>8}  {f'+{args.new_rows} rows':>10}")
+    for size in args.sizes:
+        rows = synthetic_transactions(size, seed=size)
+        store = TransactionStore(rows)
+        legacy = _ms(lambda: legacy_recurring(store, window))
+        first = _ms(lambda: recurring_patterns(store, window))
+        cached = _ms(lambda: recurring_patterns(store, window))
+        for t in synthetic_transactions(args.new_rows, seed=size + 1):
+            store.add(t)
+        incremental = _ms(lambda: recurring_patterns(store, window))
+        print(f"  {size:>10,}  {legacy:>9.0f} ms  {first:>9.0f} ms  {cached:>5.2f} ms  {incremental:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+from assistant_runtime import simulate_scenarios
+from store import TransactionStore
+
+from bench_store import synthetic_transactions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="What-if simulation cost: first call (builds the baseline) vs. later scenarios")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--scenarios", type=int, default=20)
+    args = parser.parse_args()
+
+    scenarios = [
+        {"label": f"#{i}", "purchases": [{"amount": 50 + 25 * i, "category": "Shopping"}, {"amount": 10, "category": "Dining"}]}
+        for i in range(args.scenarios)
+    ]
+    print(f"  {'rows':>10}  {'first call':>11}  {f'{args.scenarios} scenarios, cached':>24}")
+    for size in args.sizes:
+        store = TransactionStore(synthetic_transactions(size, seed=size))
+        start = time.perf_counter()
+        simulate_scenarios(store, 3000.0, {}, scenarios[:1], year=2024, month=5)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        simulate_scenarios(store, 3000.0, {}, scenarios, year=2024, month=5)
+        warm = time.perf_counter() - start
+        print(f"  {size:>10,}  {first * 1000:>8.0f} ms  {warm * 1000:>18.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+import snapshot
+from store import TransactionStore
+
+from bench_store import synthetic_transactions
+
+
+def bench_json(path: Path, rows: list[dict], index: dict) -> tuple[float, float]:
+    """The DATA_FORMAT=json path: indent=2 dump on save, json.load plus dedupe-index check on load."""
+    start = time.perf_counter()
+    with open(path, "w") as f:
+        json.dump({"transactions": rows, "category_budgets": {}, "dedupe_index": index}, f, indent=2)
+    save_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(path, "r") as f:
+        data = json.load(f)
+    TransactionStore(data["transactions"], dedupe_index=data["dedupe_index"])
+    return save_s, time.perf_counter() - start
+
+
+def bench_binary(path: Path, rows: list[dict], fps: list[str], watermark: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    snapshot.save(path, rows, fps, {"category_budgets": {}, "dedupe_watermark": watermark})
+    save_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snap = snapshot.load(path)
+    fps = snap.fingerprints[::-1][:watermark]
+    TransactionStore(snap.rows, dedupe_index={"watermark": watermark, "fingerprints": fps})
+    return save_s, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Datastore save/load time and size: data.json vs. the binary snapshot")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"  {'rows':>10}  {'format':>6}  {'size':>8}  {'save':>8}  {'load':>8}")
+    for size in args.sizes:
+        rows = synthetic_transactions(size, seed=size)
+        store = TransactionStore(rows)
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path, snap_path = Path(tmp) / "data.json", Path(tmp) / "data.snapshot"
+            results = {
+                "json": bench_json(json_path, rows, store.dedupe_index()),
+                "binary": bench_binary(snap_path, rows, store.fingerprints(), store.watermark),
+            }
+            sizes = {"json": json_path.stat().st_size, "binary": snap_path.stat().st_size}
+        for fmt, (save_s, load_s) in results.items():
+            print(f"  {size:>10,}  {fmt:>6}  {sizes[fmt] / 1e6:>5.1f} MB  {save_s * 1000:>5.0f} ms  {load_s * 1000:>5.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
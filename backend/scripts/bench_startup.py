@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+
+from bench_store import synthetic_transactions
+
+
+_FASTAPI_DIR = Path(__file__).parents[1] / "fastapi"
+
+# Runs in a fresh interpreter: import the app, start it, serve one request.
+_CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {fastapi_dir!r})
+import main
+t_import = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    r = client.get('/transactions?year=2025&month=1')
+    r.raise_for_status()
+    t_first = time.perf_counter()
+print(json.dumps({{"importMs": (t_import - t0) * 1000, "firstRequestMs": (t_first - t0) * 1000}}))
+"""
+
+
+def _boot(env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(fastapi_dir=str(_FASTAPI_DIR))],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time-to-first-request for the FastAPI app at several store sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"  {'rows':>10}  {'import':>8}  {'first boot':>11}  {'cold':>9}  {'warm snapshot':>14}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = Path(tmp) / "data.json"
+            data = {"transactions": synthetic_transactions(size, seed=size), "category_budgets": {}, "default_budget": 3000.0, "goals": []}
+            data_file.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            del data
+
+            env = {**os.environ, "DATA_FILE": str(data_file), "JOB_DB_PATH": str(Path(tmp) / "jobs.sqlite3")}
+            env.pop("WARM_SNAPSHOT", None)
+            first = _boot(env)  # no dedupe index yet: fingerprints everything and saves it
+            cold = _boot(env)
+
+            env["WARM_SNAPSHOT"] = str(Path(tmp) / "warm.pickle")
+            _boot(env)  # writes the snapshot on shutdown
+            warm = _boot(env)
+
+        print(
+            f"  {size:>10,}  {cold['importMs']:>5.0f} ms  {first['firstRequestMs']:>8.0f} ms  "
+            f"{cold['firstRequestMs']:>6.0f} ms  {warm['firstRequestMs']:>11.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+from fingerprint import tx_fingerprint
+from store import TransactionStore
+
+
+_MERCHANTS = ["Kroger", "Starbucks", "Shell", "Amazon", "Netflix", "Target", "Uber", "CVS"]
+
+
+def synthetic_transactions(n: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": uuid.UUID(int=rng.getrandbits(128)).hex,
+            "date": f"20{rng.randint(15, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "merchant": f"{rng.choice(_MERCHANTS)} #{rng.randint(1, 9999)}",
+            "amount": round(rng.uniform(1, 500), 2),
+            "category": "Shopping",
+            "description": f"Debit Card Purchase {i}",
+        }
+        for i in range(n)
+    ]
+
+
+def bench_list_insert(history: list[dict], batch: list[dict]) -> float:
+    rows = list(history)
+    start = time.perf_counter()
+    for t in batch:
+        rows.insert(0, t)
+    return time.perf_counter() - start
+
+
+def bench_store_upsert(history: list[dict], batch: list[dict]) -> float:
+    """The _upsert_transactions hot path: fingerprint lookup, then append if new."""
+    store = TransactionStore(history)
+    start = time.perf_counter()
+    for t in batch:
+        fp = tx_fingerprint(t)
+        if store.find(fp) is None:
+            store.add(t, fp)
+    elapsed = time.perf_counter() - start
+    assert next(iter(store)) is batch[-1], "newest-first order broken"
+    return elapsed
+
+
+def bench_startup(history: list[dict], new_rows: int) -> tuple[float, float]:
+    """Store build time from a saved file with `new_rows` appended since the last save:
+    (no persisted fingerprints, with the persisted dedupe index)."""
+    index = TransactionStore(history).dedupe_index()
+    rows = synthetic_transactions(new_rows, seed=len(history) + 1) + history
+
+    start = time.perf_counter()
+    TransactionStore(rows).dedupe()
+    full_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = TransactionStore(rows, dedupe_index=index)
+    store.dedupe()
+    incremental_s = time.perf_counter() - start
+    assert store.fingerprinted_on_load == new_rows
+    return full_s, incremental_s
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TransactionStore scaling: bulk-import cost per row and startup dedupe vs. history size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--batch", type=int, default=10_000, help="Rows imported into each history")
+    parser.add_argument("--new-rows", type=int, default=1_000, help="Rows added since the last save (startup benchmark)")
+    args = parser.parse_args()
+
+    batch = synthetic_transactions(args.batch, seed=1)
+    print(f"Importing {args.batch:,} rows into an existing history")
+    print(f"  {'history':>10}  {'list.insert(0)':>16}  {'store upsert':>14}")
+    for size in args.sizes:
+        history = synthetic_transactions(size, seed=size)
+        old_s = bench_list_insert(history, batch)
+        new_s = bench_store_upsert(history, batch)
+        print(
+            f"  {size:>10,}  {old_s / args.batch * 1e6:>12.2f} µs/row  {new_s / args.batch * 1e6:>10.2f} µs/row"
+        )
+
+    print(f"Startup dedupe with {args.new_rows:,} rows added since the last save")
+    print(f"  {'history':>10}  {'full pass':>10}  {'since watermark':>16}")
+    for size in args.sizes:
+        full_s, incremental_s = bench_startup(synthetic_transactions(size, seed=size), args.new_rows)
+        print(f"  {size:>10,}  {full_s * 1000:>7.0f} ms  {incremental_s * 1000:>13.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
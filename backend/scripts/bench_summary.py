@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+from assistant_runtime import get_spending_summary, parse_date
+from store import TransactionStore
+
+from bench_store import synthetic_transactions
+
+
+CATEGORIES = [f"Category {i}" for i in range(30)]
+
+
+def legacy_summary(transactions) -> dict:
+    """The previous all-time get_spending_summary: every expense, every date parsed."""
+    expenses = [t for t in transactions if float(t["amount"]) > 0]
+    by_cat: dict = {}
+    monthly: dict = {}
+    for t in expenses:
+        by_cat[t["category"]] = by_cat.get(t["category"], 0.0) + float(t["amount"])
+        key = parse_date(t["date"]).strftime("%Y-%m")
+        monthly[key] = monthly.get(key, 0.0) + float(t["amount"])
+    biggest = max(expenses, key=lambda t: float(t["amount"]))
+    return {"total": sum(float(t["amount"]) for t in expenses), "top": sorted(by_cat.items(), key=lambda kv: kv[1])[-3:],
+            "outlier": biggest, "highest": max(monthly, key=monthly.get)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="All-time spending summary: full scan vs. the incrementally maintained rollup")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--inserts", type=int, default=1_000)
+    args = parser.parse_args()
+
+    print(f"  {'rows':>10}  {'legacy':>10}  {'rollup (cold)':>14}  {'rollup (warm)':>14}  {'insert + summary':>17}")
+    for size in args.sizes:
+        rng = random.Random(size)
+        rows = synthetic_transactions(size + args.inserts, seed=size)
+        for t in rows:
+            t["category"] = rng.choice(CATEGORIES)
+        store = TransactionStore(rows[:size])
+
+        start = time.perf_counter()
+        legacy_summary(store)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        get_spending_summary(store)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        get_spending_summary(store)
+        warm = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for t in rows[size:]:
+            store.add(t)
+            get_spending_summary(store)
+        per_insert = (time.perf_counter() - start) / args.inserts
+
+        print(
+            f"  {size:>10,}  {legacy * 1000:>7.0f} ms  {cold * 1000:>11.0f} ms"
+            f"  {warm * 1000:>11.2f} ms  {per_insert * 1e6:>14.0f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
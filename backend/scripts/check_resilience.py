@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+from typing import Callable
+
+import httpx
+
+# Small breaker settings so the open -> half-open -> closed cycle runs in well under a second.
+os.environ.setdefault("AI_BREAKER_FAILURES", "2")
+os.environ.setdefault("AI_BREAKER_RESET_SECONDS", "0.3")
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+from resilience import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    BudgetExceededError,
+    CircuitOpenError,
+    LatencyBudget,
+    acall_with_resilience,
+    call_with_resilience,
+    get_breaker,
+)
+
+
+class FakeProvider(BaseHTTPRequestHandler):
+    """Answers every request according to `mode`: ok, slow, error (500) or reject (400)."""
+
+    mode = "ok"
+    hits = 0
+    slow_seconds = 1.5
+
+    def do_GET(self) -> None:
+        type(self).hits += 1
+        mode = type(self).mode
+        if mode == "slow":
+            time.sleep(self.slow_seconds)
+        status = {"error": 500, "reject": 400}.get(mode, 200)
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b'{"ok": true}')
+        except OSError:
+            pass  # the client gave up (timeout)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Exercise the circuit breaker and latency budget against a local fake provider")
+    parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeProvider)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    client = httpx.Client()
+    reset_s = float(os.environ["AI_BREAKER_RESET_SECONDS"])
+    failures = 0
+
+    def check(label: str, ok: bool) -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"  {'ok  ' if ok else 'FAIL'}  {label}")
+
+    def call(name: str, seconds: float = 5.0, per_attempt: float = 0.6) -> Callable[[], object]:
+        return lambda: call_with_resilience(
+            name,
+            lambda timeout: client.get(url, timeout=timeout).raise_for_status(),
+            LatencyBudget(seconds),
+            attempts=2,
+            per_attempt_timeout=per_attempt,
+            backoff=0.05,
+        )
+
+    def raises(fn: Callable[[], object], exc: type) -> bool:
+        try:
+            fn()
+        except exc:
+            return True
+        except Exception as e:
+            print(f"        got {e!r}")
+        return False
+
+    def succeeds(fn: Callable[[], object]) -> bool:
+        try:
+            fn()
+        except Exception as e:
+            print(f"        got {e!r}")
+            return False
+        return True
+
+    def open_breaker(name: str) -> None:
+        FakeProvider.mode = "error"
+        raises(call(name), httpx.HTTPStatusError)
+
+    # Timeouts are retried and count against the breaker.
+    FakeProvider.mode, FakeProvider.hits = "slow", 0
+    check("timeout: retried, then raised", raises(call("timeout"), httpx.TimeoutException))
+    check("timeout: both attempts reached the provider", FakeProvider.hits == 2)
+    check("timeout: breaker opened", get_breaker("timeout").state == STATE_OPEN)
+
+    # 5xx are retried and count; 4xx mean the provider is up.
+    FakeProvider.mode, FakeProvider.hits = "error", 0
+    check("5xx: retried, then raised", raises(call("5xx"), httpx.HTTPStatusError))
+    check("5xx: breaker opened", get_breaker("5xx").state == STATE_OPEN and FakeProvider.hits == 2)
+    FakeProvider.mode, FakeProvider.hits = "reject", 0
+    check("4xx: raised without retry", raises(call("4xx"), httpx.HTTPStatusError) and FakeProvider.hits == 1)
+    check("4xx: breaker stays closed", get_breaker("4xx").state == STATE_CLOSED)
+
+    # An open breaker fails fast without calling out.
+    FakeProvider.mode, FakeProvider.hits = "ok", 0
+    check("open: rejected", raises(call("5xx"), CircuitOpenError))
+    check("open: provider not called", FakeProvider.hits == 0)
+
+    # After the reset timeout a probe goes through and closes the breaker.
+    time.sleep(reset_s + 0.05)
+    check("recovery: half-open after the reset timeout", get_breaker("5xx").state == STATE_HALF_OPEN)
+    call("5xx")()
+    check("recovery: probe succeeded, breaker closed", get_breaker("5xx").state == STATE_CLOSED)
+
+    # A probe that can't start (budget spent) or is cancelled must not wedge the breaker half-open.
+    open_breaker("budget")
+    time.sleep(reset_s + 0.05)
+    FakeProvider.mode = "ok"
+    check("probe: spent budget raises", raises(call("budget", seconds=0.1), BudgetExceededError))
+    check("probe: next call can still probe", succeeds(call("budget")))
+    check("probe: breaker closed", get_breaker("budget").state == STATE_CLOSED)
+
+    open_breaker("cancel")
+    time.sleep(reset_s + 0.05)
+
+    async def cancelled_probe() -> None:
+        async with httpx.AsyncClient() as aclient:
+
+            async def attempt(timeout: float) -> httpx.Response:
+                return (await aclient.get(url, timeout=timeout)).raise_for_status()
+
+            FakeProvider.mode = "slow"
+            task = asyncio.create_task(acall_with_resilience("cancel", attempt, LatencyBudget(5.0)))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            FakeProvider.mode = "ok"
+            await acall_with_resilience("cancel", attempt, LatencyBudget(5.0))
+
+    check("probe: cancelled probe released", succeeds(lambda: asyncio.run(cancelled_probe())))
+    check("probe: breaker closed after the next probe", get_breaker("cancel").state == STATE_CLOSED)
+
+    server.shutdown()
+    print(f"{failures} failed")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+import snapshot
+
+
+_FASTAPI_DIR = Path(__file__).parents[1] / "fastapi"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert the backend datastore between data.json and the binary snapshot (DATA_FORMAT=binary)."
+    )
+    parser.add_argument("--to", choices=["binary", "json"], required=True)
+    parser.add_argument("--src", type=str, default=None, help="Defaults to backend/fastapi/data.json or data.snapshot")
+    parser.add_argument("--dst", type=str, default=None, help="Defaults to the other of the two")
+    args = parser.parse_args()
+
+    json_path, snap_path = _FASTAPI_DIR / "data.json", _FASTAPI_DIR / "data.snapshot"
+    if args.to == "binary":
+        src, dst = Path(args.src or json_path), Path(args.dst or snap_path)
+        n = snapshot.import_json(src, dst)
+    else:
+        src, dst = Path(args.src or snap_path), Path(args.dst or json_path)
+        n = snapshot.export_json(src, dst)
+    print(f"Wrote {n} transactions from {src} to {dst} ({dst.stat().st_size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
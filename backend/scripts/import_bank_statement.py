@@ -1,16 +1,35 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import csv
 from datetime import datetime
+from hashlib import blake2b
+import io
+from itertools import islice
 import json
+import os
 from pathlib import Path
-from typing import Iterable
+import random
+import sys
+import time
+from typing import Iterable, Iterator, NamedTuple, Optional
 import uuid
 
 import httpx
 
-from bank_categories import FIXED_CATEGORIES, map_to_fixed_category
+from bank_categories import MerchantCategoryMemo, categorize
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "fastapi"))
+
+from fingerprint import tx_fingerprint
+from resilience import is_retryable
+import snapshot
+
+
+_REQUIRED_COLUMNS = ("Date", "Type", "Category", "Description", "Amount")
 
 
 def _parse_date_mmddyyyy(value: str) -> str:
@@ -44,62 +63,328 @@ def _extract_merchant(description: str) -> str:
     return d or "Unknown"
 
 
-def _chunked(items: list[dict], size: int) -> Iterable[list[dict]]:
-    for i in range(0, len(items), size):
-        yield items[i : i + size]
+def _chunked(items: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
 
+class _ParsedRow(NamedTuple):
+    date: str
+    tx_type: str
+    csv_category: str
+    description: str
+    amount: float
+    merchant: str
 
-def build_transactions_from_csv(csv_path: Path) -> list[dict]:
-    rows: list[dict] = []
 
+def iter_csv_records(csv_path: Path) -> Iterator[dict[str, str]]:
+    """Read stage: raw CSV records, one at a time."""
     with csv_path.open("r", newline="", encoding="utf-8-sig") as f:
         reader = csv.DictReader(f)
-        required = {"Date", "Type", "Category", "Description", "Amount"}
-        missing = required - set(reader.fieldnames or [])
+        missing = set(_REQUIRED_COLUMNS) - set(reader.fieldnames or [])
         if missing:
             raise ValueError(f"CSV missing columns: {sorted(missing)}")
+        yield from reader
+
+
+def parse_record(row: dict[str, str]) -> _ParsedRow:
+    tx_type = (row["Type"] or "").strip()
+    description = (row["Description"] or "").strip()
+
+    amount = _parse_amount_usd(row["Amount"])
+    if tx_type.lower() == "deposit":
+        # Convention in this app: income/refunds are negative
+        amount = -abs(amount)
+    else:
+        amount = abs(amount)
+
+    return _ParsedRow(
+        date=_parse_date_mmddyyyy(row["Date"]),
+        tx_type=tx_type,
+        csv_category=(row["Category"] or "").strip(),
+        description=description,
+        amount=amount,
+        merchant=_extract_merchant(description),
+    )
+
+
+def categorize_row(row: _ParsedRow, memo: Optional[MerchantCategoryMemo] = None) -> dict:
+    category = categorize(
+        csv_type=row.tx_type,
+        csv_category=row.csv_category,
+        description=row.description,
+        merchant=row.merchant,
+        memo=memo,
+    )
+    return {
+        "date": row.date,
+        "merchant": row.merchant,
+        "amount": row.amount,
+        "category": category,
+        "description": row.description,
+    }
 
-        for row in reader:
-            date_iso = _parse_date_mmddyyyy(row["Date"])
-            tx_type = (row["Type"] or "").strip()
-            csv_category = (row["Category"] or "").strip()
-            description = (row["Description"] or "").strip()
-
-            amount = _parse_amount_usd(row["Amount"])
-            if tx_type.lower() == "deposit":
-                # Convention in this app: income/refunds are negative
-                amount = -abs(amount)
-            else:
-                amount = abs(amount)
-
-            category = map_to_fixed_category(
-                csv_type=tx_type,
-                csv_category=csv_category,
-                description=description,
-            )
-            if category not in FIXED_CATEGORIES:
-                category = "Other"
-
-            merchant = _extract_merchant(description)
-
-            rows.append(
-                {
-                    "date": date_iso,
-                    "merchant": merchant,
-                    "amount": amount,
-                    "category": category,
-                    "description": description,
-                }
-            )
 
-    return rows
+def iter_transactions_from_csv(csv_path: Path, memo: Optional[MerchantCategoryMemo] = None) -> Iterator[dict]:
+    """Read → parse → categorize, lazily. `memo` is only read, never updated."""
+    for record in iter_csv_records(csv_path):
+        yield categorize_row(parse_record(record), memo)
 
 
-async def import_to_backend(api_url: str, transactions: list[dict], batch_size: int = 200) -> None:
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        for batch in _chunked(transactions, batch_size):
-            r = await client.post(f"{api_url.rstrip('/')}/transactions/bulk", json=batch)
-            r.raise_for_status()
+def build_transactions_from_csv(csv_path: Path, memo: Optional[MerchantCategoryMemo] = None) -> list[dict]:
+    return list(iter_transactions_from_csv(csv_path, memo))
+
+
+class ImportStats:
+    def __init__(self) -> None:
+        self.rows = 0
+        self.duplicates = 0
+
+
+def fingerprint_key(t: dict) -> bytes:
+    """8-byte digest of the backend's de-dupe fingerprint."""
+    return blake2b(tx_fingerprint(t).encode("utf-8"), digest_size=8).digest()
+
+
+def with_keys(transactions: Iterable[dict]) -> Iterator[tuple[bytes, dict]]:
+    for t in transactions:
+        yield fingerprint_key(t), t
+
+
+def iter_unique(keyed: Iterable[tuple[bytes, dict]], stats: Optional[ImportStats] = None) -> Iterator[dict]:
+    """Fingerprint stage: drop rows the backend would treat as duplicates.
+
+    Only the 8-byte digest per row is kept, so a multi-million row statement
+    costs tens of MB here rather than a copy of every row.
+    """
+    seen: set[bytes] = set()
+    for key, t in keyed:
+        if key in seen:
+            if stats is not None:
+                stats.duplicates += 1
+            continue
+        seen.add(key)
+        if stats is not None:
+            stats.rows += 1
+        yield t
+
+
+# -----------------
+# Parallel parse/categorize (--workers)
+# -----------------
+
+# Large enough that per-task pickling overhead is noise.
+_CHUNK_BYTES = 4 << 20
+
+_worker_memo: Optional[MerchantCategoryMemo] = None
+
+
+def _csv_header(csv_path: Path) -> tuple[list[str], int]:
+    """Column names and the byte offset where the first data row starts."""
+    with csv_path.open("rb") as f:
+        first = f.readline()
+    fieldnames = next(csv.reader([first.decode("utf-8-sig")]), [])
+    missing = set(_REQUIRED_COLUMNS) - set(fieldnames)
+    if missing:
+        raise ValueError(f"CSV missing columns: {sorted(missing)}")
+    return fieldnames, len(first)
+
+
+def split_byte_ranges(csv_path: Path, start: int, chunk_bytes: int = _CHUNK_BYTES) -> list[tuple[int, int]]:
+    """Split the file from `start` into ~chunk_bytes ranges that end on line boundaries.
+
+    Assumes records don't contain quoted newlines (true for bank exports).
+    """
+    size = csv_path.stat().st_size
+    ranges: list[tuple[int, int]] = []
+    with csv_path.open("rb") as f:
+        pos = start
+        while pos < size:
+            f.seek(min(pos + chunk_bytes, size))
+            f.readline()  # finish the line we landed in
+            end = min(f.tell(), size)
+            ranges.append((pos, end))
+            pos = end
+    return ranges
+
+
+def _init_worker(memo_entries: Optional[dict]) -> None:
+    global _worker_memo
+    _worker_memo = MerchantCategoryMemo(memo_entries) if memo_entries is not None else None
+
+
+def _process_range(csv_path: str, start: int, end: int, fieldnames: list[str]) -> list[tuple[bytes, dict]]:
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    reader = csv.DictReader(io.StringIO(text, newline=""), fieldnames=fieldnames)
+    out: list[tuple[bytes, dict]] = []
+    for record in reader:
+        t = categorize_row(parse_record(record), _worker_memo)
+        out.append((fingerprint_key(t), t))
+    return out
+
+
+def iter_transactions_parallel(
+    csv_path: Path,
+    workers: int,
+    memo: Optional[MerchantCategoryMemo] = None,
+    chunk_bytes: int = _CHUNK_BYTES,
+) -> Iterator[tuple[bytes, dict]]:
+    """Parse, categorize and fingerprint byte-range chunks in a process pool.
+
+    Yields (fingerprint key, row) in file order, identical to
+    with_keys(iter_transactions_from_csv(...)). At most 2 * workers chunks
+    are in flight, so memory stays bounded.
+    """
+    fieldnames, data_start = _csv_header(csv_path)
+    ranges = iter(split_byte_ranges(csv_path, data_start, chunk_bytes))
+    entries = memo.to_dict() if memo is not None else None
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(entries,)) as pool:
+        pending: deque = deque(
+            pool.submit(_process_range, str(csv_path), start, end, fieldnames)
+            for start, end in islice(ranges, workers * 2)
+        )
+        while pending:
+            rows = pending.popleft().result()
+            nxt = next(ranges, None)
+            if nxt is not None:
+                pending.append(pool.submit(_process_range, str(csv_path), nxt[0], nxt[1], fieldnames))
+            yield from rows
+
+
+def iter_learning(transactions: Iterable[dict], memo: MerchantCategoryMemo) -> Iterator[dict]:
+    """Record each row's final category in the merchant memo as it streams past."""
+    for t in transactions:
+        memo.observe(t["merchant"], t["category"])
+        yield t
+
+
+def iter_with_progress(items: Iterable[dict], label: str = "rows", every: float = 1.0) -> Iterator[dict]:
+    """Pass items through, printing a rows/sec line to stderr every `every` seconds."""
+    count = 0
+    start = last = time.perf_counter()
+    for item in items:
+        yield item
+        count += 1
+        now = time.perf_counter()
+        if now - last >= every:
+            last = now
+            print(f"\r  {count:,} {label}, {count / (now - start):,.0f} {label}/sec", end="", file=sys.stderr, flush=True)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"\r  {count:,} {label} in {elapsed:.2f}s, {count / elapsed:,.0f} {label}/sec", file=sys.stderr, flush=True)
+
+
+class _BatchSizer:
+    """Additive-increase / multiplicative-decrease batch size driven by POST latency."""
+
+    def __init__(self, initial: int, target_latency: float):
+        self.size = max(1, initial)
+        self.min_size = max(1, initial // 8)
+        self.max_size = max(initial, initial * 8)
+        self.target = target_latency
+
+    def observe(self, rows: int, latency: float) -> None:
+        if latency > self.target:
+            self.size = max(self.min_size, int(self.size * 0.5))
+        elif latency < self.target / 2 and rows >= self.size:
+            self.size = min(self.max_size, self.size + max(1, self.size // 4))
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+
+async def import_to_backend(
+    api_url: str,
+    transactions: Iterable[dict],
+    batch_size: int = 200,
+    concurrency: int = 4,
+    attempts: int = 4,
+    target_latency: float = 1.0,
+) -> dict:
+    """POST batches to /transactions/bulk with up to `concurrency` in flight.
+
+    Failed batches (transport errors, 5xx, 429) are retried with backoff;
+    re-sending is safe because the backend upserts by fingerprint. The batch
+    size shrinks when a POST takes longer than `target_latency` seconds and
+    grows while the server keeps up. Returns throughput and latency stats.
+    """
+    url = f"{api_url.rstrip('/')}/transactions/bulk"
+    sizer = _BatchSizer(batch_size, target_latency)
+    slots = asyncio.Semaphore(max(1, concurrency))
+    latencies: list[float] = []
+    stats = {"rows": 0, "batches": 0, "retries": 0}
+    failure: list[BaseException] = []
+
+    async def send(client: httpx.AsyncClient, batch: list[dict]) -> None:
+        try:
+            for attempt in range(attempts):
+                started = time.perf_counter()
+                try:
+                    r = await client.post(url, json=batch)
+                    r.raise_for_status()
+                except Exception as e:
+                    if attempt + 1 >= attempts or not is_retryable(e):
+                        raise
+                    stats["retries"] += 1
+                    await asyncio.sleep(0.25 * (2 ** attempt) * (1 + random.random()))
+                    continue
+                latency = time.perf_counter() - started
+                latencies.append(latency)
+                sizer.observe(len(batch), latency)
+                stats["rows"] += len(batch)
+                stats["batches"] += 1
+                return
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            slots.release()
+
+    it = iter(transactions)
+    tasks: set[asyncio.Task] = set()
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=60.0, limits=httpx.Limits(max_connections=max(1, concurrency))) as client:
+        while not failure:
+            await slots.acquire()
+            batch = list(islice(it, sizer.size))
+            if not batch or failure:
+                slots.release()
+                break
+            task = asyncio.create_task(send(client, batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    if failure:
+        raise failure[0]
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    latencies.sort()
+    return {
+        **stats,
+        "seconds": round(elapsed, 2),
+        "rowsPerSec": round(stats["rows"] / elapsed, 1),
+        "p50Ms": round(_percentile(latencies, 0.50) * 1000, 1),
+        "p95Ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "finalBatchSize": sizer.size,
+    }
+
+
+def _read_datastore(path: Path) -> dict:
+    """An existing datastore (data.json or binary snapshot) in the data.json layout."""
+    if snapshot.is_snapshot(path):
+        snap = snapshot.load(path)
+        return {**snap.meta, "transactions": snap.rows}
+    return json.loads(path.read_text(encoding="utf-8"))
 
 
 def _load_existing_settings(path: Path) -> tuple[dict, float, list]:
@@ -107,7 +392,7 @@ def _load_existing_settings(path: Path) -> tuple[dict, float, list]:
         return {}, 3000.0, []
 
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
+        data = _read_datastore(path)
         category_budgets = data.get("category_budgets", {}) or {}
         default_budget = float(data.get("default_budget", 3000.0) or 3000.0)
         goals = data.get("goals", []) or []
@@ -116,7 +401,38 @@ def _load_existing_settings(path: Path) -> tuple[dict, float, list]:
         return {}, 3000.0, []
 
 
-def write_json_datastore(csv_transactions: list[dict], out_path: Path, preserve_settings: bool = True) -> None:
+def load_merchant_memo(path: Path) -> MerchantCategoryMemo:
+    """Learned merchant categories from an existing datastore (seeded from its transactions if absent)."""
+    if not path.exists():
+        return MerchantCategoryMemo()
+
+    try:
+        data = _read_datastore(path)
+    except Exception:
+        return MerchantCategoryMemo()
+    if data.get("merchant_categories"):
+        return MerchantCategoryMemo(data["merchant_categories"])
+    return MerchantCategoryMemo.from_transactions(data.get("transactions") or [])
+
+
+def _indented_json(value: object, prefix: str) -> str:
+    return json.dumps(value, indent=2).replace("\n", "\n" + prefix)
+
+
+def write_json_datastore(
+    transactions: Iterable[dict],
+    out_path: Path,
+    preserve_settings: bool = True,
+    memo: Optional[MerchantCategoryMemo] = None,
+    batch_size: int = 1000,
+) -> int:
+    """Stream transactions into the JSON datastore; returns the number written.
+
+    Rows are serialized and written in batches of `batch_size`, so memory
+    stays flat regardless of statement size. The file is written next to
+    `out_path` and moved into place at the end, so a failed import leaves the
+    old datastore untouched. The layout matches the backend's save_data().
+    """
     category_budgets: dict = {}
     default_budget: float = 3000.0
     goals: list = []
@@ -124,32 +440,86 @@ def write_json_datastore(csv_transactions: list[dict], out_path: Path, preserve_
     if preserve_settings:
         category_budgets, default_budget, goals = _load_existing_settings(out_path)
 
-    txs_with_ids = [{"id": uuid.uuid4().hex, **t} for t in csv_transactions]
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    data = {
-        "transactions": txs_with_ids,
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    written = 0
+    try:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            f.write('{\n  "transactions": [')
+            for batch in _chunked(transactions, batch_size):
+                chunk = ",".join("\n    " + _indented_json({"id": uuid.uuid4().hex, **t}, "    ") for t in batch)
+                f.write(("," if written else "") + chunk)
+                written += len(batch)
+            f.write("\n  ]" if written else "]")
+
+            settings: dict = {
+                "category_budgets": category_budgets,
+                "default_budget": default_budget,
+                "goals": goals,
+            }
+            # The memo is written last: it has learned from every row above.
+            if memo is not None:
+                settings["merchant_categories"] = memo.to_dict()
+            for key, value in settings.items():
+                f.write(f",\n  {json.dumps(key)}: {_indented_json(value, '  ')}")
+            f.write("\n}")
+        os.replace(tmp_path, out_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return written
+
+
+def write_snapshot_datastore(
+    transactions: Iterable[dict],
+    out_path: Path,
+    preserve_settings: bool = True,
+    memo: Optional[MerchantCategoryMemo] = None,
+) -> int:
+    """Write transactions to the binary datastore (DATA_FORMAT=binary); returns the number written.
+
+    The snapshot is columnar, so unlike write_json_datastore the rows are
+    collected before writing. Settings are carried over the same way.
+    """
+    category_budgets: dict = {}
+    default_budget: float = 3000.0
+    goals: list = []
+
+    if preserve_settings:
+        category_budgets, default_budget, goals = _load_existing_settings(out_path)
+
+    rows = [{"id": uuid.uuid4().hex, **t} for t in transactions]
+    fps = [tx_fingerprint(t) for t in rows]
+    meta: dict = {
         "category_budgets": category_budgets,
         "default_budget": default_budget,
         "goals": goals,
+        # Rows are already de-duplicated; mark them clean unless fingerprints collide.
+        "dedupe_watermark": len(rows) if len(set(fps)) == len(fps) else 0,
     }
-    out_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if memo is not None:
+        meta["merchant_categories"] = memo.to_dict()
+    snapshot.save(out_path, rows, fps, meta)
+    return len(rows)
 
 
 def main() -> None:
+    # Same switch as the backend: with DATA_FORMAT=binary the datastore is data.snapshot.
+    binary = (os.environ.get("DATA_FORMAT") or "json").strip().lower() == "binary"
     parser = argparse.ArgumentParser(
-        description="Convert comprehensive_bank_statement.csv to transactions, then either write backend/fastapi/data.json (default) or import via API."
+        description="Convert comprehensive_bank_statement.csv to transactions, then either write the backend datastore (data.json, or data.snapshot with DATA_FORMAT=binary) or import via API."
     )
     parser.add_argument("--csv", type=str, default=str(Path(__file__).parents[2] / "comprehensive_bank_statement.csv"))
     parser.add_argument(
         "--out",
         type=str,
-        default=str(Path(__file__).parents[1] / "fastapi" / "data.json"),
-        help="Where to write the JSON datastore when not using --api",
+        default=str(Path(__file__).parents[1] / "fastapi" / ("data.snapshot" if binary else "data.json")),
+        help="Where to write the datastore when not using --api (a binary snapshot with DATA_FORMAT=binary)",
     )
     parser.add_argument(
         "--preserve-settings",
         action="store_true",
-        help="Preserve default_budget/category_budgets/goals from the existing JSON (recommended)",
+        help="Preserve default_budget/category_budgets/goals from the existing datastore (recommended)",
     )
     parser.add_argument(
         "--api",
@@ -157,34 +527,81 @@ def main() -> None:
         default=None,
         help="If set, import into a running FastAPI server via POST /transactions/bulk",
     )
-    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=200, help="Initial batch size (adapted to latency with --api)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Batches in flight at once with --api")
+    parser.add_argument(
+        "--target-latency",
+        type=float,
+        default=1.0,
+        help="Seconds per batch POST the --api import aims for when adapting the batch size",
+    )
     parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument(
+        "--no-memo",
+        action="store_true",
+        help="Ignore learned merchant categories in the --out datastore and use the rules only",
+    )
+    parser.add_argument("--progress", action="store_true", help="Report rows/sec on stderr while importing")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse and categorize in N processes (output is identical to the serial path)",
+    )
 
     args = parser.parse_args()
     csv_path = Path(args.csv).expanduser().resolve()
+    out_path = Path(args.out).expanduser().resolve()
 
-    txs = build_transactions_from_csv(csv_path)
-    print(f"Parsed {len(txs)} rows from {csv_path}")
+    memo = None if args.no_memo else load_merchant_memo(out_path)
+    stats = ImportStats()
+    # read -> parse -> categorize -> fingerprint, all lazy; nothing below holds
+    # more than one batch of rows.
+    if args.workers > 1:
+        keyed = iter_transactions_parallel(csv_path, args.workers, memo)
+    else:
+        keyed = with_keys(iter_transactions_from_csv(csv_path, memo.snapshot() if memo else None))
+    txs = iter_unique(keyed, stats)
+    if args.progress:
+        txs = iter_with_progress(txs)
+
+    def parsed_note() -> str:
+        dupes = f" ({stats.duplicates} duplicates skipped)" if stats.duplicates else ""
+        return f"{stats.rows} rows from {csv_path}{dupes}"
 
     if args.dry_run:
         from collections import Counter
 
         counts = Counter(t["category"] for t in txs)
+        print(f"Parsed {parsed_note()}")
         print("Category counts:")
         for k, v in counts.most_common():
             print(f"  {k}: {v}")
         return
 
     if args.api:
-        import asyncio
-
-        asyncio.run(import_to_backend(args.api, txs, batch_size=args.batch))
-        print(f"Imported {len(txs)} transactions into {args.api}")
+        report = asyncio.run(
+            import_to_backend(
+                args.api,
+                txs,
+                batch_size=args.batch,
+                concurrency=args.concurrency,
+                target_latency=args.target_latency,
+            )
+        )
+        print(f"Imported {parsed_note()} into {args.api}")
+        print(
+            f"  {report['rowsPerSec']:,.0f} rows/sec over {report['batches']} batches in {report['seconds']}s; "
+            f"batch latency p50 {report['p50Ms']} ms, p95 {report['p95Ms']} ms; "
+            f"{report['retries']} retries; final batch size {report['finalBatchSize']}"
+        )
         return
 
-    out_path = Path(args.out).expanduser().resolve()
-    write_json_datastore(txs, out_path, preserve_settings=bool(args.preserve_settings))
-    print(f"Wrote {len(txs)} transactions to {out_path}")
+    if memo is not None:
+        txs = iter_learning(txs, memo)
+    write = write_snapshot_datastore if binary else write_json_datastore
+    written = write(txs, out_path, preserve_settings=bool(args.preserve_settings), memo=memo)
+    print(f"Wrote {written} transactions to {out_path} ({parsed_note()})")
 
 
 if __name__ == "__main__":
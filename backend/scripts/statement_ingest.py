@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import argparse
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+import json
+import os
+from pathlib import Path
+import re
+import sys
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import httpx
+
+from bank_categories import MerchantCategoryMemo, categorize
+from import_bank_statement import _chunked, _extract_merchant
+
+
+_FASTAPI_DIR = Path(__file__).parents[1] / "fastapi"
+FIXTURES = Path(__file__).parent / "fixtures" / "statements"
+
+# A month/day-only row that lands further than this from the previous row is
+# taken to have crossed a year boundary (a December-January statement).
+_YEAR_ROLLOVER = timedelta(days=183)
+
+# "$1,234.56", "-29.61", "(29.61)", "+12,000.00", "29.61 CR"
+_MONEY_RE = re.compile(r"^(\()?\s*([+-])?\s*\$?\s*(\d{1,3}(?:,\d{3})+|\d+)\.(\d{2})\s*\)?\s*(CR|DR)?$", re.I)
+_DATE_RE = re.compile(r"^(?:(\d{1,2})/(\d{1,2})(?:/(\d{4}|\d{2}))?|(\d{4})-(\d{2})-(\d{2}))$")
+_FULL_DATE_RE = re.compile(r"\b\d{1,2}/\d{1,2}/(\d{4})\b|\b(\d{4})-\d{2}-\d{2}\b")
+
+# Free-text statement line: date, description, amount, optional running balance.
+_TEXT_ROW_RE = re.compile(
+    r"^(?P<date>\d{1,2}/\d{1,2}(?:/\d{4}|/\d{2})?|\d{4}-\d{2}-\d{2})\s+"
+    r"(?P<desc>.+?)\s+"
+    r"(?P<amount>\(?[+-]?\s*\$?\s*\d[\d,]*\.\d{2}\)?(?:\s?(?:CR|DR))?)"
+    r"(?:\s+(?P<balance>[+-]?\$?\s*\d[\d,]*\.\d{2}))?\s*$",
+    re.I,
+)
+
+_SUMMARY_DESC_RE = re.compile(
+    r"^(?:(?:beginning|ending|opening|closing|previous|new|daily)\s+)?balance\b|^total\b|^subtotal\b",
+    re.I,
+)
+_CREDIT_DESC_RE = re.compile(r"\b(deposit|payroll|salary|refund|interest paid|transfer from)\b", re.I)
+
+_HEADER_KEYS: list[tuple[str, tuple[str, ...]]] = [
+    ("date", ("date",)),
+    ("type", ("type",)),
+    ("category", ("category",)),
+    ("debit", ("debit", "withdrawal")),
+    ("credit", ("credit", "deposit")),
+    ("amount", ("amount",)),
+    ("balance", ("balance",)),
+    ("description", ("description", "details", "memo", "payee", "transaction", "merchant")),
+]
+
+
+@dataclass
+class _StatementContext:
+    """State carried across pages (statements often print "07/17" without a year)."""
+
+    year: Optional[int] = None
+    last: Optional[date] = None  # previous row's (or header's) date
+    memo: Optional[MerchantCategoryMemo] = None
+
+
+def _parse_money(text: str) -> Optional[tuple[float, Optional[str]]]:
+    """Return (absolute value, "credit"/"debit"/None) for a money cell."""
+    m = _MONEY_RE.match(text.strip())
+    if not m:
+        return None
+    value = float(m.group(3).replace(",", "") + "." + m.group(4))
+    hint: Optional[str] = None
+    sign, suffix = m.group(2), (m.group(5) or "").upper()
+    if sign == "+" or suffix == "CR":
+        hint = "credit"
+    elif sign == "-" or m.group(1) or suffix == "DR":
+        hint = "debit"
+    return value, hint
+
+
+def _parse_date(text: str, ctx: _StatementContext) -> Optional[str]:
+    m = _DATE_RE.match(text.strip())
+    if not m:
+        return None
+    try:
+        if m.group(4):
+            d = date(int(m.group(4)), int(m.group(5)), int(m.group(6)))
+        else:
+            raw_year = m.group(3)
+            if raw_year:
+                y = int(raw_year)
+                if len(raw_year) == 2:
+                    y += 1900 if y >= 69 else 2000
+            else:
+                y = ctx.year or date.today().year
+            d = date(y, int(m.group(1)), int(m.group(2)))
+            if not raw_year and ctx.last is not None:
+                if d < ctx.last - _YEAR_ROLLOVER:
+                    d = d.replace(year=y + 1)  # 12/30 then 01/02
+                elif d > ctx.last + _YEAR_ROLLOVER:
+                    d = d.replace(year=y - 1)  # newest first: 01/02 then 12/30
+    except ValueError:
+        return None
+    ctx.year, ctx.last = d.year, d
+    return d.isoformat()
+
+
+def _make_row(
+    ctx: _StatementContext,
+    date_iso: str,
+    description: str,
+    amount: float,
+    hint: Optional[str],
+    tx_type: str = "",
+    csv_category: str = "",
+) -> Optional[dict]:
+    description = description.strip()
+    if not description or _SUMMARY_DESC_RE.search(description):
+        return None
+
+    t = tx_type.strip().lower()
+    if t in ("deposit", "credit"):
+        is_deposit = True
+    elif t in ("withdrawal", "debit"):
+        is_deposit = False
+    elif hint is not None:
+        is_deposit = hint == "credit"
+    else:
+        is_deposit = bool(_CREDIT_DESC_RE.search(description))
+
+    merchant = _extract_merchant(description)
+    category = categorize(
+        csv_type="Deposit" if is_deposit else "Withdrawal",
+        csv_category=csv_category,
+        description=description,
+        merchant=merchant,
+        memo=ctx.memo,
+    )
+
+    return {
+        "date": date_iso,
+        "merchant": merchant,
+        # Convention in this app: income/refunds are negative
+        "amount": -abs(amount) if is_deposit else abs(amount),
+        "category": category,
+        "description": description,
+    }
+
+
+def _header_columns(cells: list[str]) -> Optional[dict[str, int]]:
+    columns: dict[str, int] = {}
+    for i, cell in enumerate(cells):
+        c = cell.strip().lower()
+        for key, words in _HEADER_KEYS:
+            if key not in columns and any(w in c for w in words):
+                columns[key] = i
+                break
+    return columns if "date" in columns else None
+
+
+def _row_from_cells(cells: list[str], columns: Optional[dict[str, int]], ctx: _StatementContext) -> Optional[dict]:
+    def cell(key: str) -> str:
+        i = columns.get(key) if columns else None
+        return cells[i] if i is not None and i < len(cells) else ""
+
+    if columns:
+        date_iso = _parse_date(cell("date"), ctx)
+        if date_iso is None:
+            return None
+        money: Optional[tuple[float, Optional[str]]] = None
+        if "amount" in columns:
+            money = _parse_money(cell("amount"))
+        if money is None and _parse_money(cell("debit")):
+            money = (_parse_money(cell("debit"))[0], "debit")
+        if money is None and _parse_money(cell("credit")):
+            money = (_parse_money(cell("credit"))[0], "credit")
+        if money is None:
+            return None
+        return _make_row(ctx, date_iso, cell("description"), money[0], money[1], cell("type"), cell("category"))
+
+    # No header seen: first date cell, first money cell (later ones are usually
+    # a running balance), longest remaining cell as the description.
+    date_iso = None
+    money = None
+    tx_type = ""
+    text_cells: list[str] = []
+    for c in cells:
+        if date_iso is None and _DATE_RE.match(c.strip()):
+            date_iso = _parse_date(c, ctx)
+            continue
+        parsed = _parse_money(c)
+        if parsed is not None:
+            money = money or parsed
+            continue
+        if c.strip().lower() in ("deposit", "withdrawal", "debit", "credit"):
+            tx_type = c
+            continue
+        text_cells.append(c)
+    if date_iso is None or money is None or not text_cells:
+        return None
+    return _make_row(ctx, date_iso, max(text_cells, key=len), money[0], money[1], tx_type)
+
+
+def iter_page_rows(text: str, ctx: _StatementContext) -> Iterator[dict]:
+    """Yield transaction rows found on one OCR'd page (markdown tables or plain lines)."""
+    columns: Optional[dict[str, int]] = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line.startswith("|"):
+            columns = None  # a table ends at the first non-table line
+
+        if not line:
+            continue
+
+        if line.startswith("|"):
+            cells = [c.strip() for c in line.strip("|").split("|")]
+            if all(set(c) <= set("-: ") for c in cells):
+                continue
+            row = _row_from_cells(cells, columns, ctx)
+            if row is not None:
+                yield row
+                continue
+            header = _header_columns(cells)
+            if header:
+                columns = header
+            continue
+
+        m = _TEXT_ROW_RE.match(line)
+        if m:
+            date_iso = _parse_date(m.group("date"), ctx)
+            money = _parse_money(m.group("amount"))
+            if date_iso and money:
+                row = _make_row(ctx, date_iso, m.group("desc"), money[0], money[1])
+                if row is not None:
+                    yield row
+                    continue
+
+        # Headers like "Statement Period 07/01/2025 - 07/31/2025" pin the year
+        # for rows that only print month/day.
+        fm = _FULL_DATE_RE.search(line)
+        if fm and _parse_date(fm.group(0), ctx) is None:
+            ctx.year = int(fm.group(1) or fm.group(2))
+
+
+def iter_statement_rows(pages: Iterable[str], memo: Optional[MerchantCategoryMemo] = None) -> Iterator[dict]:
+    """Yield transaction rows page by page; only the current page is held in memory."""
+    ctx = _StatementContext(memo=memo)
+    for page in pages:
+        yield from iter_page_rows(page, ctx)
+
+
+def read_pages(path: Path, api_key: Optional[str] = None) -> Iterator[str]:
+    """Yield OCR'd pages of a statement PDF (or pages of an already OCR'd text file)."""
+    if path.suffix.lower() in (".txt", ".md"):
+        # Pre-OCR'd text; pages are separated by form feeds
+        yield from path.read_text(encoding="utf-8").split("\f")
+        return
+
+    if not api_key:
+        raise ValueError("OCR API key not configured (set DEDALUS_OCR_API_KEY or DEDALUS_API_KEY)")
+    if str(_FASTAPI_DIR) not in sys.path:
+        sys.path.insert(0, str(_FASTAPI_DIR))
+    from ocr_model import OCRModel
+
+    yield from OCRModel(api_key).iter_pages(str(path))
+
+
+def ingest_pages(
+    pages: Iterable[str],
+    sink: Callable[[list[dict]], Optional[dict]],
+    batch_size: int = 200,
+    memo: Optional[MerchantCategoryMemo] = None,
+) -> dict[str, Any]:
+    """Parse pages into rows and hand them to `sink` in batches.
+
+    `sink` is the bulk upsert path (in-process or over HTTP). If it returns a
+    dict of counts (created/updated/unchanged) they are summed into the result.
+    """
+    summary: dict[str, Any] = {"pages": 0, "rows": 0, "batches": 0}
+
+    def counted(it: Iterable[str]) -> Iterator[str]:
+        for page in it:
+            summary["pages"] += 1
+            yield page
+
+    for batch in _chunked(iter_statement_rows(counted(pages), memo), batch_size):
+        counts = sink(batch)
+        summary["rows"] += len(batch)
+        summary["batches"] += 1
+        if isinstance(counts, dict):
+            for k, v in counts.items():
+                summary[k] = summary.get(k, 0) + v
+    return summary
+
+
+def check_fixtures(path: Path) -> int:
+    """Parse each OCR'd statement in `path` and compare with the sibling .json; returns the mismatch count.
+
+    The .json lists the expected rows in order; only the keys it gives are compared.
+    """
+    failures = 0
+    for txt in sorted(path.glob("*.txt")):
+        expected = json.loads(txt.with_suffix(".json").read_text(encoding="utf-8"))
+        got = list(iter_statement_rows(read_pages(txt)))
+        if len(got) != len(expected):
+            failures += 1
+            print(f"  MISMATCH {txt.stem}: expected {len(expected)} rows, got {len(got)}")
+        for i, (want, have) in enumerate(zip(expected, got)):
+            for key, value in want.items():
+                if have.get(key) != value:
+                    failures += 1
+                    print(f"  MISMATCH {txt.stem}[{i}].{key}: expected {value!r}, got {have.get(key)!r}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="OCR a (multi-page) PDF bank statement and import its transactions via POST /transactions/bulk."
+    )
+    parser.add_argument("--pdf", type=str, default=None, help="Statement PDF (or an OCR'd .txt/.md with form-feed page breaks)")
+    parser.add_argument("--api", type=str, default=None, help="FastAPI server to import into, e.g. http://localhost:8000")
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true", help="Parse and categorize only; print category counts")
+    parser.add_argument(
+        "--check",
+        nargs="?",
+        const=str(FIXTURES),
+        default=None,
+        help="Check the parser against the statement fixtures (default: fixtures/statements) and exit",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check_fixtures(Path(args.check))
+        print(f"{failures} mismatches")
+        raise SystemExit(1 if failures else 0)
+    if not args.pdf:
+        parser.error("--pdf is required")
+    if not args.api and not args.dry_run:
+        parser.error("either --api or --dry-run is required")
+
+    path = Path(args.pdf).expanduser().resolve()
+    api_key = os.environ.get("DEDALUS_OCR_API_KEY") or os.environ.get("DEDALUS_API_KEY")
+    pages = read_pages(path, api_key)
+
+    if args.dry_run:
+        counts: Counter = Counter()
+
+        def tally(batch: list[dict]) -> None:
+            counts.update(t["category"] for t in batch)
+
+        summary = ingest_pages(pages, tally, batch_size=args.batch)
+        print(f"Parsed {summary['rows']} rows from {summary['pages']} pages of {path}")
+        print("Category counts:")
+        for k, v in counts.most_common():
+            print(f"  {k}: {v}")
+        return
+
+    url = f"{args.api.rstrip('/')}/transactions/bulk"
+    with httpx.Client(timeout=60.0) as client:
+
+        def post(batch: list[dict]) -> None:
+            r = client.post(url, json=batch)
+            r.raise_for_status()
+
+        summary = ingest_pages(pages, post, batch_size=args.batch)
+    print(f"Imported {summary['rows']} rows from {summary['pages']} pages of {path} into {args.api}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,14 +16,16 @@ export type Goal = {
   id: string;
   name: string;
   targetAmount: number;
+  currentAmount: number;
   targetDate?: string | null;
   note?: string | null;
-  createdAt: string;
+  createdAt?: string | null;
 };
 
 export type GoalIn = {
   name: string;
   targetAmount: number;
+  currentAmount?: number;
   targetDate?: string | null;
   note?: string | null;
 };
@@ -62,6 +64,8 @@ export interface UploadedReceipt {
     items?: Array<{
       name: string;
       price: number;
+      qty?: number;
+      category?: string;
     }>;
     suggestedCategory: string;
   };